@@ -1,58 +1,685 @@
+import atexit
 import os
 import re
 import json
+import contextlib
 import shutil
+import tarfile
 import hashlib
 import mimetypes
-from flask import Blueprint, request, abort, Response, current_app
+import threading
+import time
+import uuid
+from werkzeug.http import http_date, parse_date
+from werkzeug.exceptions import HTTPException
+from flask import Blueprint, request, abort, Response, current_app, jsonify, stream_with_context
+from assignment_3.utils.blob_cache import BlobCache
+from assignment_3.utils.blob_index import BlobIndex, walk_blobs
+from assignment_3.utils.compression import (
+    ENCODING_KEY, SIZE_KEY, is_compressible, gzip_compressor, gzip_etag, gunzip_file, iter_gunzip
+)
+from assignment_3.utils.content_store import ContentStore, CONTENT_KEY, REFS_SUFFIX
+from assignment_3.utils.durability import NONE, PER_REQUEST, GROUP, GroupCommitter, fsync_paths
+from assignment_3.utils.integrity import (
+    CHECKSUM_KEY, Checksum, IntegrityError, checksum_for, parse_digest, check_digest, verify_body,
+    verify_file, iter_verified
+)
+from assignment_3.utils.throttle import Throttle
+from assignment_3.utils.placement import (
+    DiskRing, load_layout, save_layout, iter_blob_dirs, move_blob_dir, clear_incoming
+)
+from assignment_3.utils.multipart import MultipartUploads, MAX_PART_NUMBER, concat_files
+from assignment_3.utils.quota import QuotaAccountant
+from assignment_3.utils.segment_store import SegmentStore
+from assignment_3.utils.trash import Trash
+from assignment_3.utils.usage_journal import UsageJournal, reconcile, has_blob_buckets
 
 file_server = Blueprint('file_server', __name__)
-total_used = 0
+quota = None
+usage_journal = None
+content_store = None
+_content_gc_stop = None
+segment_store = None
+_compactor_stop = None
+blob_cache = BlobCache(0, 0)
+multipart_uploads = None
+_multipart_cleaner_stop = None
+blob_index = None
+trash = None
+_reclaimer_stop = None
+durability = NONE
+_group_committer = None
+disk_ring = None
+_rebalancer_stop = None
+_placement_locks = [threading.RLock() for _ in range(64)]  # Serialise rebalancer moves with deletes and publishes
+verify_reads = False
+_scrubber_stop = None
+scrub_stats = {'passes': 0, 'checked': 0, 'unverified': 0, 'corrupt': []}
 
 CHUNK_SIZE = 8 * 1024  # 8 KB streaming chunks
 ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,%d}$" % 200)
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+LIST_PATTERN = re.compile(r"^[A-Za-z0-9._-]{0,%d}$" % 200)
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+TAR_HEADER_PREFIX = 'REBASE.'  # Pax keywords carrying a batch member's stored headers
+TAR_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+# Endpoints that store their body -> config key of the limit they enforce; anything else gets MAX_LENGTH
+BODY_LIMITS = {
+    'file_server.upload_blob': 'MAX_LENGTH',
+    'file_server.upload_part': 'MAX_LENGTH',
+    'file_server.batch_put': 'MAX_BATCH_LENGTH',
+}
+STAGING_DIR = '_staging'  # Per disk: new blob dirs are written and verified here, then renamed into their bucket
 
-def init_usage(data_dir: str):
-    global total_used
-    usage = 0
-    for dp, _, files in os.walk(data_dir):
-        for f in files:
-            fp = os.path.join(dp, f)
+
+def init_placement(disks: list):
+    global disk_ring
+    disk_ring = DiskRing(disks)
+
+
+def init_rebalancer():
+    """Start moving blobs if the disk layout changed since the last completed rebalance."""
+    global _rebalancer_stop
+    if _rebalancer_stop:
+        _rebalancer_stop.set()
+        _rebalancer_stop = None
+    layout = disk_ring.layout()
+    saved = load_layout(disk_ring.primary)
+    if saved == layout:
+        return
+    if saved is None and len(disk_ring.disks) == 1:
+        save_layout(disk_ring.primary, layout)  # Single-disk tree: nothing can be misplaced
+        return
+    _rebalancer_stop = start_rebalancer(layout)
+
+
+def rebalance_disks(stop: threading.Event = None) -> int:
+    """Move blobs that aren't on their ring disk (e.g. after adding a disk); returns how many moved."""
+    for disk in disk_ring.disks:
+        clear_incoming(disk)
+    moved = 0
+    for disk in disk_ring.disks:
+        for blob_id, src_dir in iter_blob_dirs(disk):
+            if stop is not None and stop.is_set():
+                return moved
+            target = disk_ring.disk_for(blob_id)
+            if target == disk:
+                continue
+            with _placement_lock(blob_id):
+                if not os.path.isdir(src_dir):
+                    continue  # Deleted or overwritten meanwhile
+                dest_dir = _blob_dir_on(target, blob_id)
+                touched = _dirs_touched(dest_dir)
+                if move_blob_dir(src_dir, dest_dir, target, _sync_tree):
+                    _sync(touched)
+                    moved += 1
+                    try:
+                        size = os.path.getsize(os.path.join(dest_dir, 'data'))
+                    except OSError:
+                        size = 0  # Deduplicated: the body stays in the content store
+                    usage_journal.record(-size, blob_id, disk)
+                    usage_journal.record(size, blob_id, target)
+                # Either way the target disk now holds the current copy
+                trash.bury(src_dir)
+    return moved
+
+
+def start_rebalancer(layout: list) -> threading.Event:
+    stop = threading.Event()
+    primary = disk_ring.primary
+
+    def run():
+        try:
+            moved = rebalance_disks(stop)
+            if not stop.is_set():
+                save_layout(primary, layout)
+                file_server.logger.info(f'Rebalanced {moved} blobs across {len(layout)} disks')
+        except Exception as e:
+            file_server.logger.error(f'Disk rebalance failed: {e}')
+
+    threading.Thread(target=run, name='disk-rebalancer', daemon=True).start()
+    return stop
+
+
+def init_durability(mode: str, group_interval: float):
+    global durability, _group_committer
+    if _group_committer:
+        _group_committer.close()
+    _group_committer = GroupCommitter(group_interval) if mode == GROUP else None
+    durability = mode
+
+
+def init_usage(data_dir: str, max_disk_quota: int, reconcile_usage: bool = False, quota_shards: int = 16):
+    global quota, usage_journal
+    if usage_journal:
+        usage_journal.close()
+    usage_journal = UsageJournal(data_dir)
+    quota = QuotaAccountant(max_disk_quota, usage_journal.load(), quota_shards)
+    # A tree written before the journal (or its per-disk totals) existed: repair it in the background
+    needs_repair = not usage_journal.tracks_disks and any(has_blob_buckets(d) for d in disk_ring.disks)
+    if reconcile_usage or needs_repair:
+        start_usage_reconcile(data_dir)
+
+
+def start_usage_reconcile(data_dir: str) -> threading.Thread:
+    journal = usage_journal
+    disks = disk_ring.disks
+    accountant = quota
+
+    def run():
+        # Segment-packed blobs aren't visible to the directory walk
+        usage = reconcile(journal, data_dir, segment_store.live_bytes() if segment_store else 0, disks)
+        accountant.reset(usage)
+        file_server.logger.info(f'Usage reconciled for {data_dir}: {usage} bytes')
+
+    t = threading.Thread(target=run, name='usage-reconcile', daemon=True)
+    t.start()
+    return t
+
+
+def init_content_store(data_dir: str, gc_interval: float):
+    global content_store, _content_gc_stop
+    if _content_gc_stop:
+        _content_gc_stop.set()
+    content_store = ContentStore(data_dir)
+    _content_gc_stop = start_content_gc(gc_interval)
+
+
+def collect_content(full: bool = False) -> int:
+    """Reclaim deduplicated content nobody points to; returns bytes freed."""
+    freed = 0
+    for digest, size in content_store.collect(full):
+        quota.free(size)
+        usage_journal.record(-size, 'sha256:' + digest)
+        freed += size
+    return freed
+
+
+def start_content_gc(interval: float) -> threading.Event:
+    stop = threading.Event()
+
+    def run():
+        full = True  # First pass picks up zero-ref content left by a previous run
+        while True:
+            try:
+                collect_content(full)
+            except Exception as e:
+                file_server.logger.error(f'Content GC failed: {e}')
+            full = False
+            if stop.wait(interval):
+                break
+
+    threading.Thread(target=run, name='content-gc', daemon=True).start()
+    return stop
+
+
+def init_segment_store(data_dir: str, segment_size: int, compact_interval: float, compact_ratio: float):
+    global segment_store, _compactor_stop
+    if _compactor_stop:
+        _compactor_stop.set()
+    if segment_store:
+        segment_store.close()
+    segment_store = SegmentStore(data_dir, segment_size)
+    _compactor_stop = start_segment_compactor(compact_interval, compact_ratio)
+
+
+def start_segment_compactor(interval: float, ratio: float) -> threading.Event:
+    stop = threading.Event()
+    store = segment_store
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                reclaimed = store.compact(ratio, _sync)
+                if reclaimed:
+                    file_server.logger.info(f'Compacted {reclaimed} bytes of segments')
+            except Exception as e:
+                file_server.logger.error(f'Segment compaction failed: {e}')
+
+    threading.Thread(target=run, name='segment-compactor', daemon=True).start()
+    return stop
+
+
+def init_blob_cache(max_bytes: int, max_object_size: int):
+    global blob_cache
+    blob_cache = BlobCache(max_bytes, max_object_size)
+
+
+def init_blob_index(data_dir: str):
+    global blob_index
+    if blob_index:
+        blob_index.close()
+    blob_index = BlobIndex(data_dir)
+    if blob_index.needs_rebuild:
+        # First boot with an index (or a crash before the first build finished)
+        blob_index.rebuild(_walk_all_blobs(data_dir))
+    elif blob_index.stale:
+        # Not closed cleanly: blobs may have been written or removed without their index update
+        start_index_reconcile(data_dir)
+
+
+def start_index_reconcile(data_dir: str) -> threading.Thread:
+    index = blob_index
+
+    def run():
+        added, removed = index.reconcile(_walk_all_blobs(data_dir))
+        file_server.logger.info(f'Blob index reconciled for {data_dir}: {added} added or resized, {removed} removed')
+
+    t = threading.Thread(target=run, name='index-reconcile', daemon=True)
+    t.start()
+    return t
+
+
+def _walk_all_blobs(data_dir: str) -> list:
+    blobs = list(walk_blobs(data_dir, disk_ring.disks))
+    # Segment-packed blobs aren't visible to the directory walk
+    return blobs + [(blob_id, entry.length) for blob_id, entry in list(segment_store.index.items())]
+
+
+def _close_blob_index():
+    if blob_index:
+        blob_index.close()
+
+
+atexit.register(_close_blob_index)   # A clean exit spares the next boot the reconcile
+
+
+def init_trash(data_dir: str, reclaim_interval: float, reclaim_rate: int):
+    global trash, _reclaimer_stop
+    if _reclaimer_stop:
+        _reclaimer_stop.set()
+    trash = Trash(*disk_ring.disks)
+    for disk in disk_ring.disks:
+        trash.bury(os.path.join(disk, STAGING_DIR))  # Uploads a crash left half-written
+    _reclaimer_stop = start_trash_reclaimer(reclaim_interval, reclaim_rate)
+
+
+def start_trash_reclaimer(interval: float, rate: int) -> threading.Event:
+    stop = threading.Event()
+    store = trash
+
+    def run():
+        while True:
+            try:
+                store.reclaim(rate, stop)
+            except Exception as e:
+                file_server.logger.error(f'Trash reclamation failed: {e}')
+            if stop.wait(interval):
+                break
+
+    threading.Thread(target=run, name='trash-reclaimer', daemon=True).start()
+    return stop
+
+
+def init_integrity(verify: bool, scrub_interval: float, scrub_rate: int):
+    global verify_reads, _scrubber_stop, scrub_stats
+    if _scrubber_stop:
+        _scrubber_stop.set()
+        _scrubber_stop = None
+    verify_reads = verify
+    scrub_stats = {'passes': 0, 'checked': 0, 'unverified': 0, 'corrupt': []}
+    if scrub_interval:
+        _scrubber_stop = start_scrubber(scrub_interval, scrub_rate)
+
+
+def scrub_blobs(rate: int = 0, stop: threading.Event = None) -> dict:
+    """Re-read every stored blob at most ``rate`` bytes/s and check it against its upload checksum.
+
+    Returns ``{'checked', 'unverified', 'corrupt': [ids]}``; blobs stored before
+    checksums existed (or whose algorithm isn't available here) count as unverified.
+    """
+    throttle = Throttle(rate, stop)
+    result = {'checked': 0, 'unverified': 0, 'corrupt': []}
+
+    def record(blob_id, ok):
+        if ok is None:
+            result['unverified'] += 1
+            return
+        result['checked'] += 1
+        if not ok:
+            result['corrupt'].append(blob_id)
+            file_server.logger.error(f'Integrity check failed for blob {blob_id}')
+
+    for blob_id, entry in list(segment_store.index.items()):
+        if stop is not None and stop.is_set():
+            return result
+        small = segment_store.read(blob_id)
+        if small is None:
+            continue  # Deleted meanwhile
+        try:
+            verify_body(small[1], entry.headers.get(CHECKSUM_KEY))
+            record(blob_id, True if CHECKSUM_KEY in entry.headers else None)
+        except IntegrityError:
+            record(blob_id, False)
+        if throttle.consume(entry.length):
+            return result
+    for disk in disk_ring.disks:
+        for blob_id, blob_dir in iter_blob_dirs(disk):
+            if stop is not None and stop.is_set():
+                return result
+            data_path, metadata = _locate_blob(blob_dir)
+            if data_path is None:
+                continue
             try:
-                usage += os.path.getsize(fp)
+                ok = verify_file(data_path, metadata.get(CHECKSUM_KEY),
+                                 metadata.get(ENCODING_KEY) == 'gzip', throttle)
             except OSError:
-                pass
-    total_used = usage
-def _get_data_dir():
-    return os.path.abspath(current_app.config['DATA_DIR'])
+                if not os.path.isdir(blob_dir):
+                    continue  # Deleted or moved meanwhile
+                ok = False
+            record(blob_id, ok)
+    return result
 
 
-def _compute_blob_dir(blob_id: str) -> str:
+def start_scrubber(interval: float, rate: int) -> threading.Event:
+    stop = threading.Event()
+    stats = scrub_stats
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                result = scrub_blobs(rate, stop)
+            except Exception as e:
+                file_server.logger.error(f'Integrity scrub failed: {e}')
+                continue
+            if stop.is_set():
+                break
+            stats.update(result, passes=stats['passes'] + 1)
+            file_server.logger.info(f"Scrubbed {result['checked']} blobs, {len(result['corrupt'])} corrupt")
+
+    threading.Thread(target=run, name='integrity-scrubber', daemon=True).start()
+    return stop
+
+
+def init_multipart(data_dir: str, expiry: float, cleanup_interval: float):
+    global multipart_uploads, _multipart_cleaner_stop
+    if _multipart_cleaner_stop:
+        _multipart_cleaner_stop.set()
+    multipart_uploads = MultipartUploads(data_dir)
+    _multipart_cleaner_stop = start_multipart_cleaner(expiry, cleanup_interval)
+
+
+def expire_multipart_uploads(max_age: float) -> int:
+    """Drop incomplete uploads older than ``max_age`` seconds; returns how many were removed.
+
+    Also reclaims uploads whose complete was claimed ``max_age`` ago but never
+    finished (e.g. the process died mid-assembly).
+    """
+    removed = 0
+    for upload_id in multipart_uploads.expired(max_age):
+        if multipart_uploads.claim(upload_id):
+            _free_upload_parts(upload_id)
+            removed += 1
+    for upload_id in multipart_uploads.stale_claims(max_age):
+        _free_upload_parts(upload_id)
+        removed += 1
+    return removed
+
+
+def start_multipart_cleaner(expiry: float, interval: float) -> threading.Event:
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                removed = expire_multipart_uploads(expiry)
+                if removed:
+                    file_server.logger.info(f'Expired {removed} incomplete multipart uploads')
+            except Exception as e:
+                file_server.logger.error(f'Multipart cleanup failed: {e}')
+
+    threading.Thread(target=run, name='multipart-cleaner', daemon=True).start()
+    return stop
+
+
+def _blob_dir_on(disk: str, blob_id: str) -> str:
     # Bucket path: first 3 hex chars + next 2 of SHA-1(blob_id)
     h = hashlib.sha1(blob_id.encode('utf-8')).hexdigest()
     p1, p2 = h[:3], h[3:5]
-    return os.path.join(_get_data_dir(), p1, p2, blob_id)
+    return os.path.join(disk, p1, p2, blob_id)
 
 
-@file_server.route('/blobs/<blob_id>', methods=['POST'])
-def upload_blob(blob_id):
-    global total_used
-    cfg = current_app.config
-    if not ID_PATTERN.fullmatch(blob_id):
-        abort(400, 'Invalid blob ID')
+def _disk_of(blob_dir: str) -> str:
+    """Inverse of ``_blob_dir_on``: the disk a blob dir lives on."""
+    return os.path.dirname(os.path.dirname(os.path.dirname(blob_dir)))
+
+
+def _staging_dir(blob_dir: str) -> str:
+    """A fresh dir on ``blob_dir``'s disk to build its replacement in."""
+    return os.path.join(_disk_of(blob_dir), STAGING_DIR, uuid.uuid4().hex)
+
+
+def _publish_blob_dir(blob_id: str, stage_dir: str, blob_dir: str):
+    """Replace whatever ``blob_id`` holds now with the finished (and synced) ``stage_dir``."""
+    with _placement_lock(blob_id):
+        # Only now does the previous version go: a failed or refused upload leaves it in place
+        _remove_blob(blob_id)
+        touched = _dirs_touched(blob_dir)
+        os.makedirs(os.path.dirname(blob_dir), exist_ok=True)
+        os.rename(stage_dir, blob_dir)
+    _sync(touched + [os.path.dirname(stage_dir)])
+
+
+def _compute_blob_dir(blob_id: str) -> str:
+    """Where a new upload of ``blob_id`` goes: its bucket on the disk the ring picks."""
+    return _blob_dir_on(disk_ring.disk_for(blob_id), blob_id)
+
+
+def _blob_dirs(blob_id: str) -> list:
+    return [_blob_dir_on(disk, blob_id) for disk in disk_ring.candidates(blob_id)]
+
+
+def _placement_lock(blob_id: str) -> threading.Lock:
+    return _placement_locks[hash(blob_id) % len(_placement_locks)]
+
+
+def _read_metadata(blob_dir: str) -> dict:
+    try:
+        with open(os.path.join(blob_dir, 'metadata.json'), 'r', encoding='utf-8') as mf:
+            return json.load(mf)
+    except Exception:
+        return {}
+
+
+def _locate_blob(blob_dir: str):
+    """Return ``(data_path, metadata)`` for a stored blob, or ``(None, None)``."""
+    data_path = os.path.join(blob_dir, 'data')
+    if os.path.isfile(data_path):
+        return data_path, _read_metadata(blob_dir)
+    metadata = _read_metadata(blob_dir)
+    if CONTENT_KEY in metadata:
+        return content_store.path(metadata[CONTENT_KEY]), metadata
+    return None, None
+
+
+def _find_blob(blob_id: str):
+    """``_locate_blob`` across disks, the ring's choice first."""
+    dirs = _blob_dirs(blob_id)
+    # Two passes: a rebalancer move can land on the target just after we looked there
+    for blob_dir in dirs if len(dirs) == 1 else dirs * 2:
+        data_path, metadata = _locate_blob(blob_dir)
+        if data_path is not None:
+            return data_path, metadata
+    return None, None
+
+
+def _remove_blob(blob_id: str):
+    blob_cache.invalidate(blob_id)
+    blob_index.delete(blob_id)
+    size = segment_store.delete(blob_id, _sync)
+    if size is not None:
+        quota.free(size)
+        usage_journal.record(-size, blob_id)
+        return
+    with _placement_lock(blob_id):
+        found = False
+        for blob_dir in _blob_dirs(blob_id):
+            data_path, metadata = _locate_blob(blob_dir)
+            if data_path is None:
+                continue
+            if found:
+                trash.bury(blob_dir, _sync)  # Copy left by an interrupted move; only one was ever accounted
+                continue
+            found = True
+            _bury_blob(blob_id, blob_dir, data_path, metadata)
+
+
+def _bury_blob(blob_id: str, blob_dir: str, data_path: str, metadata: dict):
+    if CONTENT_KEY in metadata:
+        # Shared content: the GC refunds the quota once the last reference is gone
+        if trash.bury(blob_dir, _sync):
+            content_store.decref(metadata[CONTENT_KEY])
+        return
+    try:
+        size = os.path.getsize(data_path)
+    except OSError:
+        size = 0
+    # The rename is the delete; the reclaimer unlinks the bytes later, off the request thread
+    if trash.bury(blob_dir, _sync):
+        quota.free(size)
+        usage_journal.record(-size, blob_id, _disk_of(blob_dir))
+
+
+def _sync(paths):
+    """Make written files/dirs durable according to DURABILITY; raises if an fsync fails."""
+    if durability == PER_REQUEST:
+        if fsync_paths(paths):
+            raise OSError('fsync failed')
+    elif durability == GROUP:
+        _group_committer.sync(paths)
+
+
+def _sync_tree(path: str):
+    _sync([os.path.join(path, f) for f in os.listdir(path)] + [path])
+
+
+def _dirs_touched(path: str) -> list:
+    """Directories whose entries change when ``path`` is created with makedirs."""
+    touched = []
+    while not os.path.isdir(path):
+        path = os.path.dirname(path)
+        touched.append(path)
+    return touched
 
+
+def _stream_to_file(path: str, total_len: int, hasher=None, stream=None, compressor=None, checksum=None):
+    stream = stream or request.stream
+    remaining = total_len
+    with open(path, 'wb') as df:
+        while remaining:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            df.write(compressor.compress(chunk) if compressor else chunk)
+            if hasher:
+                hasher.update(chunk)
+            if checksum:
+                checksum.update(chunk)
+            remaining -= len(chunk)
+        if compressor:
+            df.write(compressor.flush())
+    if remaining:
+        raise ValueError('Incomplete upload')
+
+
+def _read_body(total_len: int, stream=None) -> bytes:
+    stream = stream or request.stream
+    parts = []
+    remaining = total_len
+    while remaining:
+        chunk = stream.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError('Incomplete upload')
+        parts.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(parts)
+
+
+def _iter_file(f, size: int):
+    """Stream ``size`` bytes of an open file, then close it.
+
+    Callers open the file before building the response, so a delete racing the
+    download only renames the blob dir away; the open handle still reads it.
+    """
+    with f:
+        while size > 0:
+            data = f.read(min(CHUNK_SIZE, size))
+            if not data:
+                break
+            size -= len(data)
+            yield data
+
+
+def _response_headers(blob_id: str, metadata: dict, size: int) -> dict:
+    content_type = metadata.get('Content-Type') or mimetypes.guess_type(blob_id)[0] or 'application/octet-stream'
+    headers = {
+        'Content-Type': content_type,
+        'Content-Length': str(size)
+    }
+    for name, val in metadata.items():
+        if name.lower().startswith('x-rebase-'):
+            headers[name] = val
+    for name in VALIDATOR_HEADERS:
+        if name in metadata:
+            headers[name] = metadata[name]
+    if current_app.config['CACHE_CONTROL']:
+        headers['Cache-Control'] = current_app.config['CACHE_CONTROL']
+    return headers
+
+
+def _validators(hasher) -> dict:
+    """Strong ETag (SHA-256 of the body, hashed while it streamed in) and Last-Modified."""
+    return {'ETag': f'"{hasher.hexdigest()}"', 'Last-Modified': http_date()}
+
+
+def _not_modified(headers: dict):
+    """Return a 304 response if the request's validators still match, else None."""
+    etag = headers.get('ETag')
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        if not etag or not request.if_none_match.contains_weak(etag.strip('"')):
+            return None
+    elif request.if_modified_since and 'Last-Modified' in headers:
+        if parse_date(headers['Last-Modified']) > request.if_modified_since:
+            return None
+    else:
+        return None
+    return Response(status=304, headers={k: v for k, v in headers.items() if k in NOT_MODIFIED_HEADERS})
+
+
+def _content_length() -> int:
     if 'Content-Length' not in request.headers:
         abort(400, 'Missing Content-Length header')
     try:
-        total_len = int(request.headers['Content-Length'])
+        return int(request.headers['Content-Length'])
     except ValueError:
         abort(400, 'Invalid Content-Length header')
 
+
+def refuse_body(config, endpoint, length: int):
+    """Status to refuse a ``length``-byte request body for ``endpoint`` with before reading it, or None.
+
+    For front-ends that see the headers first (async_server): the same limits
+    the routes check, plus the quota, so an oversized body is never spooled.
+    """
+    key = BODY_LIMITS.get(endpoint)
+    if length > config[key or 'MAX_LENGTH']:
+        return 413
+    if key and length > quota.limit - quota.used - quota.reserved:
+        return 413  # Would fail quota.reserve anyway
+    return None
+
+
+def _stored_headers(headers=None) -> dict:
+    """Headers persisted with a blob (Content-Type and X-Rebase-*), validated against the limits."""
+    cfg = current_app.config
+    headers = request.headers if headers is None else headers
     stored = {}
-    if 'Content-Type' in request.headers:
-        stored['Content-Type'] = request.headers['Content-Type']
-    for name, val in request.headers.items():
-        if name.lower().startswith('x-rebase-'):
+    for name, val in headers.items():
+        if name.lower() == 'content-type':
+            stored['Content-Type'] = val
+        elif name.lower().startswith('x-rebase-'):
             stored[name] = val
 
     if len(stored) > cfg['MAX_HEADER_COUNT']:
@@ -60,47 +687,186 @@ def upload_blob(blob_id):
     for name, val in stored.items():
         if len(name) > cfg['MAX_HEADER_LENGTH'] or len(val) > cfg['MAX_HEADER_LENGTH']:
             abort(400, f'Header "{name}" exceeds max length')
+    return stored
+
+
+@file_server.route('/blobs/<blob_id>', methods=['POST'])
+def upload_blob(blob_id):
+    cfg = current_app.config
+    if not ID_PATTERN.fullmatch(blob_id):
+        abort(400, 'Invalid blob ID')
+
+    total_len = _content_length()
+    stored = _stored_headers()
 
     header_bytes = sum(len(n) + len(v) for n, v in stored.items())
     if total_len + header_bytes > cfg['MAX_LENGTH']:
         abort(413, 'Payload and headers exceed max length')
+    digest = None
+    if 'Digest' in request.headers:
+        try:
+            digest = parse_digest(request.headers['Digest'])
+        except ValueError:
+            abort(400, 'Invalid Digest header')
 
     blob_dir = _compute_blob_dir(blob_id)
-    data_path = os.path.join(blob_dir, 'data')
-    if os.path.isdir(blob_dir) and os.path.isfile(data_path):
-        try:
-            old_size = os.path.getsize(data_path)
-            total_used -= old_size
-        except OSError:
-            pass
-        shutil.rmtree(blob_dir)
 
-    if total_used + total_len > cfg['MAX_DISK_QUOTA']:
+    # Hold the space before streaming so parallel uploads can't all pass the check
+    reservation = quota.reserve(total_len)
+    if reservation is None:
         abort(413, 'Disk quota exceeded')
-    os.makedirs(blob_dir, exist_ok=True)
 
-    with open(os.path.join(blob_dir, 'metadata.json'), 'w', encoding='utf-8') as mf:
-        json.dump(stored, mf, indent=2)
+    _store_blob(blob_id, blob_dir, stored, total_len, reservation, digest=digest)
+    return '', 201
 
-    tmp_path = os.path.join(blob_dir, 'data.tmp')
-    remaining = total_len
+
+def _store_blob(blob_id, blob_dir, stored, total_len, reservation, stream=None, digest=None):
+    """Write one blob body to the configured backend; aborts (and releases the reservation) on failure.
+
+    ``digest`` holds the client's ``Digest`` header values, checked before the blob becomes visible.
+    Any previous version of ``blob_id`` is removed only once the new body is written and verified.
+    """
+    cfg = current_app.config
+    if cfg['SEGMENT_STORE'] and total_len <= cfg['SEGMENT_MAX_BLOB_SIZE']:
+        _store_in_segment(blob_id, stored, total_len, reservation, stream, digest)
+    elif cfg['DEDUP']:
+        _store_deduplicated(blob_id, blob_dir, stored, total_len, reservation, stream, digest)
+    else:
+        _store_file(blob_id, blob_dir, stored, total_len, reservation, stream, digest)
+    blob_index.put(blob_id, total_len)
+    # Again after the write: a reader that raced the overwrite must not re-cache the old body
+    blob_cache.invalidate(blob_id)
+
+
+def _store_file(blob_id, blob_dir, stored, total_len, reservation, stream=None, digest=None):
+    stage_dir = _staging_dir(blob_dir)
+    tmp_path = os.path.join(stage_dir, 'data')
+    metadata_path = os.path.join(stage_dir, 'metadata.json')
     try:
-        with open(tmp_path, 'wb') as df:
-            while remaining:
-                chunk = request.stream.read(min(CHUNK_SIZE, remaining))
-                if not chunk:
-                    break
-                df.write(chunk)
-                remaining -= len(chunk)
-        if remaining:
-            raise ValueError('Incomplete upload')
-        os.replace(tmp_path, data_path)
-        total_used += total_len
-    except Exception:
-        shutil.rmtree(blob_dir, ignore_errors=True)
-        abort(500, 'Error writing blob')
+        os.makedirs(stage_dir)
+        hasher = hashlib.sha256()
+        checksum = Checksum()
+        metadata = dict(stored)
+        stored_len = total_len
+        if _should_compress(blob_id, stored):
+            compressor = gzip_compressor(current_app.config['COMPRESS_LEVEL'])
+            _stream_to_file(tmp_path, total_len, hasher, stream, compressor, checksum)
+            stored_len = os.path.getsize(tmp_path)
+            if stored_len < total_len:
+                metadata.update({ENCODING_KEY: 'gzip', SIZE_KEY: total_len})
+            else:
+                gunzip_file(tmp_path)  # Didn't shrink; keep it raw
+                stored_len = total_len
+        else:
+            _stream_to_file(tmp_path, total_len, hasher, stream, checksum=checksum)
+        if digest:
+            check_digest(digest, hasher, checksum)
+        metadata[CHECKSUM_KEY] = checksum.token()
+        with open(metadata_path, 'w', encoding='utf-8') as mf:
+            json.dump(dict(metadata, **_validators(hasher)), mf, indent=2)
+        # Contents before the rename, then the directory entries, so a crash never exposes a torn blob
+        _sync([tmp_path, metadata_path, stage_dir])
+        _publish_blob_dir(blob_id, stage_dir, blob_dir)
+        # Quota counts what is on disk, i.e. the compressed size
+        quota.commit(reservation, stored_len)
+        usage_journal.record(stored_len, blob_id, _disk_of(blob_dir))
+    except Exception as e:
+        quota.release(reservation)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        _abort_write(e)
 
-    return '', 201
+
+def _abort_write(e: Exception):
+    if isinstance(e, IntegrityError):
+        abort(400, str(e))  # The body isn't what the client's Digest says
+    abort(500, 'Error writing blob')
+
+
+def _should_compress(blob_id: str, stored: dict) -> bool:
+    if not current_app.config['COMPRESS']:
+        return False
+    return is_compressible(stored.get('Content-Type') or mimetypes.guess_type(blob_id)[0])
+
+
+def _store_in_segment(blob_id, stored, total_len, reservation, stream=None, digest=None):
+    try:
+        body = _read_body(total_len, stream)
+        hasher, checksum = hashlib.sha256(body), Checksum()
+        checksum.update(body)
+        if digest:
+            check_digest(digest, hasher, checksum)
+    except Exception as e:
+        quota.release(reservation)
+        _abort_write(e)
+    _remove_blob(blob_id)
+    try:
+        segment_store.put(blob_id, dict(stored, **_validators(hasher), **{CHECKSUM_KEY: checksum.token()}), body)
+        _sync([segment_store.segment_path(blob_id)])
+        quota.commit(reservation)
+        usage_journal.record(total_len, blob_id)
+    except Exception as e:
+        quota.release(reservation)
+        segment_store.delete(blob_id)
+        _abort_write(e)
+
+
+def _store_deduplicated(blob_id, blob_dir, stored, total_len, reservation, stream=None, digest=None):
+    # Hash while streaming into the content store; the blob dir only gets a pointer
+    tmp_path = content_store.new_temp_path()
+    stage_dir = _staging_dir(blob_dir)
+    content = None
+    try:
+        hasher, checksum = hashlib.sha256(), Checksum()
+        _stream_to_file(tmp_path, total_len, hasher, stream, checksum=checksum)
+        if digest:
+            check_digest(digest, hasher, checksum)
+        _sync([tmp_path])
+        content_path = content_store.path(hasher.hexdigest())
+        touched = _dirs_touched(os.path.dirname(content_path))
+        is_new = content_store.add(tmp_path, hasher.hexdigest())
+        content = hasher.hexdigest()
+        if is_new:
+            quota.commit(reservation)
+            usage_journal.record(total_len, 'sha256:' + content)
+        else:
+            quota.release(reservation)  # Quota counts unique bytes only
+
+        os.makedirs(stage_dir)
+        metadata_path = os.path.join(stage_dir, 'metadata.json')
+        with open(metadata_path, 'w', encoding='utf-8') as mf:
+            json.dump(dict(stored, **_validators(hasher), **{CONTENT_KEY: content, CHECKSUM_KEY: checksum.token()}),
+                      mf, indent=2)
+        _sync([metadata_path, stage_dir, content_path + REFS_SUFFIX, os.path.dirname(content_path)] + touched)
+        _publish_blob_dir(blob_id, stage_dir, blob_dir)
+    except Exception as e:
+        quota.release(reservation)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if content:
+            content_store.decref(content)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        _abort_write(e)
+
+
+@file_server.route('/blobs', methods=['GET'])
+def list_blobs():
+    """Page through blob IDs in order: ``?prefix=&after=&limit=``; pass ``next`` back as ``after``."""
+    prefix = request.args.get('prefix', '')
+    after = request.args.get('after', '')
+    if not LIST_PATTERN.fullmatch(prefix) or not LIST_PATTERN.fullmatch(after):
+        abort(400, 'Invalid prefix or after')
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        abort(400, 'Invalid limit')
+    if not 1 <= limit <= current_app.config['MAX_LIST_LIMIT']:
+        abort(400, 'Invalid limit')
+
+    blobs = blob_index.list(prefix, after, limit)
+    return jsonify({
+        'blobs': [{'id': blob_id, 'size': size} for blob_id, size in blobs],
+        'next': blobs[-1][0] if len(blobs) == limit else None,
+    })
 
 
 @file_server.route('/blobs/<blob_id>', methods=['GET'])
@@ -108,51 +874,399 @@ def download_blob(blob_id):
     if not ID_PATTERN.fullmatch(blob_id):
         abort(400, 'Invalid blob ID')
 
-    blob_dir = _compute_blob_dir(blob_id)
-    data_path = os.path.join(blob_dir, 'data')
-    if not os.path.isfile(data_path):
+    if blob_cache.enabled:
+        cached = blob_cache.get(blob_id)
+        if cached is not None:
+            headers, body = cached
+            return _not_modified(headers) or Response(body, headers=headers)
+    token = blob_cache.token(blob_id)
+
+    # Validators come from the index/metadata, so a 304 never touches the body
+    entry = segment_store.lookup(blob_id)
+    if entry is not None:
+        headers = _response_headers(blob_id, entry.headers, entry.length)
+        not_modified = _not_modified(headers)
+        if not_modified:
+            return not_modified
+        small = segment_store.read(blob_id)
+        if small is None:
+            abort(404, 'Blob not found')
+        body = small[1]
+        if verify_reads:
+            _verify_or_abort(blob_id, body, entry.headers)
+        blob_cache.put(blob_id, headers, body, token)
+        return Response(body, headers=headers)
+
+    data_path, metadata = _find_blob(blob_id)
+    if data_path is None:
         abort(404, 'Blob not found')
+    try:
+        f = open(data_path, 'rb')
+    except OSError:
+        abort(404, 'Blob not found')  # Deleted since we located it
+
+    with _closing_on_error(f):
+        stat = os.fstat(f.fileno())
+        if 'Last-Modified' not in metadata:
+            metadata = dict(metadata, **{'Last-Modified': http_date(stat.st_mtime)})  # Pre-ETag blobs
+        if metadata.get(ENCODING_KEY) == 'gzip':
+            return _compressed_response(blob_id, f, metadata, stat.st_size)
+        headers = _response_headers(blob_id, metadata, stat.st_size)
+        not_modified = _not_modified(headers)
+        if not_modified:
+            f.close()
+            return not_modified
+        if request.method != 'HEAD' and blob_cache.accepts(stat.st_size):
+            # Hot-cache candidate: read it in one go and serve a single buffer
+            with f:
+                body = f.read()
+            if verify_reads:
+                _verify_or_abort(blob_id, body, metadata)
+            blob_cache.put(blob_id, headers, body, token)
+            return Response(body, headers=headers)
+
+        return Response(_verified(blob_id, _iter_file(f, stat.st_size), metadata), headers=headers)
 
+
+def _compressed_response(blob_id: str, f, metadata: dict, stored_size: int):
+    """Serve a gzip-at-rest blob: the stored bytes to clients that accept gzip, else decompressed on the fly."""
+    if request.accept_encodings['gzip']:
+        headers = _response_headers(blob_id, metadata, stored_size)
+        headers['Content-Encoding'] = 'gzip'
+        if 'ETag' in headers:
+            headers['ETag'] = gzip_etag(headers['ETag'])
+        body = _verified(blob_id, _iter_file(f, stored_size), metadata, gzipped=True)
+    else:
+        headers = _response_headers(blob_id, metadata, metadata[SIZE_KEY])
+        body = _verified(blob_id, iter_gunzip(f), metadata)
+    headers['Vary'] = 'Accept-Encoding'
+    not_modified = _not_modified(headers)
+    if not_modified:
+        f.close()
+        return not_modified
+    return Response(body, headers=headers)
+
+
+@contextlib.contextmanager
+def _closing_on_error(f):
     try:
-        with open(os.path.join(blob_dir, 'metadata.json'), 'r', encoding='utf-8') as mf:
-            metadata = json.load(mf)
-    except Exception:
-        metadata = {}
+        yield f
+    except BaseException:
+        f.close()
+        raise
 
-    content_type = metadata.get('Content-Type') or mimetypes.guess_type(blob_id)[0] or 'application/octet-stream'
+
+def _verify_or_abort(blob_id: str, body: bytes, metadata: dict):
+    try:
+        verify_body(body, metadata.get(CHECKSUM_KEY))
+    except IntegrityError as e:
+        file_server.logger.error(f'Blob {blob_id} failed verification on read: {e}')
+        abort(500, 'Blob failed integrity check')
+
+
+def _verified(blob_id: str, chunks, metadata: dict, gzipped: bool = False):
+    """With VERIFY_READS, checksum the body as it streams; a mismatch cuts the response short."""
+    if not verify_reads or CHECKSUM_KEY not in metadata:
+        return chunks
 
     def gen():
-        with open(data_path, 'rb') as f:
-            while True:
-                data = f.read(CHUNK_SIZE)
-                if not data:
-                    break
-                yield data
-
-    stat = os.stat(data_path)
-    headers = {
-        'Content-Type': content_type,
-        'Content-Length': str(stat.st_size)
-    }
-    for name, val in metadata.items():
-        if name.lower().startswith('x-rebase-'):
-            headers[name] = val
+        try:
+            yield from iter_verified(chunks, metadata[CHECKSUM_KEY], gzipped)
+        except IntegrityError as e:
+            file_server.logger.error(f'Blob {blob_id} failed verification on read: {e}')
+            raise
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
 
-    return Response(gen(), headers=headers)
+    return gen()
 
 
 @file_server.route('/blobs/<blob_id>', methods=['DELETE'])
 def delete_blob(blob_id):
-    global total_used
     if not ID_PATTERN.fullmatch(blob_id):
         abort(400, 'Invalid blob ID')
+    _remove_blob(blob_id)
+    return '', 204
+
+
+def _get_upload(blob_id: str, upload_id: str) -> dict:
+    if not ID_PATTERN.fullmatch(blob_id) or not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+        abort(400, 'Invalid blob or upload ID')
+    manifest = multipart_uploads.manifest(upload_id)
+    if manifest is None or manifest['blob_id'] != blob_id:
+        abort(404, 'Upload not found')
+    return manifest
+
+
+def _free_upload_parts(upload_id: str, adopted: int = 0):
+    """Delete an upload's parts; ``adopted`` bytes of them now belong to the assembled blob and stay charged."""
+    size = max(multipart_uploads.remove(upload_id) - adopted, 0)
+    quota.free(size)
+    usage_journal.record(-size, 'upload:' + upload_id)
+
+
+@file_server.route('/blobs/<blob_id>/uploads', methods=['POST'])
+def initiate_multipart_upload(blob_id):
+    if not ID_PATTERN.fullmatch(blob_id):
+        abort(400, 'Invalid blob ID')
+    upload_id = multipart_uploads.initiate(blob_id, _stored_headers())
+    return jsonify({'upload_id': upload_id}), 201
+
+
+@file_server.route('/blobs/<blob_id>/uploads/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+def upload_part(blob_id, upload_id, part_number):
+    _get_upload(blob_id, upload_id)
+    if not 1 <= part_number <= MAX_PART_NUMBER:
+        abort(400, 'Invalid part number')
+    total_len = _content_length()
+    if total_len > current_app.config['MAX_LENGTH']:
+        abort(413, 'Part exceeds max length')
+
+    reservation = quota.reserve(total_len)
+    if reservation is None:
+        abort(413, 'Disk quota exceeded')
+
+    part_path = multipart_uploads.part_path(upload_id, part_number)
+    # Unique per request: two PUTs of the same part must not write into one file
+    tmp_path = f'{part_path}.{uuid.uuid4().hex}.tmp'
+    live = True
+    try:
+        hasher, checksum = hashlib.sha256(), Checksum()
+        _stream_to_file(tmp_path, total_len, hasher, checksum=checksum)
+        with multipart_uploads.lock:
+            # A complete/abort may have claimed (and freed) the upload while we streamed
+            live = multipart_uploads.manifest(upload_id) is not None
+            if live:
+                if os.path.isfile(part_path):
+                    old_size = os.path.getsize(part_path)
+                    quota.free(old_size)
+                    usage_journal.record(-old_size, 'upload:' + upload_id)
+                os.replace(tmp_path, part_path)
+                multipart_uploads.save_part_digest(upload_id, part_number, hasher.hexdigest(), checksum.token())
+                quota.commit(reservation)
+                usage_journal.record(total_len, 'upload:' + upload_id)
+    except Exception:
+        quota.release(reservation)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        abort(500, 'Error writing part')
+    if not live:
+        quota.release(reservation)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        abort(409, 'Upload is completing or was aborted')
+
+    return '', 201, {'ETag': f'"{hasher.hexdigest()}"'}
+
+
+@file_server.route('/blobs/<blob_id>/uploads/<upload_id>/complete', methods=['POST'])
+def complete_multipart_upload(blob_id, upload_id):
+    manifest = _get_upload(blob_id, upload_id)
+    wanted = (request.get_json(silent=True) or {}).get('parts')
+    if wanted is not None and (not isinstance(wanted, list) or
+                               not all(isinstance(n, int) and not isinstance(n, bool) for n in wanted)):
+        abort(400, 'parts must be a list of part numbers')
+    if not multipart_uploads.claim(upload_id):
+        abort(409, 'Upload is already completing')
+
+    completed = False
+    try:
+        _assemble_multipart(blob_id, upload_id, manifest, wanted)
+        completed = True
+    finally:
+        if not completed:
+            multipart_uploads.unclaim(upload_id)  # Every failure (aborts included) leaves it completable
+    return '', 201
+
+
+def _assemble_multipart(blob_id: str, upload_id: str, manifest: dict, wanted):
+    parts = multipart_uploads.parts(upload_id)
+    if wanted is not None:
+        by_number = {p[0]: p for p in parts}
+        if not all(n in by_number for n in wanted):
+            abort(400, 'Unknown part number')
+        parts = [by_number[n] for n in wanted]
+    total_len = sum(p[2] for p in parts)
+    if not parts:
+        abort(400, 'No parts uploaded')
+    if total_len > current_app.config['MAX_MULTIPART_LENGTH']:
+        abort(413, 'Payload exceeds max length')
+
+    # No reservation: the parts are already charged, and the blob takes their bytes over
     blob_dir = _compute_blob_dir(blob_id)
-    data_path = os.path.join(blob_dir, 'data')
-    if os.path.isdir(blob_dir) and os.path.isfile(data_path):
-        try:
-            size = os.path.getsize(data_path)
-            total_used -= size
-        except OSError:
-            pass
-        shutil.rmtree(blob_dir)
+    stage_dir = _staging_dir(blob_dir)
+    try:
+        os.makedirs(stage_dir)
+        tmp_path = os.path.join(stage_dir, 'data')
+        metadata_path = os.path.join(stage_dir, 'metadata.json')
+        checksum = _combined_checksum(parts)
+        if checksum is None:
+            # Some part has no checksum of its own: compute the blob's while copying
+            checksum = Checksum()
+            concat_files(tmp_path, [p[1] for p in parts], checksum)
+        else:
+            concat_files(tmp_path, [p[1] for p in parts])
+        # S3-style ETag: hash of the part hashes, so the body is never re-read
+        etag = hashlib.sha256(b''.join(bytes.fromhex(p[3]) for p in parts)).hexdigest()
+        metadata = dict(manifest['headers'], **{'ETag': f'"{etag}-{len(parts)}"', 'Last-Modified': http_date(),
+                                                CHECKSUM_KEY: checksum.token()})
+        with open(metadata_path, 'w', encoding='utf-8') as mf:
+            json.dump(metadata, mf, indent=2)
+        # Same ordering as _store_file: contents, then the rename, then the directory entries
+        _sync([tmp_path, metadata_path, stage_dir])
+        _publish_blob_dir(blob_id, stage_dir, blob_dir)
+        usage_journal.record(-total_len, 'upload:' + upload_id)
+        usage_journal.record(total_len, blob_id, _disk_of(blob_dir))
+    except Exception:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        abort(500, 'Error assembling blob')
+
+    _free_upload_parts(upload_id, adopted=total_len)
+    blob_index.put(blob_id, total_len)
+    blob_cache.invalidate(blob_id)
+
+
+def _combined_checksum(parts):
+    """The blob's checksum from its parts' own, or None if a part lacks one this build can combine."""
+    checksum = checksum_for(parts[0][4])
+    if checksum is None:
+        return None
+    for _, _, size, _, token in parts:
+        algorithm, _, value = (token or '').partition(':')
+        if algorithm != checksum.algorithm:
+            return None
+        checksum.combine(int(value, 16), size)
+    return checksum
+
+
+@file_server.route('/blobs/<blob_id>/uploads/<upload_id>', methods=['DELETE'])
+def abort_multipart_upload(blob_id, upload_id):
+    _get_upload(blob_id, upload_id)
+    if multipart_uploads.claim(upload_id):
+        _free_upload_parts(upload_id)
     return '', 204
+
+
+def _open_blob(blob_id: str):
+    """``(response headers, size, chunk iterator)`` for a blob from whichever layer holds it, or None."""
+    if blob_cache.enabled:
+        cached = blob_cache.get(blob_id)
+        if cached is not None:
+            headers, body = cached
+            return headers, len(body), [body]
+    small = segment_store.read(blob_id)
+    if small is not None:
+        metadata, body = small
+        return _response_headers(blob_id, metadata, len(body)), len(body), _verified(blob_id, iter([body]), metadata)
+    data_path, metadata = _find_blob(blob_id)
+    if data_path is None:
+        return None
+    try:
+        f = open(data_path, 'rb')
+    except OSError:
+        return None
+    if metadata.get(ENCODING_KEY) == 'gzip':
+        size = metadata[SIZE_KEY]
+        return _response_headers(blob_id, metadata, size), size, _verified(blob_id, iter_gunzip(f), metadata)
+    size = os.fstat(f.fileno()).st_size
+    return _response_headers(blob_id, metadata, size), size, _verified(blob_id, _iter_file(f, size), metadata)
+
+
+def _tar_member(blob_id: str, size: int, pax_headers: dict) -> bytes:
+    info = tarfile.TarInfo(blob_id)
+    info.size = size
+    info.mtime = int(time.time())
+    info.pax_headers = pax_headers
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+@file_server.route('/batch/get', methods=['POST'])
+def batch_get():
+    """Stream many blobs back as one tar; missing IDs come back as empty members marked 404."""
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not ids:
+        abort(400, 'Expected a JSON body with a list of ids')
+    if len(ids) > current_app.config['MAX_BATCH_COUNT']:
+        abort(413, 'Too many ids')
+    if not all(isinstance(i, str) and ID_PATTERN.fullmatch(i) for i in ids):
+        abort(400, 'Invalid blob ID')
+
+    def gen():
+        for blob_id in ids:
+            found = _open_blob(blob_id)
+            if found is None:
+                yield _tar_member(blob_id, 0, {TAR_HEADER_PREFIX + 'status': '404'})
+                continue
+            headers, size, chunks = found
+            pax = {TAR_HEADER_PREFIX + k: v for k, v in headers.items()
+                   if k in TAR_HEADERS or k.lower().startswith('x-rebase-')}
+            yield _tar_member(blob_id, size, pax)
+            sent = 0
+            for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+            # A blob that shrank mid-read is zero-filled so the archive stays well-formed
+            yield b'\0' * (size - sent) + b'\0' * (-size % tarfile.BLOCKSIZE)
+        yield b'\0' * (2 * tarfile.BLOCKSIZE)
+
+    return Response(stream_with_context(gen()), mimetype='application/x-tar')
+
+
+@file_server.route('/batch/put', methods=['POST'])
+def batch_put():
+    """Store every regular file of a tar body as a blob, under a single quota reservation."""
+    total_len = _content_length()
+    if total_len > current_app.config['MAX_BATCH_LENGTH']:
+        abort(413, 'Payload exceeds max batch length')
+    # The archive is larger than the blobs it carries, so its length covers all of them
+    reservation = quota.reserve(total_len)
+    if reservation is None:
+        abort(413, 'Disk quota exceeded')
+
+    results = []
+    try:
+        with tarfile.open(fileobj=request.stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    results.append({'id': member.name, 'status': _store_tar_member(tar, member, reservation)})
+    except tarfile.TarError:
+        abort(400, 'Invalid tar archive')
+    finally:
+        quota.release(reservation)
+    return jsonify({'results': results}), 200
+
+
+def _store_tar_member(tar, member, reservation) -> int:
+    blob_id = member.name
+    if not ID_PATTERN.fullmatch(blob_id):
+        return 400
+    try:
+        stored = _stored_headers({k[len(TAR_HEADER_PREFIX):]: v for k, v in member.pax_headers.items()
+                                  if k.startswith(TAR_HEADER_PREFIX)})
+        header_bytes = sum(len(n) + len(v) for n, v in stored.items())
+        if member.size + header_bytes > current_app.config['MAX_LENGTH']:
+            return 413
+        part = quota.split(reservation, member.size)
+        if part is None:
+            return 413
+        blob_dir = _compute_blob_dir(blob_id)
+        _store_blob(blob_id, blob_dir, stored, member.size, part, tar.extractfile(member))
+    except HTTPException as e:
+        return e.code
+    return 201
+
+
+@file_server.route('/stats', methods=['GET'])
+def storage_stats():
+    return jsonify({
+        'usage': {'used': quota.used, 'reserved': quota.reserved, 'limit': quota.limit},
+        'segments': segment_store.stats(),
+        'cache': blob_cache.stats(),
+        'trash': {'pending': trash.pending()},
+        'integrity': dict(scrub_stats, verify_reads=verify_reads),
+        # placed_bytes: per-file blob bodies the ring put on the disk; the rest is filesystem-wide
+        'disks': [dict(path=disk, weight=disk_ring.weights[disk], placed_bytes=usage_journal.disks.get(disk, 0),
+                       **shutil.disk_usage(disk)._asdict())
+                  for disk in disk_ring.disks],
+    })
@@ -3,7 +3,12 @@ import logging
 import logging.config
 from flask import Flask
 from assignment_3.config import LOGGING
-from assignment_3.api.v0.file_management_routes import file_server, init_usage
+from assignment_3.api.v0.file_management_routes import (
+    file_server, init_usage, init_content_store, init_segment_store, init_blob_cache, init_multipart,
+    init_blob_index, init_trash, init_durability, init_placement, init_rebalancer, init_integrity
+)
+from assignment_3.utils.durability import MODES
+from assignment_3.utils.placement import parse_data_dirs
 
 
 def make_app():
@@ -11,12 +16,39 @@ def make_app():
     app = Flask(__name__)
 
     # Application configuration
-    app.config['MAX_LENGTH'] = 10 * 1024 * 1024       # 10 MB per blob
+    app.config['MAX_LENGTH'] = 10 * 1024 * 1024       # 10 MB per blob (or per multipart part)
+    app.config['MAX_MULTIPART_LENGTH'] = 100 * 1024 * 1024 * 1024  # 100 GB per multipart blob
+    app.config['MULTIPART_EXPIRY'] = 24 * 60 * 60     # Incomplete uploads are dropped after a day
+    app.config['MULTIPART_CLEANUP_INTERVAL'] = 600    # Seconds between expiry sweeps
+    app.config['MAX_BATCH_COUNT'] = 10000             # IDs per batch get
+    app.config['MAX_BATCH_LENGTH'] = 1024 * 1024 * 1024  # 1 GB tar body per batch put
+    app.config['MAX_LIST_LIMIT'] = 1000               # IDs per listing page
     app.config['MAX_ID_LENGTH'] = 200                 # Max ID length
     app.config['MAX_HEADER_LENGTH'] = 50              # Max header name/value length
     app.config['MAX_HEADER_COUNT'] = 20               # Max number of stored headers
     app.config['MAX_DISK_QUOTA'] = 1 * 1024 * 1024 * 1024  # 1 GB total
-    app.config['DATA_DIR'] = 'data'                   # Storage root
+    app.config['QUOTA_SHARDS'] = 16                   # Lock shards for quota accounting
+    app.config['DEDUP'] = os.getenv('DEDUP', 'false').lower() == 'true'  # Store identical bodies once
+    app.config['CONTENT_GC_INTERVAL'] = 60            # Seconds between unreferenced-content sweeps
+    app.config['SEGMENT_STORE'] = os.getenv('SEGMENT_STORE', 'false').lower() == 'true'  # Pack small blobs
+    app.config['SEGMENT_MAX_BLOB_SIZE'] = 4 * 1024    # Blobs up to this size go to segments
+    app.config['SEGMENT_SIZE'] = 64 * 1024 * 1024     # Segment file roll-over size
+    app.config['SEGMENT_COMPACT_INTERVAL'] = 300      # Seconds between compaction passes
+    app.config['SEGMENT_COMPACT_RATIO'] = 0.5         # Compact segments at least this dead
+    app.config['CACHE_MAX_BYTES'] = int(os.getenv('CACHE_MAX_BYTES', '0'))  # Hot-blob cache budget, 0 = off
+    app.config['CACHE_MAX_OBJECT_SIZE'] = 256 * 1024  # Larger blobs are always streamed from disk
+    app.config['CACHE_CONTROL'] = 'no-cache'          # Sent on GET/HEAD; clients revalidate with the ETag
+    app.config['COMPRESS'] = os.getenv('COMPRESS', 'false').lower() == 'true'  # gzip text-like blobs at rest
+    app.config['COMPRESS_LEVEL'] = 6                  # zlib level for compression at rest
+    app.config['DATA_DIR'] = os.getenv('DATA_DIR', 'data')  # Storage root(s): "/mnt/a,/mnt/b=2" (path[=weight])
+    app.config['DURABILITY'] = os.getenv('DURABILITY', 'none')  # none | per-request | group fsync of uploads
+    app.config['DURABILITY_GROUP_INTERVAL'] = 0.005   # Seconds a group commit waits to batch fsyncs
+    app.config['TRASH_RECLAIM_INTERVAL'] = 5          # Seconds between sweeps of deleted blobs
+    app.config['TRASH_RECLAIM_RATE'] = 64 * 1024 * 1024  # Bytes/s the reclaimer may unlink (0 = no limit)
+    app.config['VERIFY_READS'] = os.getenv('VERIFY_READS', 'false').lower() == 'true'  # Checksum bodies as served
+    app.config['SCRUB_INTERVAL'] = 24 * 60 * 60       # Seconds between integrity scrubs (0 = off)
+    app.config['SCRUB_RATE'] = 16 * 1024 * 1024       # Bytes/s the scrubber may read (0 = no limit)
+    app.config['RECONCILE_USAGE'] = os.getenv('RECONCILE_USAGE', 'false').lower() == 'true'  # Full-walk repair
 
     # Logging setup
     logging.config.dictConfig(LOGGING)
@@ -27,7 +59,24 @@ def make_app():
     file_server.logger = logger
     app.register_blueprint(file_server, url_prefix='/api/v0')
 
-    init_usage(app.config['DATA_DIR'])
+    if app.config['DURABILITY'] not in MODES:
+        raise ValueError(f"DURABILITY must be one of {', '.join(MODES)}")
+    init_durability(app.config['DURABILITY'], app.config['DURABILITY_GROUP_INTERVAL'])
+    # Blobs are spread over every disk; internal state (journal, segments, index, ...) lives on the first
+    disks = parse_data_dirs(app.config['DATA_DIR'])
+    data_dir = disks[0][0]
+    init_placement(disks)
+    init_segment_store(data_dir, app.config['SEGMENT_SIZE'],
+                       app.config['SEGMENT_COMPACT_INTERVAL'], app.config['SEGMENT_COMPACT_RATIO'])
+    init_usage(data_dir, app.config['MAX_DISK_QUOTA'],
+               app.config['RECONCILE_USAGE'], app.config['QUOTA_SHARDS'])
+    init_content_store(data_dir, app.config['CONTENT_GC_INTERVAL'])
+    init_blob_index(data_dir)
+    init_trash(data_dir, app.config['TRASH_RECLAIM_INTERVAL'], app.config['TRASH_RECLAIM_RATE'])
+    init_blob_cache(app.config['CACHE_MAX_BYTES'], app.config['CACHE_MAX_OBJECT_SIZE'])
+    init_integrity(app.config['VERIFY_READS'], app.config['SCRUB_INTERVAL'], app.config['SCRUB_RATE'])
+    init_multipart(data_dir, app.config['MULTIPART_EXPIRY'], app.config['MULTIPART_CLEANUP_INTERVAL'])
+    init_rebalancer()
 
     return app
 
@@ -0,0 +1,198 @@
+import os
+import sys
+import asyncio
+import contextvars
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import HTTP_STATUS_CODES
+from assignment_3.app import make_app
+from assignment_3.api.v0.file_management_routes import refuse_body
+
+# asyncio front-end for the blob server: connections, slow request bodies and
+# slow readers are handled on the event loop; the Flask app (and with it all
+# validation and storage logic) runs in a small bounded thread pool, once a
+# request body has been fully received, and response chunks are pulled from
+# it one at a time so a stalled reader never holds a worker.
+
+WORKERS = int(os.getenv('ASYNC_WORKERS', '16'))
+READ_CHUNK = 64 * 1024
+SPOOL_IN_MEMORY = 1024 * 1024       # Larger request bodies spill to a temp file
+IDLE_TIMEOUT = 60                   # Seconds a keep-alive connection may sit idle
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class AsyncBlobServer:
+    def __init__(self, app, workers: int = WORKERS):
+        self.app = app
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blob-io')
+        self.urls = app.url_map.bind('localhost')  # Only used on the event loop
+        self.server = None
+
+    async def start(self, host: str, port: int):
+        self.server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+        return self.server
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self._serve_one(head, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_one(self, head: bytes, reader, writer) -> bool:
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ')
+            headers = [line.split(':', 1) for line in header_lines if line]
+            headers = [(name.strip(), value.strip()) for name, value in headers]
+        except ValueError:
+            await self._send_error(writer, 400)
+            return False
+        lookup = {name.lower(): value for name, value in headers}
+        keep_alive = version == 'HTTP/1.1' and lookup.get('connection', '').lower() != 'close'
+
+        if 'transfer-encoding' in lookup:
+            await self._send_error(writer, 411)  # The blob API is Content-Length only
+            return False
+        try:
+            length = int(lookup.get('content-length', 0))
+        except ValueError:
+            await self._send_error(writer, 400)
+            return False
+        # Route first, so each endpoint's own limit (and the quota) applies before any body is read
+        try:
+            endpoint, _ = self.urls.match(unquote(target.partition('?')[0], 'latin-1'), method)
+        except HTTPException:
+            endpoint = None  # The app answers 404/405 itself
+        status = refuse_body(self.app.config, endpoint, length)
+        if status:
+            await self._send_error(writer, status)
+            return False
+        if lookup.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+        body = await self._spool_body(reader, length)
+        try:
+            environ = self._environ(method, target, version, headers, body, writer)
+            status, response_headers, chunks = await self._run_app(environ)
+            return await self._send_response(writer, method, version, status, response_headers, chunks, keep_alive)
+        finally:
+            body.close()
+
+    async def _spool_body(self, reader, length: int):
+        loop = asyncio.get_running_loop()
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_IN_MEMORY)
+        received = 0
+        while received < length:
+            chunk = await reader.read(min(READ_CHUNK, length - received))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', length - received)
+            if received + len(chunk) > SPOOL_IN_MEMORY:
+                await loop.run_in_executor(self.pool, body.write, chunk)  # Spilled to disk
+            else:
+                body.write(chunk)
+            received += len(chunk)
+        body.seek(0)
+        return body
+
+    def _environ(self, method, target, version, headers, body, writer) -> dict:
+        path, _, query = target.partition('?')
+        host, port = (writer.get_extra_info('sockname') or ('', 0))[:2]
+        peer = writer.get_extra_info('peername') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(path, 'latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': host,
+            'SERVER_PORT': str(port),
+            'SERVER_PROTOCOL': version,
+            'REMOTE_ADDR': peer[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[key] = value
+            else:
+                key = 'HTTP_' + key
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def _run_app(self, environ: dict):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = response_headers
+
+        def call():
+            result = self.app(environ, start_response)
+            return result, iter(result)
+
+        # One context per request, entered by whichever worker runs the next step, so a
+        # stream_with_context generator sees the same context vars on every chunk
+        context = contextvars.copy_context()
+        result, chunks = await loop.run_in_executor(self.pool, context.run, call)
+        return started['status'], started['headers'], (context, result, chunks)
+
+    async def _send_response(self, writer, method, version, status, headers, chunks, keep_alive) -> bool:
+        loop = asyncio.get_running_loop()
+        context, result, iterator = chunks
+        names = {name.lower() for name, _ in headers}
+        chunked = 'content-length' not in names and method != 'HEAD' and version == 'HTTP/1.1'
+        if chunked:
+            headers = headers + [('Transfer-Encoding', 'chunked')]
+        elif 'content-length' not in names:
+            keep_alive = False
+        head = [f'{version} {status}'] + [f'{name}: {value}' for name, value in headers]
+        if not keep_alive:
+            head.append('Connection: close')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        try:
+            while True:
+                # One chunk per hop to the pool: a reader that stalls holds no worker while we drain
+                chunk = await loop.run_in_executor(self.pool, context.run, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk and method != 'HEAD':
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                    await writer.drain()
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+            await writer.drain()
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.pool, context.run, result.close)
+        return keep_alive
+
+    async def _send_error(self, writer, code: int):
+        reason = HTTP_STATUS_CODES.get(code, '')
+        writer.write(f'HTTP/1.1 {code} {reason}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+
+
+async def serve(host: str = '0.0.0.0', port: int = 50001, workers: int = WORKERS):
+    server = await AsyncBlobServer(make_app(), workers).start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve())
@@ -0,0 +1,80 @@
+import io
+import os
+import sys
+import json
+import time
+import tarfile
+import tempfile
+import threading
+import http.client
+from werkzeug.serving import make_server
+
+# python -m assignment_3.benchmarks.batch_throughput [count] [size] [batch]
+# Compares one request per blob against the batch endpoints on a local server.
+
+
+def _serve(data_dir: str):
+    os.environ['DATA_DIR'] = data_dir
+    from assignment_3.app import make_app
+    server = make_server('127.0.0.1', 0, make_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _request(conn, method: str, path: str, body: bytes = b'', headers=None) -> bytes:
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    if resp.status >= 300:
+        raise RuntimeError(f'{method} {path}: {resp.status}')
+    return data
+
+
+def _tar(ids, body: bytes) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w', format=tarfile.PAX_FORMAT) as tar:
+        for blob_id in ids:
+            info = tarfile.TarInfo(blob_id)
+            info.size = len(body)
+            tar.addfile(info, io.BytesIO(body))
+    return buf.getvalue()
+
+
+def main(count: int = 1000, size: int = 1024, batch: int = 100):
+    server = _serve(tempfile.mkdtemp(prefix='rebase-bench-'))
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port)
+    body = os.urandom(size)
+    ids = [f'blob{i}' for i in range(count)]
+    groups = [ids[i:i + batch] for i in range(0, count, batch)]
+    results = {}
+
+    start = time.perf_counter()
+    for blob_id in ids:
+        _request(conn, 'POST', f'/api/v0/blobs/{blob_id}', body)
+    results['single put'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for blob_id in ids:
+        _request(conn, 'GET', f'/api/v0/blobs/{blob_id}')
+    results['single get'] = time.perf_counter() - start
+
+    archives = [_tar(group, body) for group in groups]
+    start = time.perf_counter()
+    for archive in archives:
+        _request(conn, 'POST', '/api/v0/batch/put', archive)
+    results['batch put'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for group in groups:
+        _request(conn, 'POST', '/api/v0/batch/get', json.dumps({'ids': group}).encode(),
+                 {'Content-Type': 'application/json'})
+    results['batch get'] = time.perf_counter() - start
+
+    server.shutdown()
+    print(f'{count} blobs x {size} B, batches of {batch}')
+    for name, elapsed in results.items():
+        print(f'{name:>10}: {elapsed:7.3f}s  {count / elapsed:9.0f} blobs/s')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import http.client
+from werkzeug.serving import make_server
+
+# python -m assignment_3.benchmarks.durability_throughput [uploads] [size] [clients]
+# Uploads/sec against a local server for each DURABILITY mode.
+
+
+def _run_mode(mode: str, uploads: int, size: int, clients: int) -> float:
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='rebase-bench-')
+    os.environ['DURABILITY'] = mode
+    from assignment_3.app import make_app
+    server = make_server('127.0.0.1', 0, make_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = os.urandom(size)
+
+    def client(n: int):
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_port)
+        for i in range(n, uploads, clients):
+            conn.request('POST', f'/api/v0/blobs/{mode}-{i}', body=body)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 201:
+                raise RuntimeError(f'upload {i}: {resp.status}')
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    return uploads / elapsed
+
+
+def main(uploads: int = 2000, size: int = 16 * 1024, clients: int = 16):
+    print(f'{uploads} uploads x {size} B, {clients} concurrent clients')
+    for mode in ('none', 'per-request', 'group'):
+        print(f'{mode:>12}: {_run_mode(mode, uploads, size, clients):8.0f} uploads/s')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
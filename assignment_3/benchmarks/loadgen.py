@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import http.client
+from typing import Callable, Dict, List, Optional, Tuple
+
+# python -m assignment_3.benchmarks.loadgen --mix upload=50,download=40,delete=10 \
+#     --sizes 1024:5,65536:3,1048576:1 --concurrency 32 --duration 30
+# Drives a locally started make_app() with a mix of uploads, downloads and
+# deletes and prints throughput, latency percentiles and error rates as JSON.
+# A download of a key that another worker deleted mid-flight is reported as
+# "raced", not as an error.
+# Logging goes to the console (TESTING=true), so no logz.io key is needed.
+
+OPS = ('upload', 'download', 'delete')
+EXPECTED = {'upload': 201, 'download': 200, 'delete': 204}
+PERCENTILES = (50, 95, 99)
+OK, ERROR, RACED = 'ok', 'error', 'raced'
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """``upload=50,download=40,delete=10`` -> op weights."""
+    mix = {}
+    for item in spec.split(','):
+        op, _, weight = item.strip().partition('=')
+        if op not in OPS or not weight.isdigit():
+            raise ValueError(f'Invalid mix entry: {item!r}')
+        mix[op] = int(weight)
+    if not any(mix.values()):
+        raise ValueError(f'Empty mix: {spec!r}')
+    return mix
+
+
+def parse_sizes(spec: str):
+    """Blob size distribution; returns a ``sample(rng) -> int``.
+
+    ``fixed:N``, ``uniform:A-B`` or a weighted list ``N:W,N:W,...``.
+    """
+    kind, _, arg = spec.partition(':')
+    if kind == 'fixed':
+        size = int(arg)
+        return lambda rng: size
+    if kind == 'uniform':
+        low, _, high = arg.partition('-')
+        low, high = int(low), int(high)
+        if low > high:
+            raise ValueError(f'Invalid size range: {spec!r}')
+        return lambda rng: rng.randint(low, high)
+    sizes, weights = [], []
+    for item in spec.split(','):
+        size, _, weight = item.partition(':')
+        sizes.append(int(size))
+        weights.append(int(weight) if weight else 1)
+    return lambda rng: rng.choices(sizes, weights)[0]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class _Keys:
+    """IDs known to exist on the server, shared by all workers."""
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._live = set()
+        self._lock = threading.Lock()
+
+    def add(self, blob_id: str):
+        with self._lock:
+            self._ids.append(blob_id)
+            self._live.add(blob_id)
+
+    def __contains__(self, blob_id: str) -> bool:
+        with self._lock:
+            return blob_id in self._live
+
+    def pick(self, rng) -> Optional[str]:
+        with self._lock:
+            return rng.choice(self._ids) if self._ids else None
+
+    def take(self, rng) -> Optional[str]:
+        with self._lock:
+            if not self._ids:
+                return None
+            i = rng.randrange(len(self._ids))
+            self._ids[i], self._ids[-1] = self._ids[-1], self._ids[i]
+            blob_id = self._ids.pop()
+            self._live.discard(blob_id)
+            return blob_id
+
+
+class _Worker(threading.Thread):
+    def __init__(self, n: int, port: int, mix: Dict[str, int], sample_size, keys: _Keys,
+                 payload: bytes, measure_from: float, deadline: float, seed: int):
+        super().__init__(name=f'loadgen-{n}', daemon=True)
+        self.n = n
+        self.port = port
+        self.ops, self.weights = zip(*mix.items())
+        self.sample_size = sample_size
+        self.keys = keys
+        self.payload = payload
+        self.measure_from = measure_from
+        self.deadline = deadline
+        self.rng = random.Random(seed + n)
+        self.samples: List[Tuple[str, float, str]] = []  # (op, seconds, OK | ERROR | RACED)
+        self.uploaded = 0
+
+    def run(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            while time.monotonic() < self.deadline:
+                op = self.rng.choices(self.ops, self.weights)[0]
+                start = time.monotonic()
+                try:
+                    op, outcome = self._request(conn, op)
+                except (OSError, http.client.HTTPException):
+                    outcome = ERROR
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                if start >= self.measure_from:
+                    self.samples.append((op, time.monotonic() - start, outcome))
+        finally:
+            conn.close()
+
+    def _request(self, conn, op: str) -> Tuple[str, str]:
+        blob_id = None
+        if op == 'download':
+            blob_id = self.keys.pick(self.rng)
+        elif op == 'delete':
+            blob_id = self.keys.take(self.rng)
+        if blob_id is None:
+            op = 'upload'  # Nothing to read or delete yet
+        if op == 'upload':
+            blob_id = f'lg-{self.n}-{self.uploaded}'
+            self.uploaded += 1
+            size = self.sample_size(self.rng)
+            conn.request('POST', f'/api/v0/blobs/{blob_id}', body=_body(self.payload, size))
+        elif op == 'download':
+            conn.request('GET', f'/api/v0/blobs/{blob_id}')
+        else:
+            conn.request('DELETE', f'/api/v0/blobs/{blob_id}')
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == EXPECTED[op]:
+            if op == 'upload':
+                self.keys.add(blob_id)
+            return op, OK
+        if op == 'download' and resp.status == 404 and blob_id not in self.keys:
+            return op, RACED  # Deleted by another worker after we picked it
+        return op, ERROR
+
+
+def _body(payload: bytes, size: int) -> bytes:
+    if size <= len(payload):
+        return payload[:size]
+    return (payload * (size // len(payload) + 1))[:size]
+
+
+def _start_server(kind: str, workers: int) -> Tuple[int, Callable[[], None]]:
+    """Start make_app() on an ephemeral port; returns (port, stop)."""
+    from assignment_3.app import make_app
+    app = make_app()
+    if kind == 'threaded':
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server.server_port, server.shutdown
+
+    from assignment_3.async_server import AsyncBlobServer
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncBlobServer(app, workers).start('127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def shutdown():
+        server.close()
+        # Clients have hung up by now, so connection handlers finish on their own
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if handlers:
+            _, stuck = await asyncio.wait(handlers, timeout=5)
+            for task in stuck:
+                task.cancel()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return server.sockets[0].getsockname()[1], stop
+
+
+def _summarise(samples: List[Tuple[str, float, str]], elapsed: float) -> dict:
+    latencies = sorted(s for _, s, _ in samples)
+    errors = sum(1 for _, _, outcome in samples if outcome == ERROR)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'raced': sum(1 for _, _, outcome in samples if outcome == RACED),
+        'error_rate': round(errors / len(samples), 6) if samples else 0.0,
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            **{f'p{p}': round(percentile(latencies, p) * 1000, 3) for p in PERCENTILES},
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def run(mix: Dict[str, int], sizes: str, concurrency: int, duration: float, warmup: float = 0,
+        preload: int = 0, server: str = 'threaded', server_workers: int = 16, seed: int = 0) -> dict:
+    """Run one load test against a fresh local server and return the report."""
+    sample_size = parse_sizes(sizes)
+    port, stop = _start_server(server, server_workers)
+    keys = _Keys()
+    payload = random.Random(seed).randbytes(1024 * 1024)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        rng = random.Random(seed)
+        for i in range(preload):
+            conn.request('POST', f'/api/v0/blobs/lg-pre-{i}', body=_body(payload, sample_size(rng)))
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 201:
+                keys.add(f'lg-pre-{i}')
+        conn.close()
+
+        start = time.monotonic()
+        measure_from = start + warmup
+        deadline = measure_from + duration
+        workers = [_Worker(n, port, mix, sample_size, keys, payload, measure_from, deadline, seed)
+                   for n in range(concurrency)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = max(time.monotonic(), deadline) - measure_from
+    finally:
+        stop()
+
+    samples = [s for w in workers for s in w.samples]
+    report = {
+        'config': {'mix': mix, 'sizes': sizes, 'concurrency': concurrency, 'duration': duration,
+                   'warmup': warmup, 'preload': preload, 'server': server, 'seed': seed},
+        'elapsed': round(elapsed, 3),
+        'total': _summarise(samples, elapsed),
+        'ops': {op: _summarise([s for s in samples if s[0] == op], elapsed)
+                for op in OPS if any(s[0] == op for s in samples)},
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test a local blob server.')
+    parser.add_argument('--mix', default='upload=50,download=40,delete=10',
+                        help='op weights, e.g. upload=50,download=40,delete=10')
+    parser.add_argument('--sizes', default='fixed:16384',
+                        help='fixed:N | uniform:A-B | N:W,N:W,... (bytes:weight)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=0, help='seconds run but not measured')
+    parser.add_argument('--preload', type=int, default=100, help='blobs uploaded before the run')
+    parser.add_argument('--server', choices=('threaded', 'async'), default='threaded')
+    parser.add_argument('--server-workers', type=int, default=16, help='pool size for --server async')
+    parser.add_argument('--data-dir', help='DATA_DIR for the server (default: a fresh temp dir)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('TESTING', 'true')
+    os.environ['DATA_DIR'] = args.data_dir or tempfile.mkdtemp(prefix='rebase-loadgen-')
+    try:
+        mix = parse_mix(args.mix)
+        parse_sizes(args.sizes)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run(mix, args.sizes, args.concurrency, args.duration, args.warmup, args.preload,
+                 args.server, args.server_workers, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            out.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+from werkzeug.serving import make_server
+
+# python -m assignment_3.benchmarks.slow_clients [clients] [size] [delay_ms]
+# Many clients that upload, then download, one blob in small slices with pauses
+# in between; compares the threaded make_app() server with the asyncio one.
+
+SLICE = 1024
+CLIENT_TIMEOUT = 60  # A client stuck longer than this counts as failed
+
+
+async def _slow_client(port: int, n: int, body: bytes, delay: float) -> bool:
+    async def both():
+        return await _slow_upload(port, n, body, delay) and await _slow_download(port, n, len(body), delay)
+    return await asyncio.wait_for(both(), CLIENT_TIMEOUT)
+
+
+async def _slow_upload(port: int, n: int, body: bytes, delay: float) -> bool:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'POST /api/v0/blobs/slow{n} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n\r\n'.encode())
+        for i in range(0, len(body), SLICE):
+            writer.write(body[i:i + SLICE])
+            await writer.drain()
+            await asyncio.sleep(delay)
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        await reader.readexactly(length)
+        return b' 201 ' in head.split(b'\r\n')[0]
+    finally:
+        writer.close()
+
+
+async def _slow_download(port: int, n: int, size: int, delay: float) -> bool:
+    # A fresh connection: the threaded dev server speaks HTTP/1.0 and closes after each response
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET /api/v0/blobs/slow{n} HTTP/1.1\r\nHost: x\r\n\r\n'.encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        received = 0
+        while received < size:
+            data = await reader.read(SLICE)
+            if not data:
+                return False
+            received += len(data)
+            await asyncio.sleep(delay)
+        return b' 200 ' in head.split(b'\r\n')[0]
+    finally:
+        writer.close()
+
+
+def _run(start_server, clients: int, size: int, delay: float):
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='rebase-bench-')
+    port, stop = start_server()
+    peak = [threading.active_count()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak[0] = max(peak[0], threading.active_count())
+
+    threading.Thread(target=sample, daemon=True).start()
+    body = os.urandom(size)
+
+    async def run_all():
+        return await asyncio.gather(*(_slow_client(port, n, body, delay) for n in range(clients)),
+                                    return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    done.set()
+    stop()
+    return sum(r is True for r in results), elapsed, peak[0]
+
+
+def _threaded():
+    from assignment_3.app import make_app
+    server = make_server('127.0.0.1', 0, make_app(), threaded=True)
+    server.socket.listen(4096)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port, server.shutdown
+
+
+def _async():
+    from assignment_3.app import make_app
+    from assignment_3.async_server import AsyncBlobServer
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncBlobServer(make_app()).start('127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def stop():
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+
+    return server.sockets[0].getsockname()[1], stop
+
+
+def main(clients: int = 1000, size: int = 32 * 1024, delay_ms: int = 20):
+    print(f'{clients} slow clients, {size} B up and down in {SLICE} B slices every {delay_ms} ms')
+    for name, start_server in (('threaded', _threaded), ('asyncio', _async)):
+        ok, elapsed, peak = _run(start_server, clients, size, delay_ms / 1000)
+        print(f'{name:>9}: {ok}/{clients} ok in {elapsed:6.2f}s, peak {peak} threads', flush=True)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
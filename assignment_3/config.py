@@ -2,10 +2,44 @@ import os
 import logging.config
 
 LOGZIO_API_KEY = os.getenv("logzIO_api_key")
-if not LOGZIO_API_KEY:
+
+# Offline runs (load tests, local benchmarks) log to the console instead of logz.io
+IS_TESTING = os.getenv("TESTING", "false").lower() == "true"
+
+if not LOGZIO_API_KEY and not IS_TESTING:
     raise RuntimeError("Missing environment variable: LOGZIO_API_KEY")
 
-LOGGING = {
+TEST_LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '%(levelname)s - %(message)s',
+        }
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'level': 'WARNING',
+            'formatter': 'simple',
+            'stream': 'ext://sys.stderr'
+        }
+    },
+    'loggers': {
+        '': {
+            'level': 'DEBUG',
+            'handlers': ['console'],
+            'propagate': True
+        },
+        'werkzeug': {
+            'level': 'ERROR',
+            'handlers': [],
+            'propagate': False
+        }
+    }
+}
+
+PRODUCTION_LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
@@ -36,4 +70,4 @@ LOGGING = {
     }
 }
 
-
+LOGGING = TEST_LOGGING if IS_TESTING else PRODUCTION_LOGGING
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+GENERATION_STRIPES = 256
+
+
+class BlobCache:
+    """Byte-budgeted LRU cache of whole blob bodies (and their response headers).
+
+    Writers call ``invalidate``; readers take a ``token`` before going to disk and
+    hand it back to ``put``, which drops the entry if the blob was invalidated in
+    between, so a slow reader can never re-cache a body that was just replaced.
+    """
+
+    def __init__(self, max_bytes: int, max_object_size: int):
+        self.max_bytes = max_bytes
+        self.max_object_size = max_object_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generations = [0] * GENERATION_STRIPES
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def accepts(self, size: int) -> bool:
+        return self.enabled and size <= min(self.max_object_size, self.max_bytes)
+
+    def get(self, blob_id: str) -> Optional[Tuple[dict, bytes]]:
+        with self._lock:
+            entry = self._entries.get(blob_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(blob_id)
+            self.hits += 1
+            return entry
+
+    def token(self, blob_id: str) -> int:
+        return self._generations[hash(blob_id) % GENERATION_STRIPES]
+
+    def put(self, blob_id: str, headers: dict, body: bytes, token: int):
+        if not self.accepts(len(body)):
+            return
+        with self._lock:
+            if self._generations[hash(blob_id) % GENERATION_STRIPES] != token:
+                return
+            old = self._entries.pop(blob_id, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[blob_id] = (headers, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, blob_id: str):
+        with self._lock:
+            self._generations[hash(blob_id) % GENERATION_STRIPES] += 1
+            old = self._entries.pop(blob_id, None)
+            if old is not None:
+                self.size -= len(old[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,153 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+from assignment_3.utils.compression import SIZE_KEY
+from assignment_3.utils.content_store import ContentStore, CONTENT_KEY
+
+INDEX_DIR = '_index'
+INDEX_FILE = 'blobs.sqlite3'
+INDEX_VERSION = 1        # PRAGMA user_version once the table reflects the whole tree
+OPEN_MARKER = 'open'     # Exists while a server has the index open; one left behind means it crashed
+
+
+class BlobIndex:
+    """Sorted ``blob ID -> size`` table in SQLite, kept up to date on upload/delete.
+
+    Listing is a range scan on the primary key, so a page costs O(limit) no
+    matter how many blobs are stored. A fresh index (``needs_rebuild``) is
+    filled once from disk with ``rebuild``.
+
+    The table is written after the blob itself and commits with
+    synchronous=NORMAL, so a crash can leave it behind the disk. An index that
+    was not closed cleanly opens ``stale``; ``reconcile`` then repairs it from a
+    disk walk while uploads and deletes carry on.
+    """
+
+    def __init__(self, data_dir: str):
+        index_dir = os.path.join(os.path.abspath(data_dir), INDEX_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(index_dir, INDEX_FILE), check_same_thread=False,
+                                   isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')  # WAL keeps it consistent; a crash may lose the tail
+            self._db.execute('CREATE TABLE IF NOT EXISTS blobs (id TEXT PRIMARY KEY, size INTEGER NOT NULL) '
+                             'WITHOUT ROWID')
+            self.needs_rebuild = self._db.execute('PRAGMA user_version').fetchone()[0] < INDEX_VERSION
+        self._marker = os.path.join(index_dir, OPEN_MARKER)
+        self.stale = not self.needs_rebuild and os.path.exists(self._marker)
+        with open(self._marker, 'w') as mf:
+            os.fsync(mf.fileno())
+        self._touched: Optional[set] = None   # IDs written while a reconcile walks the disk
+        self._closed = False
+
+    def put(self, blob_id: str, size: int):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO blobs (id, size) VALUES (?, ?)', (blob_id, size))
+            if self._touched is not None:
+                self._touched.add(blob_id)
+
+    def delete(self, blob_id: str):
+        with self._lock:
+            self._db.execute('DELETE FROM blobs WHERE id = ?', (blob_id,))
+            if self._touched is not None:
+                self._touched.add(blob_id)
+
+    def list(self, prefix: str = '', after: str = '', limit: int = 100) -> List[Tuple[str, int]]:
+        """Up to ``limit`` ``(id, size)`` pairs in ID order, starting with ``prefix``, strictly after ``after``."""
+        lower = max(prefix, after)
+        sql = 'SELECT id, size FROM blobs WHERE id >= ? AND id != ?'
+        args = [lower, after]
+        if prefix:
+            # IDs are ASCII, so bumping the last character gives the end of the prefix range
+            sql += ' AND id < ?'
+            args.append(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        sql += ' ORDER BY id LIMIT ?'
+        args.append(limit)
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def rebuild(self, blobs: Iterable[Tuple[str, int]]):
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.execute('DELETE FROM blobs')
+                self._db.executemany('INSERT OR REPLACE INTO blobs (id, size) VALUES (?, ?)', blobs)
+                self._db.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self.needs_rebuild = False
+
+    def reconcile(self, blobs: Iterable[Tuple[str, int]]) -> Tuple[int, int]:
+        """Repair the table from ``blobs`` (a disk walk); returns ``(added or resized, removed)``.
+
+        IDs uploaded or deleted while the walk runs are left as they are: their
+        ``put``/``delete`` is newer than anything the walk saw.
+        """
+        with self._lock:
+            self._touched = set()
+        try:
+            on_disk = dict(blobs)
+            with self._lock:
+                self._db.execute('BEGIN')
+                try:
+                    indexed = dict(self._db.execute('SELECT id, size FROM blobs'))
+                    gone = [(blob_id,) for blob_id in indexed
+                            if blob_id not in on_disk and blob_id not in self._touched]
+                    missing = [(blob_id, size) for blob_id, size in on_disk.items()
+                               if indexed.get(blob_id) != size and blob_id not in self._touched]
+                    self._db.executemany('DELETE FROM blobs WHERE id = ?', gone)
+                    self._db.executemany('INSERT OR REPLACE INTO blobs (id, size) VALUES (?, ?)', missing)
+                    self._db.execute('COMMIT')
+                except Exception:
+                    self._db.execute('ROLLBACK')
+                    raise
+                self.stale = False
+                return len(missing), len(gone)
+        finally:
+            with self._lock:
+                self._touched = None
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._db.close()   # Checkpoints the WAL, so nothing committed is lost
+        try:
+            os.remove(self._marker)
+        except FileNotFoundError:
+            pass   # The index dir was removed under us
+
+
+def walk_blobs(data_dir: str, blob_dirs: Optional[List[str]] = None):
+    """Yield ``(blob_id, size)`` for every per-file or deduplicated blob; ``blob_dirs`` defaults to DATA_DIR."""
+    content = ContentStore(os.path.abspath(data_dir))
+    for disk in blob_dirs or [data_dir]:
+        yield from _walk_disk(os.path.abspath(disk), content)
+
+
+def _walk_disk(root: str, content: ContentStore):
+    for dp, dirs, files in os.walk(root):
+        if dp == root:
+            dirs[:] = [d for d in dirs if not d.startswith('_')]
+        if 'data' not in files and 'metadata.json' not in files:
+            continue
+        try:
+            metadata = {}
+            if 'metadata.json' in files:
+                with open(os.path.join(dp, 'metadata.json'), 'r', encoding='utf-8') as mf:
+                    metadata = json.load(mf)
+            if SIZE_KEY in metadata:
+                yield os.path.basename(dp), metadata[SIZE_KEY]  # Compressed at rest
+            elif 'data' in files:
+                yield os.path.basename(dp), os.path.getsize(os.path.join(dp, 'data'))
+            elif CONTENT_KEY in metadata:
+                yield os.path.basename(dp), os.path.getsize(content.path(metadata[CONTENT_KEY]))
+        except (OSError, ValueError):
+            continue
@@ -0,0 +1,55 @@
+import os
+import zlib
+from typing import Optional
+
+ENCODING_KEY = '_encoding'   # Metadata: how the data file is encoded at rest
+SIZE_KEY = '_size'           # Metadata: logical (decoded) size of an encoded blob
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+CHUNK_SIZE = 64 * 1024
+
+# Bodies in these types routinely shrink 5-10x; anything else is stored as-is
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/xml', 'application/javascript', 'application/x-ndjson',
+    'application/yaml', 'application/x-yaml', 'application/csv', 'image/svg+xml',
+}
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    mime = content_type.split(';', 1)[0].strip().lower()
+    return mime.startswith('text/') or mime in COMPRESSIBLE_TYPES or mime.endswith(('+json', '+xml'))
+
+
+def gzip_compressor(level: int = 6):
+    return zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+
+def iter_gunzip(source):
+    """Stream the decompressed body of a gzip file (a path, or a binary file object it then closes)."""
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    with open(source, 'rb') if isinstance(source, str) else source as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def gunzip_file(path: str):
+    """Decompress a gzip file in place (via a temp file and rename)."""
+    raw_path = path + '.raw'
+    with open(raw_path, 'wb') as out:
+        for data in iter_gunzip(path):
+            out.write(data)
+    os.replace(raw_path, path)
+
+
+def gzip_etag(etag: str) -> str:
+    """ETag of the gzip representation, distinct from the identity one so caches never mix them."""
+    return etag[:-1] + '-gzip"' if etag.endswith('"') else etag
@@ -0,0 +1,125 @@
+import os
+import uuid
+import threading
+from typing import List, Tuple
+
+CAS_DIR = '_cas'
+TMP_DIR = 'tmp'
+REFS_SUFFIX = '.refs'
+LOCK_STRIPES = 64
+CONTENT_KEY = '_sha256'  # Metadata key of a deduplicated blob's content pointer
+
+
+class ContentStore:
+    """Content-addressed blob bodies stored once per SHA-256, with reference counts.
+
+    Layout: ``_cas/<2 hex>/<2 hex>/<sha256>`` holds the bytes and
+    ``<sha256>.refs`` the number of blob IDs pointing at it. Content whose count
+    drops to zero stays on disk (and in the quota) until ``collect`` runs.
+    """
+
+    def __init__(self, data_dir: str):
+        self.root = os.path.join(os.path.abspath(data_dir), CAS_DIR)
+        self.tmp_dir = os.path.join(self.root, TMP_DIR)
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._pending_lock = threading.Lock()
+        self._pending = set()     # digests that hit zero references since the last collect
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def new_temp_path(self) -> str:
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def add(self, temp_path: str, digest: str) -> bool:
+        """Adopt a fully written temp file as ``digest`` and take a reference.
+
+        Returns True if the content is new, False if it was already stored (the
+        temp file is discarded).
+        """
+        path = self.path(digest)
+        with self._lock(digest):
+            if os.path.isfile(path):
+                os.remove(temp_path)
+                self._write_refs(digest, self._read_refs(digest) + 1)
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            self._write_refs(digest, 1)
+            return True
+
+    def decref(self, digest: str) -> int:
+        with self._lock(digest):
+            refs = max(0, self._read_refs(digest) - 1)
+            self._write_refs(digest, refs)
+        if refs == 0:
+            with self._pending_lock:
+                self._pending.add(digest)
+        return refs
+
+    def refs(self, digest: str) -> int:
+        return self._read_refs(digest)
+
+    def collect(self, full: bool = False) -> List[Tuple[str, int]]:
+        """Delete unreferenced content; returns ``[(digest, size), ...]`` reclaimed.
+
+        By default only digests released since the last run are checked; ``full``
+        scans every refcount file (startup / repair).
+        """
+        with self._pending_lock:
+            candidates, self._pending = self._pending, set()
+        if full:
+            candidates |= set(self._all_digests())
+        freed = []
+        for digest in candidates:
+            path = self.path(digest)
+            with self._lock(digest):
+                if self._read_refs(digest) > 0:
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    size = None
+                try:
+                    os.remove(path + REFS_SUFFIX)
+                except OSError:
+                    pass
+            if size is not None:
+                freed.append((digest, size))
+        return freed
+
+    def walk_usage(self) -> int:
+        usage = 0
+        for digest in self._all_digests():
+            try:
+                usage += os.path.getsize(self.path(digest))
+            except OSError:
+                pass
+        return usage
+
+    def _all_digests(self):
+        for dp, dirs, files in os.walk(self.root):
+            if dp == self.root:
+                dirs[:] = [d for d in dirs if d != TMP_DIR]
+            for f in files:
+                if f.endswith(REFS_SUFFIX):
+                    yield f[:-len(REFS_SUFFIX)]
+
+    def _lock(self, digest: str) -> threading.Lock:
+        return self._locks[int(digest[:4], 16) % LOCK_STRIPES]
+
+    def _read_refs(self, digest: str) -> int:
+        try:
+            with open(self.path(digest) + REFS_SUFFIX, 'r', encoding='utf-8') as rf:
+                return int(rf.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_refs(self, digest: str, refs: int):
+        refs_path = self.path(digest) + REFS_SUFFIX
+        tmp_path = refs_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as rf:
+            rf.write(str(refs))
+        os.replace(tmp_path, refs_path)
@@ -0,0 +1,84 @@
+import os
+import threading
+from typing import Iterable, List
+
+NONE, PER_REQUEST, GROUP = 'none', 'per-request', 'group'
+MODES = (NONE, PER_REQUEST, GROUP)
+
+
+def fsync_paths(paths: Iterable[str]) -> List[str]:
+    """fsync each file or directory; returns the paths that failed."""
+    failed = []
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            failed.append(path)
+    return failed
+
+
+class _Waiter:
+    __slots__ = ('paths', 'event', 'failed')
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.event = threading.Event()
+        self.failed = False
+
+
+class GroupCommitter:
+    """Batches the fsyncs of concurrent uploads.
+
+    ``sync`` queues a request's paths and blocks. Once something is queued the
+    committer waits ``interval`` seconds for more to arrive, fsyncs every
+    distinct path once and wakes all the waiters together, so N concurrent
+    uploads of one bucket cost one fsync of that bucket instead of N.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.batches = 0
+        self._pending: List[_Waiter] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, name='group-commit', daemon=True).start()
+
+    def sync(self, paths: List[str]):
+        waiter = _Waiter(paths)
+        with self._lock:
+            if self._stop.is_set():
+                raise RuntimeError('Group committer is closed')
+            self._pending.append(waiter)
+        self._wake.set()
+        waiter.event.wait()
+        if waiter.failed:
+            raise OSError('fsync failed')
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            stopping = self._stop.wait(self.interval)
+            self._wake.clear()
+            self._flush()
+            if stopping:
+                break
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        failed = set(fsync_paths(dict.fromkeys(p for w in batch for p in w.paths)))
+        self.batches += 1
+        for waiter in batch:
+            waiter.failed = any(p in failed for p in waiter.paths)
+            waiter.event.set()
@@ -0,0 +1,168 @@
+import zlib
+import base64
+import binascii
+from typing import Dict, Iterable, Optional
+
+try:
+    import crc32c
+except ImportError:
+    crc32c = None
+
+from assignment_3.utils.throttle import Throttle
+
+CHECKSUM_KEY = '_checksum'   # Metadata: "<algorithm>:<hex>" of the logical (decoded) body
+CRC32C, CRC32 = 'crc32c', 'crc32'
+POLYNOMIALS = {CRC32C: 0x82F63B78, CRC32: 0xEDB88320}   # Reflected, as both libraries compute them
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+CHUNK_SIZE = 64 * 1024
+
+
+class IntegrityError(ValueError):
+    pass
+
+
+class Checksum:
+    """Running CRC of a body: CRC32C when the ``crc32c`` package is installed, else zlib's CRC-32."""
+
+    def __init__(self, algorithm: Optional[str] = None):
+        self.algorithm = algorithm or (CRC32C if crc32c else CRC32)
+        self.value = 0
+
+    def update(self, data: bytes):
+        if self.algorithm == CRC32C:
+            self.value = crc32c.crc32c(data, self.value)
+        else:
+            self.value = zlib.crc32(data, self.value)
+
+    def combine(self, value: int, length: int):
+        """Extend the checksum by a ``length``-byte block whose own checksum is ``value``, without its bytes."""
+        self.value = crc_combine(self.value, value, length, POLYNOMIALS[self.algorithm])
+
+    def digest(self) -> bytes:
+        return self.value.to_bytes(4, 'big')
+
+    def token(self) -> str:
+        return f'{self.algorithm}:{self.value:08x}'
+
+
+def _gf2_times(matrix, vector: int) -> int:
+    total, i = 0, 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return total
+
+
+def crc_combine(crc1: int, crc2: int, length2: int, polynomial: int) -> int:
+    """CRC of ``A + B`` from ``crc(A)``, ``crc(B)`` and ``len(B)`` (zlib's crc32_combine, any reflected CRC-32)."""
+    if length2 <= 0:
+        return crc1
+    # Operator for one zero bit, squared up to the operators for 2, 4, 8... zero bits
+    odd = [polynomial] + [1 << n for n in range(31)]
+    even = [_gf2_times(odd, row) for row in odd]
+    odd = [_gf2_times(even, row) for row in even]
+    while True:
+        # Apply length2 zero bytes to crc1, one bit of length2 at a time
+        even = [_gf2_times(odd, row) for row in odd]
+        if length2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+        odd = [_gf2_times(even, row) for row in even]
+        if length2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+    return crc1 ^ crc2
+
+
+def checksum_for(token: Optional[str]) -> Optional[Checksum]:
+    """A fresh ``Checksum`` to verify ``token`` against, or None if it can't be checked here."""
+    algorithm = (token or '').partition(':')[0]
+    if algorithm == CRC32 or (algorithm == CRC32C and crc32c):
+        return Checksum(algorithm)
+    return None
+
+
+def parse_digest(header: str) -> Dict[str, bytes]:
+    """``Digest: sha-256=<b64>, crc32c=<b64>`` (RFC 3230) -> ``{algorithm: raw digest}``."""
+    digests = {}
+    for item in header.split(','):
+        algorithm, sep, value = item.strip().partition('=')
+        if not sep:
+            raise ValueError(f'Invalid Digest: {header!r}')
+        try:
+            # RFC 9530 wraps the value in colons
+            digests[algorithm.lower()] = base64.b64decode(value.strip().strip(':'), validate=True)
+        except binascii.Error:
+            raise ValueError(f'Invalid Digest: {header!r}')
+    return digests
+
+
+def check_digest(expected: Dict[str, bytes], sha256, checksum: Checksum):
+    """Compare a client's digests with what was computed; raises ``IntegrityError`` on a mismatch.
+
+    Algorithms we don't compute are ignored, as RFC 3230 allows.
+    """
+    computed = {'sha-256': sha256.digest(), checksum.algorithm: checksum.digest()}
+    for algorithm, value in expected.items():
+        if algorithm in computed and computed[algorithm] != value:
+            raise IntegrityError(f'{algorithm} digest mismatch')
+
+
+def verify_body(body: bytes, token: Optional[str]):
+    checksum = checksum_for(token)
+    if checksum is not None:
+        checksum.update(body)
+        if checksum.token() != token:
+            raise IntegrityError(f'Checksum mismatch: {checksum.token()} != {token}')
+
+
+def iter_verified(chunks: Iterable[bytes], token: Optional[str], gzipped: bool = False):
+    """Pass ``chunks`` through, checking the body against ``token`` once the last one is out.
+
+    A mismatch raises ``IntegrityError`` from the generator, which cuts the response
+    short; with ``gzipped`` the chunks are the stored gzip stream and are decoded
+    alongside to checksum the logical body.
+    """
+    checksum = checksum_for(token)
+    if checksum is None:
+        yield from chunks
+        return
+    decompressor = zlib.decompressobj(GZIP_WBITS) if gzipped else None
+    for chunk in chunks:
+        checksum.update(decompressor.decompress(chunk) if decompressor else chunk)
+        yield chunk
+    if decompressor:
+        checksum.update(decompressor.flush())
+    if checksum.token() != token:
+        raise IntegrityError(f'Checksum mismatch: {checksum.token()} != {token}')
+
+
+def verify_file(path: str, token: str, gzipped: bool = False, throttle: Throttle = None) -> Optional[bool]:
+    """Re-read a stored file and check it; None if the token can't be checked here.
+
+    Raises ``OSError`` if the file is unreadable.
+    """
+    checksum = checksum_for(token)
+    if checksum is None:
+        return None
+    decompressor = zlib.decompressobj(GZIP_WBITS) if gzipped else None
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            try:
+                checksum.update(decompressor.decompress(chunk) if decompressor else chunk)
+            except zlib.error:
+                return False
+            if throttle and throttle.consume(len(chunk)):
+                return None  # Stopped half-way: unknown
+    if decompressor:
+        checksum.update(decompressor.flush())
+    return checksum.token() == token
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from typing import List, Optional, Tuple
+
+UPLOADS_DIR = '_uploads'
+MANIFEST = 'manifest.json'
+CLAIMED = 'manifest.completing'
+PART_NAME = 'part.%05d'
+ETAG_SUFFIX = '.sha256'
+CHECKSUM_SUFFIX = '.crc'        # integrity.Checksum token of the part, combined into the blob's on completion
+MAX_PART_NUMBER = 10000
+COPY_CHUNK = 1024 * 1024
+
+
+class MultipartUploads:
+    """On-disk state of in-progress multipart uploads.
+
+    ``_uploads/<upload_id>/`` holds a manifest (target blob ID, stored headers,
+    creation time) and one ``part.NNNNN`` file per uploaded part, next to a
+    ``.sha256`` file with the part's digest and a ``.crc`` file with its checksum.
+
+    ``lock`` serialises claiming an upload against publishing a part, so a part
+    is either counted by the complete/abort that claims the upload or refused.
+    """
+
+    def __init__(self, data_dir: str):
+        self.root = os.path.join(os.path.abspath(data_dir), UPLOADS_DIR)
+        self.lock = threading.Lock()
+
+    def initiate(self, blob_id: str, headers: dict) -> str:
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._dir(upload_id)
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, MANIFEST), 'w', encoding='utf-8') as mf:
+            json.dump({'blob_id': blob_id, 'headers': headers, 'created': time.time()}, mf)
+        return upload_id
+
+    def manifest(self, upload_id: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(upload_id), MANIFEST), 'r', encoding='utf-8') as mf:
+                return json.load(mf)
+        except (OSError, ValueError):
+            return None
+
+    def claim(self, upload_id: str) -> bool:
+        """Atomically mark an upload as completing so a second complete/abort can't race it."""
+        upload_dir = self._dir(upload_id)
+        claimed = os.path.join(upload_dir, CLAIMED)
+        with self.lock:
+            try:
+                os.rename(os.path.join(upload_dir, MANIFEST), claimed)
+            except OSError:
+                return False
+        try:
+            os.utime(claimed)  # The claim's age, for stale_claims (rename keeps the manifest's mtime)
+        except OSError:
+            pass
+        return True
+
+    def unclaim(self, upload_id: str):
+        upload_dir = self._dir(upload_id)
+        try:
+            os.rename(os.path.join(upload_dir, CLAIMED), os.path.join(upload_dir, MANIFEST))
+        except OSError:
+            pass  # Already swept as a stale claim
+
+    def part_path(self, upload_id: str, part_number: int) -> str:
+        return os.path.join(self._dir(upload_id), PART_NAME % part_number)
+
+    def save_part_digest(self, upload_id: str, part_number: int, digest: str, checksum: Optional[str] = None):
+        part_path = self.part_path(upload_id, part_number)
+        if checksum:
+            with open(part_path + CHECKSUM_SUFFIX, 'w', encoding='utf-8') as cf:
+                cf.write(checksum)
+        with open(part_path + ETAG_SUFFIX, 'w', encoding='utf-8') as ef:
+            ef.write(digest)
+
+    def parts(self, upload_id: str) -> List[Tuple[int, str, int, str, Optional[str]]]:
+        """``[(part_number, path, size, sha256, checksum token or None), ...]`` in part order."""
+        upload_dir = self._dir(upload_id)
+        found = []
+        for name in sorted(os.listdir(upload_dir)):
+            if not name.startswith('part.') or not name[5:].isdigit():
+                continue
+            path = os.path.join(upload_dir, name)
+            try:
+                with open(path + ETAG_SUFFIX, 'r', encoding='utf-8') as ef:
+                    digest = ef.read()
+                found.append((int(name[5:]), path, os.path.getsize(path), digest, _read_checksum(path)))
+            except OSError:
+                continue  # Part still being written
+        return found
+
+    def remove(self, upload_id: str) -> int:
+        """Delete an upload's directory; returns the part bytes it held."""
+        upload_dir = self._dir(upload_id)
+        try:
+            size = sum(p[2] for p in self.parts(upload_id))
+        except OSError:
+            return 0
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return size
+
+    def expired(self, max_age: float) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        cutoff = time.time() - max_age
+        stale = []
+        for upload_id in os.listdir(self.root):
+            manifest = self.manifest(upload_id)
+            if manifest is not None and manifest['created'] < cutoff:
+                stale.append(upload_id)
+        return stale
+
+    def stale_claims(self, max_age: float) -> List[str]:
+        """Uploads claimed more than ``max_age`` seconds ago, i.e. left behind by a complete that died."""
+        if not os.path.isdir(self.root):
+            return []
+        cutoff = time.time() - max_age
+        stale = []
+        for upload_id in os.listdir(self.root):
+            try:
+                if os.path.getmtime(os.path.join(self._dir(upload_id), CLAIMED)) < cutoff:
+                    stale.append(upload_id)
+            except OSError:
+                continue
+        return stale
+
+    def walk_usage(self) -> int:
+        if not os.path.isdir(self.root):
+            return 0
+        return sum(p[2] for upload_id in os.listdir(self.root) for p in self.parts(upload_id))
+
+    def _dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, upload_id)
+
+
+def _read_checksum(part_path: str) -> Optional[str]:
+    try:
+        with open(part_path + CHECKSUM_SUFFIX, 'r', encoding='utf-8') as cf:
+            return cf.read()
+    except OSError:
+        return None  # Uploaded before parts were checksummed
+
+
+def concat_files(dest_path: str, paths: List[str], checksum=None):
+    """Concatenate ``paths`` into ``dest_path`` in the kernel where the platform allows it.
+
+    With a ``checksum`` (an ``integrity.Checksum``) the bytes go through
+    userspace instead, so it can be updated on the way.
+    """
+    with open(dest_path, 'wb') as out:
+        for path in paths:
+            with open(path, 'rb') as src:
+                if checksum is not None:
+                    while True:
+                        chunk = src.read(COPY_CHUNK)
+                        if not chunk:
+                            break
+                        checksum.update(chunk)
+                        out.write(chunk)
+                    continue
+                remaining = os.fstat(src.fileno()).st_size
+                try:
+                    # copy_file_range stays in the kernel (and can reflink on CoW filesystems)
+                    while remaining:
+                        copied = os.copy_file_range(src.fileno(), out.fileno(), remaining)
+                        if not copied:
+                            break
+                        remaining -= copied
+                except (AttributeError, OSError):
+                    pass
+                if remaining:
+                    shutil.copyfileobj(src, out, COPY_CHUNK)
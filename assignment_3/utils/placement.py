@@ -0,0 +1,127 @@
+import os
+import json
+import uuid
+import bisect
+import shutil
+import hashlib
+from typing import List, Optional, Tuple
+
+PLACEMENT_DIR = '_placement'
+LAYOUT_FILE = 'layout.json'     # Disk layout the last completed rebalance placed blobs for
+INCOMING_DIR = 'incoming'       # Blob copies in flight to this disk
+VNODES = 128                    # Ring points per unit of weight
+
+
+def parse_data_dirs(spec: str) -> List[Tuple[str, int]]:
+    """``/mnt/a,/mnt/b=2`` -> ``[(abs path, weight), ...]``; the first disk also holds internal state."""
+    disks = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        path, _, weight = item.partition('=')
+        disks.append((os.path.abspath(path), int(weight) if weight else 1))
+    if not disks or any(w < 1 for _, w in disks):
+        raise ValueError(f'Invalid DATA_DIR: {spec!r}')
+    if len({p for p, _ in disks}) != len(disks):
+        raise ValueError(f'Duplicate disk in DATA_DIR: {spec!r}')
+    return disks
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class DiskRing:
+    """Weighted consistent-hash ring mapping blob IDs to data dirs.
+
+    Each disk owns ``VNODES * weight`` points keyed by its path, so adding a
+    disk only takes over (roughly) its share of IDs; nothing moves between
+    the disks that were already there.
+    """
+
+    def __init__(self, disks: List[Tuple[str, int]]):
+        self.disks = [path for path, _ in disks]
+        self.weights = dict(disks)
+        points = sorted((_hash(f'{path}#{i}'), path) for path, weight in disks for i in range(VNODES * weight))
+        self._keys = [k for k, _ in points]
+        self._owners = [p for _, p in points]
+
+    @property
+    def primary(self) -> str:
+        return self.disks[0]
+
+    def disk_for(self, blob_id: str) -> str:
+        if len(self.disks) == 1:
+            return self.disks[0]
+        i = bisect.bisect(self._keys, _hash(blob_id)) % len(self._keys)
+        return self._owners[i]
+
+    def candidates(self, blob_id: str) -> List[str]:
+        """Every disk, the ring's choice first (a blob may sit elsewhere until the rebalancer moves it)."""
+        target = self.disk_for(blob_id)
+        return [target] + [d for d in self.disks if d != target]
+
+    def layout(self) -> list:
+        return [[path, self.weights[path]] for path in self.disks]
+
+
+def load_layout(data_dir: str) -> Optional[list]:
+    try:
+        with open(os.path.join(data_dir, PLACEMENT_DIR, LAYOUT_FILE), 'r', encoding='utf-8') as lf:
+            return json.load(lf)
+    except (OSError, ValueError):
+        return None
+
+
+def save_layout(data_dir: str, layout: list):
+    path = os.path.join(data_dir, PLACEMENT_DIR, LAYOUT_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as lf:
+        json.dump(layout, lf)
+    os.replace(path + '.tmp', path)
+
+
+def iter_blob_dirs(data_dir: str):
+    """Yield ``(blob_id, blob_dir)`` for every per-file blob dir (``<3 hex>/<2 hex>/<id>``) on one disk."""
+    for p1 in _listdir(data_dir):
+        if p1.startswith('_'):
+            continue
+        for p2 in _listdir(os.path.join(data_dir, p1)):
+            for blob_id in _listdir(os.path.join(data_dir, p1, p2)):
+                yield blob_id, os.path.join(data_dir, p1, p2, blob_id)
+
+
+def move_blob_dir(src_dir: str, dest_dir: str, dest_disk: str, before_rename=None) -> bool:
+    """Copy a blob dir to another disk and rename it into place.
+
+    ``before_rename(tmp_dir)`` runs on the finished copy (to fsync it). Returns
+    False (and leaves nothing behind) if ``dest_dir`` already exists, i.e. the
+    destination holds a newer upload; copy errors propagate.
+    """
+    incoming = os.path.join(dest_disk, PLACEMENT_DIR, INCOMING_DIR)
+    tmp_dir = os.path.join(incoming, uuid.uuid4().hex)
+    os.makedirs(incoming, exist_ok=True)
+    try:
+        shutil.copytree(src_dir, tmp_dir)
+        if before_rename:
+            before_rename(tmp_dir)
+        os.makedirs(os.path.dirname(dest_dir), exist_ok=True)
+        if os.path.exists(dest_dir):
+            return False
+        os.rename(tmp_dir, dest_dir)
+        return True
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def clear_incoming(data_dir: str):
+    """Drop copies left half-done by a crashed rebalance."""
+    shutil.rmtree(os.path.join(data_dir, PLACEMENT_DIR, INCOMING_DIR), ignore_errors=True)
+
+
+def _listdir(path: str) -> List[str]:
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
@@ -0,0 +1,169 @@
+import itertools
+import threading
+from typing import Optional
+
+DEFAULT_SHARDS = 16
+
+
+class _Shard:
+    __slots__ = ('lock', 'capacity', 'used', 'reserved')
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.used = 0
+        self.reserved = 0
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.used - self.reserved
+
+
+class Reservation:
+    __slots__ = ('shard', 'size', 'done')
+
+    def __init__(self, shard: _Shard, size: int):
+        self.shard = shard
+        self.size = size
+        self.done = False
+
+
+class QuotaAccountant:
+    """Thread-safe disk quota with reserve/commit/release semantics.
+
+    The quota is split into shards that each own a slice of the capacity, so
+    concurrent reservations normally lock a single shard. A shard that runs dry
+    takes the global rebalance lock and borrows free capacity from the others;
+    the sum of shard capacities always equals the limit, so the quota can never
+    be overshot.
+    """
+
+    def __init__(self, limit: int, used: int = 0, shards: int = DEFAULT_SHARDS):
+        self._shards = [_Shard(0) for _ in range(max(1, shards))]
+        self._rebalance_lock = threading.Lock()
+        self._next = itertools.count()
+        self._overdrawn = False
+        self.limit = limit
+        self.reset(used)
+
+    @property
+    def used(self) -> int:
+        return sum(s.used for s in self._shards)
+
+    @property
+    def reserved(self) -> int:
+        return sum(s.reserved for s in self._shards)
+
+    def reserve(self, size: int) -> Optional[Reservation]:
+        """Hold ``size`` bytes against the quota, or return None if they don't fit."""
+        shard = self._shards[next(self._next) % len(self._shards)]
+        with shard.lock:
+            if shard.free >= size:
+                shard.reserved += size
+                return Reservation(shard, size)
+        return self._reserve_slow(shard, size)
+
+    def commit(self, reservation: Reservation, actual: Optional[int] = None):
+        """Turn a reservation into usage; ``actual`` may be smaller than reserved."""
+        if reservation.done:
+            return
+        actual = reservation.size if actual is None else actual
+        shard = reservation.shard
+        with shard.lock:
+            shard.reserved -= reservation.size
+            shard.used += actual
+        reservation.done = True
+        self._settle()
+
+    def release(self, reservation: Reservation):
+        """Give a reservation back without using it (failed or aborted upload)."""
+        if reservation.done:
+            return
+        shard = reservation.shard
+        with shard.lock:
+            shard.reserved -= reservation.size
+        reservation.done = True
+        self._settle()
+
+    def split(self, reservation: Reservation, size: int) -> Optional[Reservation]:
+        """Carve ``size`` bytes out of an outstanding reservation (batch uploads reserve once)."""
+        if reservation.done or size > reservation.size:
+            return None
+        reservation.size -= size
+        return Reservation(reservation.shard, size)
+
+    def free(self, size: int):
+        """Account for ``size`` committed bytes removed from disk."""
+        shard = self._shards[next(self._next) % len(self._shards)]
+        with shard.lock:
+            shard.used -= size
+        self._settle()
+
+    def reset(self, used: int):
+        """Replace committed usage (reconcile task); outstanding reservations are kept."""
+        with self._all_locked():
+            for s in self._shards:
+                s.used = 0
+            self._shards[0].used = used
+            self._redistribute_locked()
+
+    def set_limit(self, limit: int):
+        with self._all_locked():
+            self.limit = limit
+            self._redistribute_locked()
+
+    def _reserve_slow(self, shard: _Shard, size: int) -> Optional[Reservation]:
+        with self._all_locked():
+            if sum(s.free for s in self._shards) < size:
+                return None
+            needed = size - shard.free
+            for donor in self._shards:
+                if needed <= 0:
+                    break
+                if donor is shard or donor.free <= 0:
+                    continue
+                moved = min(needed, donor.free)
+                donor.capacity -= moved
+                shard.capacity += moved
+                needed -= moved
+            shard.reserved += size
+            return Reservation(shard, size)
+
+    def _settle(self):
+        # While over the limit (after a reset or a lowered limit) space freed in
+        # one shard must first pay off the overdraft, not become reservable there
+        if self._overdrawn:
+            with self._all_locked():
+                self._redistribute_locked()
+
+    def _redistribute_locked(self):
+        # Spread the remaining free space evenly; no shard may advertise space
+        # that another shard has already overdrawn
+        for s in self._shards:
+            s.capacity = s.used + s.reserved
+        free = self.limit - sum(s.capacity for s in self._shards)
+        self._overdrawn = free < 0
+        if free < 0:
+            self._shards[0].capacity += free
+            return
+        share, rest = divmod(free, len(self._shards))
+        for s in self._shards:
+            s.capacity += share
+        self._shards[0].capacity += rest
+
+    def _all_locked(self):
+        return _AllLocked(self._rebalance_lock, self._shards)
+
+
+class _AllLocked:
+    # Rebalance lock first, then shards in index order, so slow paths never deadlock
+    def __init__(self, rebalance_lock, shards):
+        self._locks = [rebalance_lock] + [s.lock for s in shards]
+
+    def __enter__(self):
+        for lock in self._locks:
+            lock.acquire()
+
+    def __exit__(self, *exc):
+        for lock in reversed(self._locks):
+            lock.release()
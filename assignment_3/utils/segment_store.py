@@ -0,0 +1,269 @@
+import os
+import json
+import struct
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+SEGMENTS_DIR = '_segments'
+SEGMENT_NAME = 'segment.%08d.log'
+SEGMENT_SIZE = 64 * 1024 * 1024      # Roll over to a new segment after 64 MB
+
+# Record: magic, type, id length, metadata length, data length, then the three payloads
+RECORD = struct.Struct('>4sBHII')
+RECORD_MAGIC = b'RBS1'
+# Sealed segments end with a FOOTER record (their index) and this trailer pointing at it
+TRAILER = struct.Struct('>Q4s')
+TRAILER_MAGIC = b'RBSF'
+PUT, DELETE, FOOTER = 1, 2, 3
+
+SegmentEntry = namedtuple('SegmentEntry', 'segment offset length headers record_len')
+
+
+class SegmentStore:
+    """Haystack-style store packing small blobs into large append-only segment files.
+
+    An in-memory index maps blob ID -> (segment, offset, length, headers). It is
+    rebuilt at boot from the footer of each sealed segment, and by scanning only
+    the active one. Deletes append tombstones; ``compact`` rewrites the live
+    records of mostly-dead segments and drops the old files.
+    """
+
+    def __init__(self, data_dir: str, segment_size: int = SEGMENT_SIZE):
+        self.dir = os.path.join(os.path.abspath(data_dir), SEGMENTS_DIR)
+        self.segment_size = segment_size
+        self.index: Dict[str, SegmentEntry] = {}
+        self._sizes: Dict[int, int] = {}     # segment -> bytes written
+        self._dead: Dict[int, int] = {}      # segment -> bytes no longer referenced
+        self._active = None
+        self._active_entries: List[list] = []
+        self._fh = None
+        self._offset = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def live_bytes(self) -> int:
+        with self._lock:
+            return sum(e.length for e in self.index.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'blobs': len(self.index),
+                'segments': len(self._sizes),
+                'bytes': sum(self._sizes.values()),
+                'dead_bytes': sum(self._dead.values()),
+            }
+
+    def lookup(self, blob_id: str) -> Optional[SegmentEntry]:
+        return self.index.get(blob_id)
+
+    def read(self, blob_id: str) -> Optional[Tuple[dict, bytes]]:
+        for _ in range(2):
+            entry = self.index.get(blob_id)
+            if entry is None:
+                return None
+            try:
+                fd = os.open(self._path(entry.segment), os.O_RDONLY)
+            except FileNotFoundError:
+                continue  # Compacted away under us; the index now points at the copy
+            try:
+                return entry.headers, os.pread(fd, entry.length, entry.offset)
+            finally:
+                os.close(fd)
+        return None
+
+    def segment_path(self, blob_id: str) -> Optional[str]:
+        """Path of the segment currently holding ``blob_id`` (for fsync), or None."""
+        entry = self.index.get(blob_id)
+        return self._path(entry.segment) if entry else None
+
+    def put(self, blob_id: str, headers: dict, body: bytes):
+        with self._lock:
+            self._append_put(blob_id, headers, body)
+
+    def delete(self, blob_id: str, sync=None) -> Optional[int]:
+        """Tombstone a blob; returns its size, or None if it isn't stored here.
+
+        ``sync(paths)`` runs on the segment holding the tombstone (to fsync it), outside the lock.
+        """
+        with self._lock:
+            entry = self.index.pop(blob_id, None)
+            if entry is None:
+                return None
+            self._dead[entry.segment] += entry.record_len
+            self._append_delete(blob_id)
+            written = self._path(self._active)
+        if sync:
+            sync([written])
+        return entry.length
+
+    def compact(self, min_dead_ratio: float = 0.5, sync=None) -> int:
+        """Rewrite sealed segments that are at least ``min_dead_ratio`` dead; returns bytes reclaimed.
+
+        ``sync(paths)`` runs on the segments the live records were copied to
+        before each old segment is removed, so a crash can't lose the copies.
+        """
+        with self._lock:
+            victims = [seg for seg, size in self._sizes.items()
+                       if seg != self._active and size and self._dead[seg] / size >= min_dead_ratio]
+        reclaimed = 0
+        for seg in sorted(victims):
+            entries = self._read_footer(seg)
+            if entries is None:
+                entries = self._scan(seg)  # Crashed mid-seal; never written to again
+            written = set()
+            for entry in entries:
+                # One lock hold per record keeps uploads flowing during a long compaction
+                with self._lock:
+                    if entry[0] == 'p':
+                        _, blob_id, offset = entry[:3]
+                        live = self.index.get(blob_id)
+                        if live is not None and live.segment == seg and live.offset == offset:
+                            with open(self._path(seg), 'rb') as sf:
+                                sf.seek(offset)
+                                body = sf.read(live.length)
+                            self._append_put(blob_id, live.headers, body)
+                            written.add(self._path(self._active))
+                    elif entry[1] not in self.index and min(self._sizes) < seg:
+                        # An older segment may still hold a put this tombstone must keep hiding
+                        self._append_delete(entry[1])
+                        written.add(self._path(self._active))
+            if sync and written:
+                sync(sorted(written) + [self.dir])  # The dir too: the copies may have opened a new segment
+            with self._lock:
+                reclaimed += self._sizes.pop(seg)
+                self._dead.pop(seg)
+                os.remove(self._path(seg))
+        return reclaimed
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.dir, SEGMENT_NAME % segment)
+
+    def _append_put(self, blob_id: str, headers: dict, body: bytes):
+        offset, record_len = self._append(PUT, blob_id, headers, body)
+        old = self.index.get(blob_id)
+        if old is not None:
+            self._dead[old.segment] += old.record_len
+        self.index[blob_id] = SegmentEntry(self._active, offset, len(body), headers, record_len)
+        self._active_entries.append(['p', blob_id, offset, len(body), headers, record_len])
+
+    def _append_delete(self, blob_id: str):
+        _, record_len = self._append(DELETE, blob_id, None, b'')
+        self._dead[self._active] += record_len
+        self._active_entries.append(['d', blob_id, record_len])
+
+    def _append(self, kind: int, blob_id: str, headers, body: bytes) -> Tuple[int, int]:
+        """Write one record to the active segment; returns (data offset, record length)."""
+        if self._offset >= self.segment_size:
+            self._seal()
+        id_bytes = blob_id.encode('utf-8')
+        meta = json.dumps(headers).encode('utf-8') if headers is not None else b''
+        record = RECORD.pack(RECORD_MAGIC, kind, len(id_bytes), len(meta), len(body)) + id_bytes + meta + body
+        self._fh.write(record)
+        self._fh.flush()
+        data_offset = self._offset + len(record) - len(body)
+        self._offset += len(record)
+        self._sizes[self._active] = self._offset
+        return data_offset, len(record)
+
+    def _seal(self):
+        footer = json.dumps(self._active_entries).encode('utf-8')
+        footer_offset = self._offset
+        self._fh.write(RECORD.pack(RECORD_MAGIC, FOOTER, 0, len(footer), 0) + footer)
+        self._fh.write(TRAILER.pack(footer_offset, TRAILER_MAGIC))
+        self._fh.close()
+        self._sizes[self._active] = footer_offset + RECORD.size + len(footer) + TRAILER.size
+        self._open_active(self._active + 1)
+
+    def _open_active(self, segment: int):
+        self._active = segment
+        self._active_entries = []
+        self._fh = open(self._path(segment), 'ab')
+        self._offset = self._fh.tell()
+        self._sizes.setdefault(segment, self._offset)
+        self._dead.setdefault(segment, 0)
+
+    def _load(self):
+        os.makedirs(self.dir, exist_ok=True)
+        segments = sorted(int(f.split('.')[1]) for f in os.listdir(self.dir)
+                          if f.startswith('segment.') and f.endswith('.log'))
+        last_entries = None
+        for seg in segments:
+            self._sizes[seg] = os.path.getsize(self._path(seg))
+            self._dead[seg] = 0
+            entries = self._read_footer(seg)
+            if entries is None:
+                entries = self._scan(seg)
+                last_entries = entries if seg == segments[-1] else None
+            for entry in entries:
+                self._replay(seg, entry)
+        if segments and last_entries is not None:
+            self._open_active(segments[-1])
+            self._active_entries = last_entries
+        else:
+            self._open_active(segments[-1] + 1 if segments else 1)
+
+    def _replay(self, seg: int, entry: list):
+        if entry[0] == 'p':
+            _, blob_id, offset, length, headers, record_len = entry
+            old = self.index.get(blob_id)
+            if old is not None:
+                self._dead[old.segment] += old.record_len
+            self.index[blob_id] = SegmentEntry(seg, offset, length, headers, record_len)
+        else:
+            _, blob_id, record_len = entry
+            self._dead[seg] += record_len
+            old = self.index.pop(blob_id, None)
+            if old is not None:
+                self._dead[old.segment] += old.record_len
+
+    def _read_footer(self, seg: int) -> Optional[list]:
+        with open(self._path(seg), 'rb') as sf:
+            size = os.fstat(sf.fileno()).st_size
+            if size < TRAILER.size + RECORD.size:
+                return None
+            sf.seek(size - TRAILER.size)
+            footer_offset, magic = TRAILER.unpack(sf.read(TRAILER.size))
+            if magic != TRAILER_MAGIC:
+                return None
+            sf.seek(footer_offset)
+            _, kind, _, meta_len, _ = RECORD.unpack(sf.read(RECORD.size))
+            if kind != FOOTER:
+                return None
+            return json.loads(sf.read(meta_len))
+
+    def _scan(self, seg: int) -> list:
+        """Rebuild the entries of an unsealed segment record by record, cutting off a torn tail."""
+        entries = []
+        path = self._path(seg)
+        offset = 0
+        with open(path, 'rb') as sf:
+            while True:
+                header = sf.read(RECORD.size)
+                if len(header) < RECORD.size:
+                    break
+                magic, kind, id_len, meta_len, data_len = RECORD.unpack(header)
+                payload = sf.read(id_len + meta_len + data_len)
+                if magic != RECORD_MAGIC or len(payload) < id_len + meta_len + data_len:
+                    break
+                blob_id = payload[:id_len].decode('utf-8')
+                record_len = RECORD.size + len(payload)
+                if kind == PUT:
+                    headers = json.loads(payload[id_len:id_len + meta_len])
+                    entries.append(['p', blob_id, offset + RECORD.size + id_len + meta_len,
+                                    data_len, headers, record_len])
+                elif kind == DELETE:
+                    entries.append(['d', blob_id, record_len])
+                offset += record_len
+        if offset < os.path.getsize(path):
+            with open(path, 'r+b') as sf:
+                sf.truncate(offset)
+            self._sizes[seg] = offset
+        return entries
@@ -0,0 +1,24 @@
+import time
+import threading
+from typing import Optional
+
+
+class Throttle:
+    """Caps a background task (scrubbing, reclaiming trash) at ``rate`` bytes/s (0 = unthrottled)."""
+
+    def __init__(self, rate: int, stop: Optional[threading.Event] = None):
+        self.rate = rate
+        self.stop = stop
+        self.start = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, n: int) -> bool:
+        """Account ``n`` bytes processed, sleeping if ahead of the rate; True if ``stop`` was set."""
+        self.consumed += n
+        ahead = self.consumed / self.rate - (time.monotonic() - self.start) if self.rate else 0
+        if ahead > 0:
+            if self.stop is None:
+                time.sleep(ahead)
+            else:
+                return self.stop.wait(ahead)
+        return self.stop is not None and self.stop.is_set()
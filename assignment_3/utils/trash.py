@@ -0,0 +1,76 @@
+import os
+import uuid
+import threading
+from typing import Optional
+from assignment_3.utils.throttle import Throttle
+
+TRASH_DIR = '_trash'
+
+
+class Trash:
+    """Deleted blob directories waiting to be unlinked off the request path.
+
+    ``bury`` renames a blob dir into ``_trash/`` (atomic on one filesystem), so
+    the blob is gone as soon as it returns; ``reclaim`` does the slow unlinks
+    later, throttled to a byte rate so it doesn't starve readers of disk I/O.
+    With several data dirs each one gets its own ``_trash/`` so the rename
+    never crosses a mount point.
+    """
+
+    def __init__(self, *data_dirs: str):
+        self.roots = {os.path.abspath(d): os.path.join(os.path.abspath(d), TRASH_DIR) for d in data_dirs}
+        self.root = next(iter(self.roots.values()))
+
+    def bury(self, path: str, sync=None) -> bool:
+        """Rename ``path`` into the trash; ``sync(paths)`` then runs on both directories the rename changed."""
+        root = self._root_for(path)
+        os.makedirs(root, exist_ok=True)
+        try:
+            os.rename(path, os.path.join(root, uuid.uuid4().hex))
+        except FileNotFoundError:
+            return False
+        if sync:
+            sync([os.path.dirname(os.path.abspath(path)), root])
+        return True
+
+    def pending(self) -> int:
+        pending = 0
+        for root in self.roots.values():
+            try:
+                pending += len(os.listdir(root))
+            except OSError:
+                pass
+        return pending
+
+    def reclaim(self, rate: int = 0, stop: Optional[threading.Event] = None) -> int:
+        """Unlink everything buried, at most ``rate`` bytes/s (0 = unthrottled); returns bytes removed."""
+        entries = []
+        for root in self.roots.values():
+            try:
+                entries += [os.path.join(root, e) for e in os.listdir(root)]
+            except OSError:
+                pass
+        removed = 0
+        throttle = Throttle(rate, stop)
+        for entry in entries:
+            for dp, _, files in os.walk(entry, topdown=False):
+                for name in files:
+                    path = os.path.join(dp, name)
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    removed += size
+                    if throttle.consume(size):
+                        return removed
+                try:
+                    os.rmdir(dp)
+                except OSError:
+                    pass
+        return removed
+
+    def _root_for(self, path: str) -> str:
+        path = os.path.abspath(path)
+        matches = [d for d in self.roots if path.startswith(d + os.sep)]
+        return self.roots[max(matches, key=len)] if matches else self.root
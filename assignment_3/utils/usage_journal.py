@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import threading
+from typing import Dict, List, Optional
+from assignment_3.utils.content_store import ContentStore
+from assignment_3.utils.multipart import MultipartUploads
+from assignment_3.utils.segment_store import SegmentStore
+
+USAGE_DIR = '_usage'                 # Internal dirs start with '_' so they never clash with SHA-1 buckets
+CHECKPOINT_FILE = 'checkpoint.json'
+JOURNAL_FILE = 'journal.%d.log'     # One file per checkpoint generation
+COMPACT_EVERY = 10000                # Journal entries between checkpoints
+
+
+class UsageJournal:
+    """Append-only log of disk usage deltas, folded into a checkpoint file.
+
+    Every upload/delete appends one line (``+123 blob_id``). At boot the
+    checkpoint total is loaded and the journal replayed, so startup cost is
+    O(journal) instead of O(files under DATA_DIR).
+
+    Per-file blob bodies also name the disk they were placed on
+    (``+123 blob_id /mnt/b``), which keeps a running total per disk in ``disks``.
+    """
+
+    def __init__(self, data_dir: str, compact_every: int = COMPACT_EVERY):
+        self.dir = os.path.join(os.path.abspath(data_dir), USAGE_DIR)
+        self.checkpoint_path = os.path.join(self.dir, CHECKPOINT_FILE)
+        self.compact_every = compact_every
+        self.generation = 0
+        self.total = 0
+        self.disks: Dict[str, int] = {}
+        self.tracks_disks = False   # Whether the loaded checkpoint had per-disk totals
+        self._entries = 0
+        self._fh = None
+        self._lock = threading.Lock()
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.dir, JOURNAL_FILE % self.generation)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.checkpoint_path)
+
+    def load(self) -> int:
+        """Read the checkpoint, replay the journal and fold it into a fresh checkpoint."""
+        with self._lock:
+            total, disks = 0, {}
+            self.tracks_disks = False
+            try:
+                with open(self.checkpoint_path, 'r', encoding='utf-8') as cf:
+                    checkpoint = json.load(cf)
+                total = int(checkpoint.get('total_used', 0))
+                self.tracks_disks = 'disks' in checkpoint
+                disks = {disk: int(used) for disk, used in checkpoint.get('disks', {}).items()}
+                self.generation = int(checkpoint.get('generation', 0))
+            except (OSError, ValueError, AttributeError):
+                pass
+            try:
+                with open(self.journal_path, 'r', encoding='utf-8') as jf:
+                    for line in jf:
+                        fields = line.rstrip('\n').split(' ', 2)
+                        try:
+                            if not line.endswith('\n'):
+                                raise ValueError(line)
+                            delta = int(fields[0])
+                        except ValueError:
+                            # Torn last line after a crash; the reconcile task fixes any drift
+                            break
+                        total += delta
+                        if len(fields) == 3:
+                            disks[fields[2]] = disks.get(fields[2], 0) + delta
+            except OSError:
+                pass
+            self.total = total
+            self.disks = disks
+            self._compact_locked()
+            return total
+
+    def record(self, delta: int, blob_id: str = '', disk: Optional[str] = None):
+        """Log a usage change; ``disk`` is where a per-file blob body was placed or removed."""
+        if not delta:
+            return
+        with self._lock:
+            self._fh.write(f'{delta:+d} {blob_id} {disk}\n' if disk else f'{delta:+d} {blob_id}\n')
+            self._fh.flush()
+            self.total += delta
+            if disk:
+                self.disks[disk] = self.disks.get(disk, 0) + delta
+            self._entries += 1
+            if self._entries >= self.compact_every:
+                self._compact_locked()
+
+    def reset(self, total: int, disks: Optional[Dict[str, int]] = None):
+        """Replace the tracked totals (used by the reconcile task)."""
+        with self._lock:
+            self.total = total
+            if disks is not None:
+                self.disks = dict(disks)
+            self._compact_locked()
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+
+    def _compact_locked(self):
+        # The checkpoint names the journal generation that follows it, so a crash
+        # between writing it and dropping the old journal never replays twice.
+        os.makedirs(self.dir, exist_ok=True)
+        old_path = self.journal_path
+        self.generation += 1
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as cf:
+            json.dump({'total_used': self.total, 'disks': self.disks, 'generation': self.generation}, cf)
+        os.replace(tmp_path, self.checkpoint_path)
+        if self._fh:
+            self._fh.close()
+        self._fh = open(self.journal_path, 'a', encoding='utf-8')
+        self._entries = 0
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def has_blob_buckets(data_dir: str) -> bool:
+    """True if DATA_DIR holds per-file blobs (SHA-1 bucket dirs), e.g. from before the journal existed."""
+    try:
+        return any(not name.startswith('_') for name in os.listdir(data_dir))
+    except OSError:
+        return False
+
+
+def walk_disk(disk: str) -> int:
+    """Bytes of committed per-file blob bodies on one disk."""
+    usage = 0
+    disk = os.path.abspath(disk)
+    for dp, dirs, files in os.walk(disk):
+        if dp == disk:
+            dirs[:] = [d for d in dirs if not d.startswith('_')]
+        if 'data' in files:
+            try:
+                usage += os.path.getsize(os.path.join(dp, 'data'))
+            except OSError:
+                pass
+    return usage
+
+
+def walk_usage(data_dir: str, blob_dirs: Optional[List[str]] = None) -> int:
+    """Full scan of DATA_DIR counting only committed blob bodies, deduplicated content and upload parts.
+
+    ``blob_dirs`` lists every disk holding per-file blobs (default: just DATA_DIR).
+    """
+    root = os.path.abspath(data_dir)
+    usage = sum(walk_disk(disk) for disk in blob_dirs or [root])
+    return usage + ContentStore(root).walk_usage() + MultipartUploads(root).walk_usage()
+
+
+def reconcile(journal: UsageJournal, data_dir: str, extra: int = 0, blob_dirs: Optional[List[str]] = None) -> int:
+    """Repair task: recompute usage (in total and per disk) from disk and checkpoint it.
+
+    ``extra`` covers bytes the walk can't see (blobs packed into segments).
+    Uploads that land while the walk is running may be counted twice or not at
+    all, so run it when the server is quiet.
+    """
+    root = os.path.abspath(data_dir)
+    disks = {os.path.abspath(disk): walk_disk(disk) for disk in blob_dirs or [root]}
+    usage = sum(disks.values()) + ContentStore(root).walk_usage() + MultipartUploads(root).walk_usage() + extra
+    journal.reset(usage, disks)
+    return usage
+
+
+if __name__ == '__main__':
+    # python -m assignment_3.utils.usage_journal <data_dir>   (server must be stopped)
+    if len(sys.argv) != 2:
+        sys.exit('usage: python -m assignment_3.utils.usage_journal <data_dir>')
+    j = UsageJournal(sys.argv[1])
+    j.load()
+    print(reconcile(j, sys.argv[1], SegmentStore(sys.argv[1]).live_bytes()))
+    j.close()
@@ -0,0 +1,87 @@
+import asyncio
+import http.client
+import threading
+import pytest
+from assignment_3.app import make_app
+from assignment_3.async_server import AsyncBlobServer
+
+
+@pytest.fixture
+def port(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_DIR', str(tmp_path / "data"))
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncBlobServer(make_app(), workers=2).start('127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    yield server.sockets[0].getsockname()[1]
+
+    async def shutdown():
+        server.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def _status(conn):
+    rv = conn.getresponse()
+    rv.read()
+    return rv.status
+
+
+def test_blob_contract_over_keep_alive(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    body = b"x" * (2 * 1024 * 1024)      # Larger than the in-memory spool
+    conn.request("POST", "/api/v0/blobs/async1", body=body, headers={"X-Rebase-Kind": "big"})
+    assert _status(conn) == 201
+
+    conn.request("GET", "/api/v0/blobs/async1")
+    rv = conn.getresponse()
+    assert rv.status == 200 and rv.read() == body
+    assert rv.getheader("X-Rebase-Kind") == "big"
+
+    conn.request("HEAD", "/api/v0/blobs/async1")
+    rv = conn.getresponse()
+    assert rv.read() == b"" and rv.getheader("Content-Length") == str(len(body))
+
+    conn.request("POST", "/api/v0/batch/get", body=b'{"ids": ["async1"]}', headers={"Content-Type": "application/json"})
+    rv = conn.getresponse()
+    assert rv.getheader("Transfer-Encoding") == "chunked" and len(rv.read()) > len(body)
+
+    conn.request("DELETE", "/api/v0/blobs/async1")
+    assert _status(conn) == 204
+    conn.request("GET", "/api/v0/blobs/async1")
+    assert _status(conn) == 404
+    conn.close()
+
+
+def test_oversized_body_rejected_before_reading(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.putrequest("POST", "/api/v0/blobs/huge")
+    conn.putheader("Content-Length", str(10 ** 12))
+    conn.endheaders()
+    assert conn.getresponse().status == 413
+
+
+def _head_only(port, path, length):
+    """Send just the headers (asking for 100-continue) and return the first status line."""
+    import socket
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        sock.sendall(f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n"
+                     f"Expect: 100-continue\r\n\r\n".encode())
+        return sock.recv(4096).split(b"\r\n", 1)[0]
+
+
+def test_route_limits_apply_before_reading(port):
+    from assignment_3.api.v0 import file_management_routes as routes
+    max_length = 10 * 1024 * 1024
+    # Within the batch limit, but over what a single blob may be: refused, no 100 Continue
+    assert _head_only(port, "/api/v0/blobs/big", max_length + 1) == b"HTTP/1.1 413 Request Entity Too Large"
+    assert _head_only(port, "/api/v0/blobs/big/uploads/" + "0" * 32 + "/parts/1",
+                      max_length + 1).startswith(b"HTTP/1.1 413")
+    assert _head_only(port, "/api/v0/blobs/ok", 10) == b"HTTP/1.1 100 Continue"
+
+    routes.quota.set_limit(1000)
+    assert _head_only(port, "/api/v0/batch/put", 5000).startswith(b"HTTP/1.1 413")
@@ -0,0 +1,38 @@
+from assignment_3.utils.blob_cache import BlobCache
+
+
+def test_lru_eviction_within_byte_budget():
+    cache = BlobCache(max_bytes=10, max_object_size=10)
+    cache.put('a', {}, b'1234', cache.token('a'))
+    cache.put('b', {}, b'1234', cache.token('b'))
+    assert cache.get('a') is not None        # 'a' is now most recently used
+    cache.put('c', {}, b'1234', cache.token('c'))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.size == 8 and cache.evictions == 1
+
+
+def test_objects_over_the_limit_are_not_cached():
+    cache = BlobCache(max_bytes=100, max_object_size=5)
+    cache.put('big', {}, b'123456', cache.token('big'))
+    assert cache.get('big') is None
+    assert not BlobCache(0, 5).accepts(1)
+
+
+def test_stale_token_is_rejected():
+    cache = BlobCache(max_bytes=100, max_object_size=100)
+    token = cache.token('a')
+    cache.invalidate('a')                     # overwrite landed while the reader was on disk
+    cache.put('a', {}, b'old', token)
+    assert cache.get('a') is None
+
+
+def test_hit_ratio():
+    cache = BlobCache(max_bytes=100, max_object_size=100)
+    cache.get('a')
+    cache.put('a', {}, b'x', cache.token('a'))
+    cache.get('a')
+    cache.get('a')
+    stats = cache.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 1
+    assert abs(stats['hit_ratio'] - 2 / 3) < 1e-9
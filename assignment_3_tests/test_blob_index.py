@@ -0,0 +1,39 @@
+from assignment_3.utils.blob_index import BlobIndex
+
+
+def test_list_pages_in_order_within_prefix(tmp_path):
+    index = BlobIndex(str(tmp_path))
+    assert index.needs_rebuild
+    index.rebuild([("b2", 2), ("a1", 1)])
+    for blob_id in ("b1", "b10", "b3", "c1"):
+        index.put(blob_id, len(blob_id))
+    index.put("b1", 100)
+    index.delete("b3")
+
+    assert index.list() == [("a1", 1), ("b1", 100), ("b10", 3), ("b2", 2), ("c1", 2)]
+    assert index.list(prefix="b", limit=2) == [("b1", 100), ("b10", 3)]
+    assert index.list(prefix="b", after="b10", limit=2) == [("b2", 2)]
+    assert index.list(after="b2") == [("c1", 2)]
+    index.close()
+
+    assert not BlobIndex(str(tmp_path)).needs_rebuild
+
+
+def test_unclean_shutdown_is_reconciled(tmp_path):
+    index = BlobIndex(str(tmp_path))
+    index.rebuild([("kept", 1), ("lost", 2)])
+    index.close()
+    index = BlobIndex(str(tmp_path))
+    assert not index.stale                     # Closed cleanly
+
+    index.put("unsynced", 3)
+    index = BlobIndex(str(tmp_path))           # Previous one never closed
+    assert index.stale
+
+    def walk():
+        yield from [("kept", 5), ("unsynced", 3), ("new", 4)]
+        index.delete("new")                    # Deleted while the walk was running
+        index.put("late", 6)                   # Uploaded after the walk passed it
+    assert index.reconcile(walk()) == (1, 1)   # "kept" resized, "lost" dropped
+    assert index.list() == [("kept", 5), ("late", 6), ("unsynced", 3)]
+    assert not index.stale
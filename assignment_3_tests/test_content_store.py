@@ -0,0 +1,42 @@
+import hashlib
+from assignment_3.utils.content_store import ContentStore
+
+
+def _add(store, body):
+    tmp = store.new_temp_path()
+    with open(tmp, 'wb') as f:
+        f.write(body)
+    digest = hashlib.sha256(body).hexdigest()
+    return digest, store.add(tmp, digest)
+
+
+def test_identical_content_stored_once(tmp_path):
+    store = ContentStore(str(tmp_path))
+    digest, is_new = _add(store, b'hello')
+    assert is_new
+    _, is_new = _add(store, b'hello')
+    assert not is_new
+    assert store.refs(digest) == 2
+    assert store.walk_usage() == 5
+
+
+def test_collect_reclaims_only_unreferenced(tmp_path):
+    store = ContentStore(str(tmp_path))
+    digest, _ = _add(store, b'hello')
+    _add(store, b'hello')
+    store.decref(digest)
+    assert store.collect() == []
+
+    store.decref(digest)
+    assert store.collect() == [(digest, 5)]
+    assert store.walk_usage() == 0
+
+
+def test_full_collect_finds_leftovers_after_restart(tmp_path):
+    store = ContentStore(str(tmp_path))
+    digest, _ = _add(store, b'hello')
+    store.decref(digest)
+
+    restarted = ContentStore(str(tmp_path))
+    assert restarted.collect() == []
+    assert restarted.collect(full=True) == [(digest, 5)]
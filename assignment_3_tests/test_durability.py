@@ -0,0 +1,30 @@
+import threading
+import pytest
+from assignment_3.utils.durability import GroupCommitter, fsync_paths
+
+
+def test_group_commit_batches_concurrent_syncs(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(b"x")
+    committer = GroupCommitter(0.05)
+    barrier = threading.Barrier(20)
+
+    def worker():
+        barrier.wait()
+        committer.sync([str(path), str(tmp_path)])
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 1 <= committer.batches < 20
+
+    with pytest.raises(OSError):
+        committer.sync([str(tmp_path / "missing")])
+    committer.close()
+
+
+def test_fsync_paths_reports_failures(tmp_path):
+    assert fsync_paths([str(tmp_path)]) == []
+    assert fsync_paths([str(tmp_path / "missing")]) == [str(tmp_path / "missing")]
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from assignment_3.benchmarks.loadgen import ERROR, OK, RACED, _Keys, _summarise, parse_mix, parse_sizes, percentile, run
+
+
+def test_parse_mix():
+    assert parse_mix("upload=50, download=40,delete=10") == {'upload': 50, 'download': 40, 'delete': 10}
+    for spec in ("upload=x", "fetch=1", "upload=0,delete=0"):
+        with pytest.raises(ValueError):
+            parse_mix(spec)
+
+
+def test_parse_sizes():
+    rng = random.Random(0)
+    assert parse_sizes("fixed:7")(rng) == 7
+    assert all(3 <= parse_sizes("uniform:3-5")(rng) <= 5 for _ in range(50))
+    assert {parse_sizes("10:1,20:0")(rng) for _ in range(20)} == {10}
+    with pytest.raises(ValueError):
+        parse_sizes("uniform:5-3")
+
+
+def test_summarise_counts_races_apart_from_errors():
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([], 99) == 0.0
+    samples = [('download', 0.001, OK), ('download', 0.003, RACED), ('upload', 0.002, ERROR), ('upload', 0.004, OK)]
+    report = _summarise(samples, 2.0)
+    assert (report['requests'], report['errors'], report['raced'], report['error_rate']) == (4, 1, 1, 0.25)
+    assert report['throughput'] == 2.0
+    assert report['latency_ms'] == {'p50': 2.0, 'p95': 4.0, 'p99': 4.0, 'mean': 2.5, 'max': 4.0}
+
+
+def test_taken_keys_are_gone():
+    keys = _Keys()
+    keys.add("a")
+    assert "a" in keys
+    assert keys.take(random.Random(0)) == "a"
+    assert "a" not in keys and keys.pick(random.Random(0)) is None
+
+
+def test_run_smoke(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    report = run({'upload': 2, 'download': 2, 'delete': 1}, 'fixed:64', concurrency=2, duration=0.3, preload=5)
+    assert report['total']['requests'] > 0
+    assert report['total']['errors'] == 0
+    assert set(report['ops']) <= {'upload', 'download', 'delete'}
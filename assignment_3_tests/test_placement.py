@@ -0,0 +1,19 @@
+from assignment_3.utils.placement import DiskRing, parse_data_dirs
+
+
+def test_parse_data_dirs():
+    assert parse_data_dirs("/mnt/a, /mnt/b=3") == [("/mnt/a", 1), ("/mnt/b", 3)]
+
+
+def test_ring_respects_weights_and_moves_only_to_new_disk():
+    ids = [f"blob-{i}" for i in range(20000)]
+    before = DiskRing([("/a", 1), ("/b", 2)])
+    placed = {i: before.disk_for(i) for i in ids}
+    share_b = sum(d == "/b" for d in placed.values()) / len(ids)
+    assert 0.6 < share_b < 0.73
+
+    after = DiskRing([("/a", 1), ("/b", 2), ("/c", 1)])
+    moved = [i for i in ids if after.disk_for(i) != placed[i]]
+    assert all(after.disk_for(i) == "/c" for i in moved)
+    assert 0.2 < len(moved) / len(ids) < 0.3
+    assert after.candidates("blob-1")[0] == after.disk_for("blob-1")
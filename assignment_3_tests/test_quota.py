@@ -0,0 +1,69 @@
+import threading
+from assignment_3.utils.quota import QuotaAccountant
+
+
+def test_reserve_commit_release():
+    q = QuotaAccountant(100, shards=4)
+    r1 = q.reserve(60)
+    assert r1 is not None
+    assert q.reserve(50) is None          # 60 held + 50 > 100
+    q.commit(r1, 40)                      # shorter than reserved
+    assert q.used == 40 and q.reserved == 0
+    r2 = q.reserve(60)
+    assert r2 is not None
+    q.release(r2)
+    q.release(r2)                         # idempotent
+    assert q.used == 40 and q.reserved == 0
+    q.free(40)
+    assert q.used == 0
+
+
+def test_reserve_borrows_across_shards():
+    q = QuotaAccountant(100, shards=8)
+    r = q.reserve(100)                    # larger than any single shard's slice
+    assert r is not None
+    assert q.reserve(1) is None
+
+
+def test_overdrawn_quota_pays_debt_first():
+    q = QuotaAccountant(100, used=150, shards=4)
+    q.free(30)
+    assert q.reserve(1) is None
+    q.free(30)
+    assert q.reserve(10) is not None
+    assert q.reserve(1) is None
+
+
+def test_concurrent_reservations_never_overshoot():
+    q = QuotaAccountant(1000, shards=16)
+    granted = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(400)
+
+    def worker():
+        barrier.wait()
+        r = q.reserve(7)
+        if r is not None:
+            q.commit(r)
+            with lock:
+                granted.append(r)
+
+    threads = [threading.Thread(target=worker) for _ in range(400)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(granted) == 1000 // 7
+    assert q.used == len(granted) * 7
+    assert q.reserved == 0
+
+
+def test_split_carves_child_reservations():
+    q = QuotaAccountant(100, shards=4)
+    parent = q.reserve(80)
+    child = q.split(parent, 30)
+    assert q.split(parent, 60) is None    # only 50 left in the parent
+    q.commit(child)
+    q.release(parent)
+    assert q.used == 30 and q.reserved == 0
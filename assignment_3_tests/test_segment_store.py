@@ -0,0 +1,92 @@
+import os
+from assignment_3.utils.segment_store import SegmentStore
+
+
+def test_put_read_delete(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.put('a', {'Content-Type': 'text/plain'}, b'hello')
+    store.put('b', {}, b'world')
+    assert store.read('a') == ({'Content-Type': 'text/plain'}, b'hello')
+    assert store.delete('a') == 5
+    assert store.delete('a') is None
+    assert store.read('a') is None
+    assert store.live_bytes() == 5
+
+
+def test_index_rebuilt_from_footers_and_active_segment(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_size=100)
+    for i in range(20):
+        store.put(f'id{i}', {'X-Rebase-N': str(i)}, b'x' * 30)
+    store.delete('id3')
+    store.put('id4', {}, b'new')
+    store.close()
+    assert len(os.listdir(store.dir)) > 1
+
+    reopened = SegmentStore(str(tmp_path), segment_size=100)
+    assert reopened.read('id3') is None
+    assert reopened.read('id4') == ({}, b'new')
+    assert reopened.read('id19') == ({'X-Rebase-N': '19'}, b'x' * 30)
+    assert len(reopened.index) == 19
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.put('a', {}, b'hello')
+    store.close()
+    path = store._path(store._active)
+    with open(path, 'ab') as sf:
+        sf.write(b'RBS1\x01\x00')
+
+    reopened = SegmentStore(str(tmp_path))
+    assert reopened.read('a') == ({}, b'hello')
+    reopened.put('b', {}, b'again')
+    reopened.close()
+    assert SegmentStore(str(tmp_path)).read('b') == ({}, b'again')
+
+
+def test_compaction_keeps_live_blobs_and_tombstones(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_size=200)
+    for i in range(12):
+        store.put(f'id{i}', {}, b'y' * 40)
+    for i in range(0, 12, 2):
+        store.delete(f'id{i}')
+    for i in range(12):
+        store.put(f'filler{i}', {}, b'z' * 40)
+    before = store.stats()
+
+    assert store.compact(0.3) > 0
+    after = store.stats()
+    assert after['segments'] < before['segments'] or after['bytes'] < before['bytes']
+    for i in range(12):
+        expected = None if i % 2 == 0 else ({}, b'y' * 40)
+        assert store.read(f'id{i}') == expected
+    store.close()
+
+    reopened = SegmentStore(str(tmp_path), segment_size=200)
+    for i in range(12):
+        assert (reopened.read(f'id{i}') is None) == (i % 2 == 0)
+
+
+def test_compaction_and_deletes_sync_before_dropping_anything(tmp_path, monkeypatch):
+    import os
+    from assignment_3.utils import segment_store
+    store = SegmentStore(str(tmp_path), segment_size=200)
+    for i in range(12):
+        store.put(f'id{i}', {}, b'y' * 40)
+    synced = []
+    for i in range(0, 12, 2):
+        store.delete(f'id{i}', synced.append)
+    assert synced[-1] == [store._path(store._active)]
+
+    events = []
+    real_remove = os.remove
+    monkeypatch.setattr(segment_store.os, 'remove', lambda path: events.append('remove') or real_remove(path))
+    assert store.compact(0.3, lambda paths: events.append(paths)) > 0
+    assert events and events[0] != 'remove'
+    # Every removal of an old segment follows a sync of the copies' segments (and the dir)
+    for before, event in zip(events, events[1:]):
+        if event == 'remove':
+            assert before != 'remove' and store.dir in before
+    copied = {p for e in events if e != 'remove' for p in e}
+    assert all(store.segment_path(f'id{i}') in copied for i in range(1, 12, 2))
+    store.close()
@@ -3,9 +3,9 @@ from assignment_3.app import make_app
 
 @pytest.fixture
 def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATA_DIR', str(tmp_path / "data"))
     app = make_app()
     app.config['DATA_DIR'] = str(tmp_path / "data")
-    monkeypatch.setenv('DATA_DIR', app.config['DATA_DIR'])
     client = app.test_client()
     yield client
 
@@ -40,4 +40,516 @@ def test_size_limit(client):
         headers={"Content-Length": str(len(big))},
         data=big
     )
-    assert rv.status_code == 413
\ No newline at end of file
+    assert rv.status_code == 413
+
+def test_usage_survives_restart(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    data = b"x" * 100
+    client.post("/api/v0/blobs/keep", headers={"Content-Length": str(len(data))}, data=data)
+    client.post("/api/v0/blobs/gone", headers={"Content-Length": str(len(data))}, data=data)
+    client.delete("/api/v0/blobs/gone")
+    assert routes.quota.used == 100
+
+    make_app()
+    assert routes.quota.used == 100
+
+
+def test_concurrent_uploads_respect_quota(client):
+    import threading
+    from assignment_3.api.v0 import file_management_routes as routes
+    from assignment_3.utils.usage_journal import walk_usage
+    app = client.application
+    routes.quota.set_limit(100 * 1024)
+    data = b"x" * 1024
+    statuses = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(300)
+
+    def upload(i):
+        c = app.test_client()
+        barrier.wait()
+        rv = c.post(f"/api/v0/blobs/par{i}", headers={"Content-Length": str(len(data))}, data=data)
+        with lock:
+            statuses.append(rv.status_code)
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(300)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses.count(201) == 100
+    assert statuses.count(413) == 200
+    assert routes.quota.used == 100 * 1024
+    assert walk_usage(app.config['DATA_DIR']) == 100 * 1024
+
+
+def test_dedup_counts_unique_bytes(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    client.application.config['DEDUP'] = True
+    data = b"same bytes" * 10
+    for blob_id in ("d1", "d2"):
+        rv = client.post(f"/api/v0/blobs/{blob_id}", headers={"Content-Length": str(len(data))}, data=data)
+        assert rv.status_code == 201
+    assert routes.quota.used == len(data)
+    assert client.get("/api/v0/blobs/d2").data == data
+
+    client.delete("/api/v0/blobs/d1")
+    assert routes.collect_content() == 0
+    assert client.get("/api/v0/blobs/d2").data == data
+
+    client.delete("/api/v0/blobs/d2")
+    assert client.get("/api/v0/blobs/d2").status_code == 404
+    assert routes.collect_content() == len(data)
+    assert routes.quota.used == 0
+
+
+def test_small_blobs_go_to_segments(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    client.application.config['SEGMENT_STORE'] = True
+    small, large = b"s" * 100, b"L" * 5000
+    for blob_id, data in (("small", small), ("large", large)):
+        rv = client.post(f"/api/v0/blobs/{blob_id}",
+                         headers={"Content-Length": str(len(data)), "X-Rebase-Kind": blob_id}, data=data)
+        assert rv.status_code == 201
+    assert "small" in routes.segment_store.index
+    assert "large" not in routes.segment_store.index
+    rv = client.get("/api/v0/blobs/small")
+    assert rv.data == small and rv.headers["X-Rebase-Kind"] == "small"
+    assert client.get("/api/v0/blobs/large").data == large
+    assert routes.quota.used == len(small) + len(large)
+
+    # Growing past the threshold moves the blob to the per-file layout
+    client.post("/api/v0/blobs/small", headers={"Content-Length": str(len(large))}, data=large)
+    assert "small" not in routes.segment_store.index
+    assert client.get("/api/v0/blobs/small").data == large
+
+    client.delete("/api/v0/blobs/large")
+    client.delete("/api/v0/blobs/small")
+    assert routes.quota.used == 0
+
+
+def test_hot_blob_cache_invalidated_on_write(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    routes.init_blob_cache(1024 * 1024, 64 * 1024)
+    client.post("/api/v0/blobs/hot", headers={"Content-Length": "3", "X-Rebase-V": "1"}, data=b"one")
+    for _ in range(3):
+        rv = client.get("/api/v0/blobs/hot")
+        assert rv.data == b"one" and rv.headers["X-Rebase-V"] == "1"
+    stats = client.get("/api/v0/stats").get_json()["cache"]
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+    client.post("/api/v0/blobs/hot", headers={"Content-Length": "3", "X-Rebase-V": "2"}, data=b"two")
+    rv = client.get("/api/v0/blobs/hot")
+    assert rv.data == b"two" and rv.headers["X-Rebase-V"] == "2"
+
+    client.delete("/api/v0/blobs/hot")
+    assert client.get("/api/v0/blobs/hot").status_code == 404
+
+
+@pytest.mark.parametrize("segment_store", [False, True])
+def test_conditional_get(client, segment_store):
+    import hashlib
+    client.application.config['SEGMENT_STORE'] = segment_store
+    data = b"etag me"
+    client.post("/api/v0/blobs/cond", headers={"Content-Length": str(len(data))}, data=data)
+
+    rv = client.get("/api/v0/blobs/cond")
+    etag = rv.headers["ETag"]
+    assert etag == '"%s"' % hashlib.sha256(data).hexdigest()
+    assert rv.headers["Cache-Control"] == "no-cache"
+    last_modified = rv.headers["Last-Modified"]
+
+    rv = client.get("/api/v0/blobs/cond", headers={"If-None-Match": etag})
+    assert rv.status_code == 304 and rv.data == b"" and rv.headers["ETag"] == etag
+    rv = client.head("/api/v0/blobs/cond", headers={"If-None-Match": f'W/"nope", {etag}'})
+    assert rv.status_code == 304
+    rv = client.get("/api/v0/blobs/cond", headers={"If-Modified-Since": last_modified})
+    assert rv.status_code == 304
+    rv = client.get("/api/v0/blobs/cond", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert rv.status_code == 200 and rv.data == data
+
+    rv = client.head("/api/v0/blobs/cond")
+    assert rv.status_code == 200 and rv.headers["Content-Length"] == str(len(data))
+
+
+def test_multipart_upload(client):
+    import threading
+    from assignment_3.api.v0 import file_management_routes as routes
+    rv = client.post("/api/v0/blobs/multi/uploads",
+                     headers={"Content-Type": "text/plain", "X-Rebase-Parts": "3"})
+    assert rv.status_code == 201
+    upload_id = rv.get_json()["upload_id"]
+    parts = {1: b"a" * 1000, 2: b"b" * 2000, 3: b"c" * 10}
+
+    def put(n):
+        c = client.application.test_client()
+        rv = c.put(f"/api/v0/blobs/multi/uploads/{upload_id}/parts/{n}",
+                   headers={"Content-Length": str(len(parts[n]))}, data=parts[n])
+        assert rv.status_code == 201
+
+    threads = [threading.Thread(target=put, args=(n,)) for n in (3, 1, 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.get("/api/v0/blobs/multi").status_code == 404
+
+    rv = client.post(f"/api/v0/blobs/multi/uploads/{upload_id}/complete")
+    assert rv.status_code == 201
+    rv = client.get("/api/v0/blobs/multi")
+    assert rv.data == parts[1] + parts[2] + parts[3]
+    assert rv.headers["Content-Type"] == "text/plain"
+    assert rv.headers["X-Rebase-Parts"] == "3"
+    assert rv.headers["ETag"].endswith('-3"')
+    assert routes.quota.used == 3010
+
+    rv = client.post(f"/api/v0/blobs/multi/uploads/{upload_id}/complete")
+    assert rv.status_code == 404
+
+
+def test_multipart_abort_and_expiry_free_quota(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    for _ in range(2):
+        upload_id = client.post("/api/v0/blobs/m2/uploads").get_json()["upload_id"]
+        rv = client.put(f"/api/v0/blobs/m2/uploads/{upload_id}/parts/1", headers={"Content-Length": "5"}, data=b"12345")
+        assert rv.status_code == 201
+    assert routes.quota.used == 10
+
+    assert client.delete(f"/api/v0/blobs/m2/uploads/{upload_id}").status_code == 204
+    assert routes.quota.used == 5
+    assert routes.expire_multipart_uploads(0) == 1
+    assert routes.quota.used == 0
+
+    rv = client.put(f"/api/v0/blobs/m2/uploads/{upload_id}/parts/1", headers={"Content-Length": "5"}, data=b"12345")
+    assert rv.status_code == 404
+    assert client.put("/api/v0/blobs/m2/uploads/..%2f..%2fx/parts/1", data=b"").status_code in (400, 404)
+
+
+def test_multipart_complete_reuses_the_parts_quota(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    routes.quota.set_limit(1000)
+    upload_id = client.post("/api/v0/blobs/mq/uploads").get_json()["upload_id"]
+    for number, size in ((1, 300), (2, 300), (3, 50)):
+        rv = client.put(f"/api/v0/blobs/mq/uploads/{upload_id}/parts/{number}",
+                        headers={"Content-Length": str(size)}, data=b"q" * size)
+        assert rv.status_code == 201
+    assert routes.quota.used == 650
+    assert client.post(f"/api/v0/blobs/mq/uploads/{upload_id}/complete", json={"parts": [1, 2]}).status_code == 201
+    assert routes.quota.used == 600                 # The unused part is refunded, the rest moved to the blob
+    assert routes.usage_journal.total == 600
+    assert client.delete("/api/v0/blobs/mq").status_code == 204
+    assert routes.quota.used == 0 and routes.usage_journal.total == 0
+
+
+def test_multipart_failed_complete_stays_completable(client):
+    import os
+    from assignment_3.api.v0 import file_management_routes as routes
+    from assignment_3.utils.multipart import CLAIMED
+    upload_id = client.post("/api/v0/blobs/m3/uploads").get_json()["upload_id"]
+    client.put(f"/api/v0/blobs/m3/uploads/{upload_id}/parts/1", headers={"Content-Length": "5"}, data=b"12345")
+
+    for bad in ({"parts": 5}, {"parts": ["1"]}, {"parts": [7]}):
+        assert client.post(f"/api/v0/blobs/m3/uploads/{upload_id}/complete", json=bad).status_code == 400
+    assert client.post(f"/api/v0/blobs/m3/uploads/{upload_id}/complete", json={"parts": [1]}).status_code == 201
+    assert client.get("/api/v0/blobs/m3").data == b"12345"
+
+    # A complete that died after claiming: its parts are swept once the claim is stale
+    upload_id = client.post("/api/v0/blobs/m4/uploads").get_json()["upload_id"]
+    client.put(f"/api/v0/blobs/m4/uploads/{upload_id}/parts/1", headers={"Content-Length": "5"}, data=b"12345")
+    assert routes.multipart_uploads.claim(upload_id)
+    rv = client.put(f"/api/v0/blobs/m4/uploads/{upload_id}/parts/2", headers={"Content-Length": "3"}, data=b"abc")
+    assert rv.status_code == 404  # No longer accepting parts
+    used = routes.quota.used
+    assert routes.expire_multipart_uploads(3600) == 0
+    assert routes.expire_multipart_uploads(-1) == 1
+    assert routes.quota.used == used - 5
+    assert not os.path.exists(os.path.join(routes.multipart_uploads.root, upload_id, CLAIMED))
+
+
+def test_batch_put_and_get(client):
+    import io
+    import tarfile
+    from assignment_3.api.v0 import file_management_routes as routes
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w', format=tarfile.PAX_FORMAT) as tar:
+        for name, body in (("b1", b"one"), ("b2", b"two" * 1000), ("bad id", b"x")):
+            info = tarfile.TarInfo(name)
+            info.size = len(body)
+            info.pax_headers = {"REBASE.Content-Type": "text/plain", "REBASE.X-Rebase-Name": name}
+            tar.addfile(info, io.BytesIO(body))
+    rv = client.post("/api/v0/batch/put", data=buf.getvalue(),
+                     headers={"Content-Length": str(len(buf.getvalue()))})
+    assert rv.status_code == 200
+    assert [r["status"] for r in rv.get_json()["results"]] == [201, 201, 400]
+    assert routes.quota.used == 3003 and routes.quota.reserved == 0
+    assert client.get("/api/v0/blobs/b2").headers["X-Rebase-Name"] == "b2"
+
+    rv = client.post("/api/v0/batch/get", json={"ids": ["b2", "missing", "b1"]})
+    assert rv.status_code == 200
+    with tarfile.open(fileobj=io.BytesIO(rv.data), mode='r') as tar:
+        members = tar.getmembers()
+        assert [m.name for m in members] == ["b2", "missing", "b1"]
+        assert tar.extractfile(members[0]).read() == b"two" * 1000
+        assert members[0].pax_headers["REBASE.Content-Type"] == "text/plain"
+        assert members[1].pax_headers["REBASE.status"] == "404"
+        assert tar.extractfile(members[2]).read() == b"one"
+
+    assert client.post("/api/v0/batch/get", json={"ids": ["../x"]}).status_code == 400
+
+
+def test_list_blobs(client, tmp_path):
+    import shutil
+    import threading
+    for i in range(5):
+        client.post(f"/api/v0/blobs/item{i}", headers={"Content-Length": "3"}, data=b"abc")
+    client.post("/api/v0/blobs/other", headers={"Content-Length": "1"}, data=b"x")
+    client.delete("/api/v0/blobs/item2")
+
+    rv = client.get("/api/v0/blobs?prefix=item&limit=2")
+    assert rv.get_json() == {"blobs": [{"id": "item0", "size": 3}, {"id": "item1", "size": 3}], "next": "item1"}
+    rv = client.get("/api/v0/blobs?prefix=item&limit=2&after=item1")
+    assert [b["id"] for b in rv.get_json()["blobs"]] == ["item3", "item4"]
+    rv = client.get("/api/v0/blobs?prefix=item&limit=2&after=item4")
+    assert rv.get_json() == {"blobs": [], "next": None}
+    assert client.get("/api/v0/blobs?limit=0").status_code == 400
+    assert client.get("/api/v0/blobs?prefix=../").status_code == 400
+
+    # A tree from before the index existed is indexed at startup
+    shutil.rmtree(tmp_path / "data" / "_index")
+    make_app()
+    rv = client.get("/api/v0/blobs")
+    assert [b["id"] for b in rv.get_json()["blobs"]] == ["item0", "item1", "item3", "item4", "other"]
+
+    # A crash can leave the index behind the disk; the next boot reconciles it in the background
+    from assignment_3.api.v0 import file_management_routes as routes
+    routes.blob_index.delete("item0")          # Blob on disk, index update lost
+    routes.blob_index.put("ghost", 7)          # Indexed, but the blob never landed
+    routes.blob_index.close = lambda: None     # Crashed: never closed
+    make_app()
+    for t in threading.enumerate():
+        if t.name == 'index-reconcile':
+            t.join()
+    assert not routes.blob_index.stale
+    rv = client.get("/api/v0/blobs")
+    assert [b["id"] for b in rv.get_json()["blobs"]] == ["item0", "item1", "item3", "item4", "other"]
+
+
+def test_delete_is_reclaimed_in_background(client):
+    from assignment_3.api.v0 import file_management_routes as routes
+    client.post("/api/v0/blobs/doomed", headers={"Content-Length": "4"}, data=b"1234")
+    client.post("/api/v0/blobs/doomed", headers={"Content-Length": "2"}, data=b"12")
+    assert client.delete("/api/v0/blobs/doomed").status_code == 204
+    assert client.get("/api/v0/blobs/doomed").status_code == 404
+    assert routes.quota.used == 0
+    assert routes.trash.pending() == 2
+
+    assert routes.trash.reclaim() > 6         # bodies plus metadata.json
+    assert client.get("/api/v0/stats").get_json()["trash"]["pending"] == 0
+
+
+def test_compression_at_rest(client):
+    import gzip
+    import json
+    from assignment_3.api.v0 import file_management_routes as routes
+    client.application.config['COMPRESS'] = True
+    data = json.dumps([{"id": i, "name": "user", "active": True} for i in range(500)]).encode()
+    rv = client.post("/api/v0/blobs/doc.json", data=data,
+                     headers={"Content-Length": str(len(data)), "Content-Type": "application/json"})
+    assert rv.status_code == 201
+    assert routes.quota.used < len(data) / 5
+
+    rv = client.get("/api/v0/blobs/doc.json")
+    assert rv.data == data
+    assert rv.headers["Content-Length"] == str(len(data))
+    assert "Content-Encoding" not in rv.headers
+
+    rv = client.get("/api/v0/blobs/doc.json", headers={"Accept-Encoding": "gzip, deflate"})
+    assert rv.headers["Content-Encoding"] == "gzip"
+    assert rv.headers["Vary"] == "Accept-Encoding"
+    assert rv.headers["ETag"].endswith('-gzip"')
+    assert gzip.decompress(rv.data) == data
+    assert int(rv.headers["Content-Length"]) == routes.quota.used
+    rv = client.get("/api/v0/blobs/doc.json", headers={"Accept-Encoding": "gzip", "If-None-Match": rv.headers["ETag"]})
+    assert rv.status_code == 304
+
+    binary = bytes(range(256)) * 4
+    client.post("/api/v0/blobs/raw.bin", data=binary, headers={"Content-Length": str(len(binary))})
+    rv = client.get("/api/v0/blobs/raw.bin", headers={"Accept-Encoding": "gzip"})
+    assert rv.data == binary and "Content-Encoding" not in rv.headers
+
+    client.delete("/api/v0/blobs/doc.json")
+    assert routes.quota.used == len(binary)
+
+
+@pytest.mark.parametrize("mode", ["per-request", "group"])
+@pytest.mark.parametrize("storage", ["file", "segment", "dedup"])
+def test_durable_uploads(client, mode, storage):
+    from assignment_3.api.v0 import file_management_routes as routes
+    routes.init_durability(mode, 0.001)
+    client.application.config['SEGMENT_STORE'] = storage == "segment"
+    client.application.config['DEDUP'] = storage == "dedup"
+    for i in range(3):
+        rv = client.post(f"/api/v0/blobs/durable{i}", headers={"Content-Length": "5"}, data=b"hello")
+        assert rv.status_code == 201
+    assert client.get("/api/v0/blobs/durable2").data == b"hello"
+    assert client.delete("/api/v0/blobs/durable2").status_code == 204
+    assert client.get("/api/v0/blobs/durable2").status_code == 404
+
+
+@pytest.mark.parametrize("storage", ["file", "segment", "dedup"])
+def test_failed_overwrite_keeps_previous_version(client, storage):
+    import base64
+    import hashlib
+    from assignment_3.api.v0 import file_management_routes as routes
+    client.application.config['SEGMENT_STORE'] = storage == "segment"
+    client.application.config['DEDUP'] = storage == "dedup"
+    assert client.post("/api/v0/blobs/keep", headers={"Content-Length": "3"}, data=b"old").status_code == 201
+    bad = "sha-256=" + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+    rv = client.post("/api/v0/blobs/keep", headers={"Content-Length": "3", "Digest": bad}, data=b"new")
+    assert rv.status_code == 400
+    assert client.get("/api/v0/blobs/keep").data == b"old"
+
+    routes.quota.set_limit(5)                   # Room for the old body, not for both
+    rv = client.post("/api/v0/blobs/keep", headers={"Content-Length": "4"}, data=b"newr")
+    assert rv.status_code == 413
+    assert client.get("/api/v0/blobs/keep").data == b"old"
+    assert routes.quota.used == 3
+
+    routes.quota.set_limit(100)
+    assert client.post("/api/v0/blobs/keep", headers={"Content-Length": "3"}, data=b"new").status_code == 201
+    assert client.get("/api/v0/blobs/keep").data == b"new"
+    if storage == "dedup":
+        routes.collect_content(full=True)       # The old content is refunded by the GC
+    assert routes.quota.used == 3
+
+
+@pytest.mark.parametrize("mode", ["per-request", "group"])
+def test_durable_multipart_complete(client, mode, monkeypatch):
+    import os
+    from assignment_3.api.v0 import file_management_routes as routes
+    routes.init_durability(mode, 0.001)
+    synced = []
+    real_sync = routes._sync
+    monkeypatch.setattr(routes, '_sync', lambda paths: synced.extend(paths) or real_sync(paths))
+    upload_id = client.post("/api/v0/blobs/dmulti/uploads").get_json()["upload_id"]
+    client.put(f"/api/v0/blobs/dmulti/uploads/{upload_id}/parts/1", headers={"Content-Length": "5"}, data=b"hello")
+    assert client.post(f"/api/v0/blobs/dmulti/uploads/{upload_id}/complete").status_code == 201
+    blob_dir = routes._compute_blob_dir("dmulti")
+    staging = os.path.join(routes._disk_of(blob_dir), routes.STAGING_DIR)
+    staged = {os.path.basename(p) for p in synced if os.path.dirname(os.path.dirname(p)) == staging}
+    assert {'data', 'metadata.json'} <= staged
+    assert {os.path.dirname(blob_dir), staging} <= set(synced)
+    assert client.get("/api/v0/blobs/dmulti").data == b"hello"
+
+
+def test_disks_rebalance_when_one_is_added(tmp_path, monkeypatch):
+    import os
+    from assignment_3.api.v0 import file_management_routes as routes
+    disks = [str(tmp_path / name) for name in ("d1", "d2", "d3")]
+    monkeypatch.setenv('DATA_DIR', ",".join(disks[:2]))
+    c = make_app().test_client()
+    routes.rebalance_disks()
+    for i in range(40):
+        c.post(f"/api/v0/blobs/spread{i}", headers={"Content-Length": "4"}, data=b"data")
+    assert routes.quota.used == 160
+
+    monkeypatch.setenv('DATA_DIR', ",".join(disks))
+    c = make_app().test_client()
+    routes._rebalancer_stop.set()        # Drive the move by hand below
+    assert all(c.get(f"/api/v0/blobs/spread{i}").data == b"data" for i in range(40))
+
+    routes.rebalance_disks()
+    on_new_disk = [i for i in range(40) if os.path.isdir(routes._blob_dir_on(disks[2], f"spread{i}"))]
+    assert on_new_disk
+    for i in range(40):
+        blob_id = f"spread{i}"
+        homes = [d for d in disks if os.path.isdir(routes._blob_dir_on(d, blob_id))]
+        assert homes == [routes.disk_ring.disk_for(blob_id)]
+        assert c.get(f"/api/v0/blobs/{blob_id}").data == b"data"
+    assert routes.quota.used == 160
+    assert c.delete("/api/v0/blobs/spread0").status_code == 204
+    assert routes.quota.used == 156
+    stats = c.get("/api/v0/stats").get_json()["disks"]
+    assert len(stats) == 3
+    for entry in stats:
+        homed = sum(os.path.isdir(routes._blob_dir_on(entry["path"], f"spread{i}")) for i in range(40))
+        assert entry["placed_bytes"] == 4 * homed
+    assert sum(entry["placed_bytes"] for entry in stats) == 156
+
+
+@pytest.mark.parametrize("storage", ["file", "segment", "dedup"])
+def test_upload_digest_and_scrub(client, storage):
+    import base64
+    import hashlib
+    from assignment_3.api.v0 import file_management_routes as routes
+    from assignment_3.utils.integrity import IntegrityError
+    client.application.config['SEGMENT_STORE'] = storage == "segment"
+    client.application.config['DEDUP'] = storage == "dedup"
+    data = b"checked body"
+    good = "sha-256=" + base64.b64encode(hashlib.sha256(data).digest()).decode()
+    bad = "sha-256=" + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+
+    rv = client.post("/api/v0/blobs/sum1", headers={"Content-Length": str(len(data)), "Digest": bad}, data=data)
+    assert rv.status_code == 400
+    assert client.get("/api/v0/blobs/sum1").status_code == 404
+    assert routes.quota.used == 0
+    assert client.post("/api/v0/blobs/sum1", headers={"Content-Length": "3", "Digest": "junk"},
+                       data=b"abc").status_code == 400
+    rv = client.post("/api/v0/blobs/sum1", headers={"Content-Length": str(len(data)), "Digest": good}, data=data)
+    assert rv.status_code == 201
+    assert routes.scrub_blobs() == {'checked': 1, 'unverified': 0, 'corrupt': []}
+
+    if storage == "segment":
+        return
+    # Flip a byte on disk behind the server's back
+    data_path, _ = routes._find_blob("sum1")
+    with open(data_path, 'r+b') as f:
+        f.write(b"C")
+    assert routes.scrub_blobs()['corrupt'] == ["sum1"]
+    assert client.get("/api/v0/blobs/sum1").data != data     # Not verified by default
+
+    routes.init_integrity(True, 0, 0)
+    with pytest.raises(IntegrityError):
+        client.get("/api/v0/blobs/sum1").data                # Streamed: the response is cut short
+    routes.init_blob_cache(1024, 1024)
+    assert client.get("/api/v0/blobs/sum1").status_code == 500   # Buffered: refused outright
+    assert client.get("/api/v0/stats").get_json()["integrity"]["verify_reads"] is True
+
+
+@pytest.mark.parametrize("legacy_part", [False, True])
+def test_multipart_blob_is_checksummed(client, monkeypatch, legacy_part):
+    import os
+    from assignment_3.api.v0 import file_management_routes as routes
+    from assignment_3.utils import multipart
+    from assignment_3.utils.integrity import CHECKSUM_KEY, Checksum
+    upload_id = client.post("/api/v0/blobs/msum/uploads").get_json()["upload_id"]
+    for number, part in ((1, b"first "), (2, b"second")):
+        client.put(f"/api/v0/blobs/msum/uploads/{upload_id}/parts/{number}",
+                   headers={"Content-Length": str(len(part))}, data=part)
+    if legacy_part:
+        os.remove(routes.multipart_uploads.part_path(upload_id, 1) + multipart.CHECKSUM_SUFFIX)
+
+    kernel_copies = []
+    if hasattr(os, 'copy_file_range'):
+        real_copy = os.copy_file_range
+        monkeypatch.setattr(multipart.os, 'copy_file_range',
+                            lambda *args: kernel_copies.append(args[2]) or real_copy(*args))
+    concat_checksums = []
+    real_concat = routes.concat_files
+    monkeypatch.setattr(routes, 'concat_files',
+                        lambda dest, paths, checksum=None: concat_checksums.append(checksum)
+                        or real_concat(dest, paths, checksum))
+    assert client.post(f"/api/v0/blobs/msum/uploads/{upload_id}/complete").status_code == 201
+    # Combined from the parts' own checksums, so the copy can stay in the kernel
+    assert (concat_checksums[0] is not None) == legacy_part
+    if hasattr(os, 'copy_file_range') and not legacy_part:
+        assert sum(kernel_copies) == len(b"first second")
+    data_path, metadata = routes._find_blob("msum")
+    expected = Checksum()
+    expected.update(b"first second")
+    assert metadata[CHECKSUM_KEY] == expected.token()
+    assert routes.scrub_blobs() == {'checked': 1, 'unverified': 0, 'corrupt': []}
+    with open(data_path, 'r+b') as f:
+        f.write(b"F")
+    assert routes.scrub_blobs()['corrupt'] == ["msum"]
@@ -0,0 +1,39 @@
+import os
+import time
+import threading
+from assignment_3.utils.trash import Trash
+
+
+def test_bury_then_reclaim_at_rate(tmp_path):
+    trash = Trash(str(tmp_path))
+    blob_dir = tmp_path / "abc" / "de" / "blob"
+    blob_dir.mkdir(parents=True)
+    for name in ("data", "metadata.json", "extra"):
+        (blob_dir / name).write_bytes(b"x" * 10000)
+
+    synced = []
+    assert trash.bury(str(blob_dir), synced.append)
+    assert synced == [[str(blob_dir.parent), trash.root]]
+    assert not blob_dir.exists()
+    assert not trash.bury(str(blob_dir))
+    assert trash.pending() == 1
+
+    start = time.monotonic()
+    assert trash.reclaim(rate=100000) == 30000
+    assert time.monotonic() - start >= 0.2     # 30 KB at 100 KB/s, the first file is free
+    assert trash.pending() == 0
+    assert os.listdir(trash.root) == []
+
+
+def test_reclaim_stops_when_asked(tmp_path):
+    trash = Trash(str(tmp_path))
+    blob_dir = tmp_path / "blob"
+    blob_dir.mkdir()
+    for name in ("data", "metadata.json"):
+        (blob_dir / name).write_bytes(b"x" * 10000)
+    trash.bury(str(blob_dir))
+
+    stop = threading.Event()
+    threading.Timer(0.05, stop.set).start()
+    assert trash.reclaim(rate=1000, stop=stop) == 10000    # Waiting out the first file when stopped
+    assert trash.pending() == 1
@@ -0,0 +1,92 @@
+import os
+from assignment_3.utils.usage_journal import UsageJournal, reconcile, walk_usage
+
+
+def test_journal_replays_after_restart(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    assert j.load() == 0
+    j.record(100, 'a')
+    j.record(50, 'b')
+    j.record(-100, 'a')
+    j.close()
+
+    j2 = UsageJournal(str(tmp_path))
+    assert j2.exists()
+    assert j2.load() == 50
+    j2.close()
+
+
+def test_journal_ignores_torn_line(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    j.load()
+    j.record(10, 'a')
+    j.close()
+    with open(j.journal_path, 'a', encoding='utf-8') as jf:
+        jf.write('+9x')
+
+    j2 = UsageJournal(str(tmp_path))
+    assert j2.load() == 10
+    j2.close()
+
+
+def test_journal_compacts_into_checkpoint(tmp_path):
+    j = UsageJournal(str(tmp_path), compact_every=3)
+    j.load()
+    for _ in range(7):
+        j.record(1, 'a')
+    j.close()
+    logs = [f for f in os.listdir(j.dir) if f.endswith('.log')]
+    assert logs == [os.path.basename(j.journal_path)]
+
+    j2 = UsageJournal(str(tmp_path))
+    assert j2.load() == 7
+    j2.close()
+
+
+def test_reconcile_counts_only_blob_data(tmp_path):
+    blob_dir = tmp_path / 'abc' / 'de' / 'foo'
+    blob_dir.mkdir(parents=True)
+    (blob_dir / 'data').write_bytes(b'x' * 10)
+    (blob_dir / 'data.tmp').write_bytes(b'x' * 5)
+    (blob_dir / 'metadata.json').write_text('{}')
+
+    assert walk_usage(str(tmp_path)) == 10
+    j = UsageJournal(str(tmp_path))
+    j.load()
+    assert reconcile(j, str(tmp_path)) == 10
+    j.close()
+    assert UsageJournal(str(tmp_path)).load() == 10
+
+
+def test_journal_tracks_bytes_per_disk(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    j.load()
+    assert not j.tracks_disks
+    j.record(100, 'a', '/mnt/a')
+    j.record(30, 'b', '/mnt/my disk')
+    j.record(-100, 'a', '/mnt/a')
+    j.record(100, 'a', '/mnt/my disk')
+    j.record(7, 'sha256:x')
+    j.close()
+
+    j2 = UsageJournal(str(tmp_path))
+    assert j2.load() == 137
+    assert j2.tracks_disks
+    assert j2.disks == {'/mnt/a': 0, '/mnt/my disk': 130}
+    j2.close()
+
+
+def test_reconcile_fills_in_per_disk_totals(tmp_path):
+    for disk, size in (('d1', 10), ('d2', 3)):
+        blob_dir = tmp_path / disk / 'abc' / 'de' / 'foo'
+        blob_dir.mkdir(parents=True)
+        (blob_dir / 'data').write_bytes(b'x' * size)
+    disks = [str(tmp_path / 'd1'), str(tmp_path / 'd2')]
+    j = UsageJournal(disks[0])
+    j.load()
+    assert reconcile(j, disks[0], blob_dirs=disks) == 13
+    j.close()
+    j2 = UsageJournal(disks[0])
+    j2.load()
+    assert j2.disks == {disks[0]: 10, disks[1]: 3}
+    j2.close()
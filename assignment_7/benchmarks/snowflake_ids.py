@@ -0,0 +1,87 @@
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+
+from users.snowflake import SnowflakeGenerator
+
+# python -m benchmarks.snowflake_ids [--count N] [--threads T] [--index-rows R]
+# Measures Snowflake IDs/s (one and T threads) against the old
+# "<ms><4 random digits>" strings, counts the old scheme's collisions, and with
+# --index-rows builds both key types in Postgres (DB_* settings) to compare
+# primary key index sizes.
+
+
+def legacy_id() -> str:
+    return f"{int(time.time() * 1000)}{random.randint(1000, 9999)}"
+
+
+def rate(make, count: int, threads: int = 1) -> float:
+    """IDs per second from ``threads`` threads calling ``make`` ``count`` times in total."""
+    per_thread = count // threads
+
+    def run():
+        for _ in range(per_thread):
+            make()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def legacy_collisions(count: int) -> int:
+    ids = [legacy_id() for _ in range(count)]
+    return len(ids) - len(set(ids))
+
+
+def index_sizes(rows: int) -> dict:
+    """Primary key index size in bytes for VARCHAR legacy IDs vs BIGINT Snowflakes."""
+    from users.db_utils import get_connection
+    generator = SnowflakeGenerator(0)
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        sizes = {}
+        for table, column_type, make in (("bench_ids_varchar", "VARCHAR", legacy_id),
+                                         ("bench_ids_bigint", "BIGINT", generator.next_id)):
+            cur.execute(f"CREATE TEMP TABLE {table} (id {column_type} NOT NULL)")
+            ids = {str(make()) for _ in range(rows)}  # Drop the legacy scheme's duplicates
+            cur.copy_expert(f"COPY {table} (id) FROM STDIN", io.StringIO("\n".join(ids) + "\n"))
+            cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+            cur.execute(f"SELECT pg_relation_size('{table}_pkey')")
+            sizes[column_type.lower()] = cur.fetchone()[0]
+        return sizes
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark user ID generation.")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--index-rows", type=int, default=0, help="also compare index sizes in Postgres")
+    args = parser.parse_args(argv)
+
+    generator = SnowflakeGenerator(0)
+    report = {
+        "ids_per_second": {
+            "snowflake": round(rate(generator.next_id, args.count)),
+            f"snowflake_{args.threads}_threads": round(rate(generator.next_id, args.count, args.threads)),
+            "legacy": round(rate(legacy_id, args.count)),
+        },
+        "legacy_collisions": legacy_collisions(args.count),
+    }
+    if args.index_rows:
+        report["index_bytes"] = index_sizes(args.index_rows)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
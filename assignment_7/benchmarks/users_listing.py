@@ -0,0 +1,121 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from users.db_utils import LIST_ACTIVE_USERS, LIST_ACTIVE_USERS_FIRST, get_connection
+
+# python -m benchmarks.users_listing [--rows 10000000] [--deleted-pct 30] [--keep]
+# Fills a scratch copy of the users table (same columns and indexes, DB_*
+# settings) and reports index sizes, plus the plan and latency of GET /users
+# pages at several depths: keyset pagination against the OFFSET it replaces.
+
+TABLE = "bench_users"
+DEPTHS = (0, 0.1, 0.5, 0.9)
+
+
+def _sql(query: str) -> str:
+    return query.replace("FROM users", f"FROM {TABLE}")
+
+
+def populate(cur, rows: int, deleted_pct: int):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(f"CREATE TABLE {TABLE} (LIKE users INCLUDING ALL)")
+    cur.execute(f"""
+        INSERT INTO {TABLE} (id, full_name, email, joined_at, deleted_since)
+        SELECT
+            g,
+            'User ' || g,
+            'user' || g || '@bench.test',
+            timestamp '2024-01-01' + g * interval '1 second',
+            CASE WHEN g %% 100 < %s THEN timestamp '2025-01-01' + (g %% 365) * interval '1 day' END
+        FROM generate_series(1, %s) g
+    """, (deleted_pct, rows))
+    cur.execute(f"VACUUM ANALYZE {TABLE}")
+
+
+def index_sizes(cur) -> dict:
+    cur.execute("""
+        SELECT indexrelid::regclass::text, pg_relation_size(indexrelid)
+        FROM pg_index WHERE indrelid = %s::regclass
+    """, (TABLE,))
+    return dict(cur.fetchall())
+
+
+def timed(cur, query: str, params: tuple, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur.execute(query, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0][0]
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(samples[-1], 3),
+        "plan": _summarise_plan(plan["Plan"]),
+        "shared_buffers_hit": plan["Plan"].get("Shared Hit Blocks"),
+        "shared_buffers_read": plan["Plan"].get("Shared Read Blocks"),
+    }
+
+
+def _summarise_plan(node: dict) -> str:
+    """``Limit > Index Scan using users_active_joined_idx`` style one-liner."""
+    parts = []
+    while node:
+        label = node["Node Type"]
+        if node.get("Index Name"):
+            label += f" using {node['Index Name']}"
+        parts.append(label)
+        node = (node.get("Plans") or [None])[0]
+    return " > ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GET /users pagination at scale.")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--deleted-pct", type=int, default=30, help="share of soft-deleted users")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help=f"leave {TABLE} in place")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        start = time.perf_counter()
+        populate(cur, args.rows, args.deleted_pct)
+        report = {"rows": args.rows, "deleted_pct": args.deleted_pct,
+                  "populate_s": round(time.perf_counter() - start, 1), "index_bytes": index_sizes(cur), "pages": {}}
+
+        cur.execute(f"SELECT count(*) FROM {TABLE} WHERE deleted_since IS NULL")
+        active = cur.fetchone()[0]
+        offset_query = _sql("""
+            SELECT id, email, full_name, joined_at FROM users
+            WHERE deleted_since IS NULL ORDER BY joined_at, id OFFSET %s LIMIT %s
+        """)
+        for depth in DEPTHS:
+            offset = int(active * depth)
+            if offset:
+                cur.execute(offset_query, (offset - 1, 1))
+                user_id, _, _, joined_at = cur.fetchone()
+                keyset = timed(cur, _sql(LIST_ACTIVE_USERS), (joined_at, user_id, args.limit), args.repeat)
+            else:
+                keyset = timed(cur, _sql(LIST_ACTIVE_USERS_FIRST), (args.limit,), args.repeat)
+            report["pages"][f"{int(depth * 100)}%"] = {
+                "keyset": keyset,
+                "offset": timed(cur, offset_query, (offset, args.limit), args.repeat),
+            }
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.close()
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,23 +1,176 @@
+import base64
+import binascii
+import csv
 import datetime
+import io
+import json
 import logging
-import random
 import re
-import time
+import threading
 
 from flask import Blueprint, jsonify, request
-from users.db_utils import execute_update, get_active_user_id, get_user_by_email
+from users.bloom_filter import DEFAULT_GRACE, EmailFilter
+from users.db_utils import (
+    execute_prepared_single, execute_query_all, get_connection, get_user_by_email, get_users_by_emails,
+    list_active_users, statements, transaction
+)
 from users.logger.log_types import LogEvent
-from users.logger.logger import log_error_event, log_user_deletion_event, log_user_event, log_user_retrieval_event
+from users.logger.logger import (
+    log_bulk_event, log_error_event, log_user_deletion_event, log_user_event, log_user_retrieval_event
+)
+from users.snowflake import SnowflakeGenerator
+from users.user_cache import NOTIFY_CHANNEL, UserCache, start_invalidation_listener
 
 users_api = Blueprint("users", __name__)
 logger = logging.getLogger("rbm_awesome_logger")
 EMAIL_REGEX = re.compile(r"^(?!.*\.\.)[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+MAX_BULK_ROWS = 100_000
+MAX_LOOKUP_EMAILS = 5000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NOTIFY_PAYLOAD_BYTES = 7000  # Email bytes per NOTIFY from a bulk import (Postgres caps payloads at 8000 bytes)
+
+user_cache = UserCache(0, 0)
+id_generator = None  # Set by init_id_generator from SNOWFLAKE_WORKER_ID
+email_filter = None
+_notify = False
+_listener_stop = None
+_filter_rebuild_stop = None
+
+
+def init_id_generator(worker_id: int):
+    global id_generator
+    id_generator = SnowflakeGenerator(worker_id)
+
+
+def init_user_cache(max_entries: int, ttl: float):
+    global user_cache
+    user_cache = UserCache(max_entries, ttl)
+
+
+def init_email_filter(enabled: bool, fp_rate: float, rebuild_interval: float, grace: float = DEFAULT_GRACE):
+    """Bloom filter of active emails, loaded (and periodically rebuilt) in the background."""
+    global email_filter, _filter_rebuild_stop
+    if _filter_rebuild_stop:
+        _filter_rebuild_stop.set()
+        _filter_rebuild_stop = None
+    email_filter = EmailFilter(fp_rate, grace) if enabled else None
+    if email_filter:
+        _filter_rebuild_stop = start_email_filter_rebuilder(email_filter, rebuild_interval)
+
+
+def rebuild_email_filter(target: EmailFilter = None):
+    target = target or email_filter
+    target.rebuild(lambda: (row[0] for row in
+                            execute_query_all("SELECT email FROM users WHERE deleted_since IS NULL")))
+
+
+def start_email_filter_rebuilder(target: EmailFilter, interval: float) -> threading.Event:
+    stop = threading.Event()
+
+    def run():
+        retry = 5  # Until the first load succeeds, everything is a "maybe"; retry soon
+        while True:
+            try:
+                rebuild_email_filter(target)
+            except Exception as e:
+                logger.error(f"Email filter rebuild failed: {e}")
+            if stop.wait(interval if target.ready else retry):
+                break
+
+    threading.Thread(target=run, name="email-filter-rebuilder", daemon=True).start()
+    return stop
+
+
+def init_change_listener(notify: bool):
+    """With ``notify``, writes are broadcast to other workers' caches and filters via LISTEN/NOTIFY."""
+    global _notify, _listener_stop
+    if _listener_stop:
+        _listener_stop.set()
+        _listener_stop = None
+    _notify = notify and (user_cache.enabled or email_filter is not None)
+    if _notify:
+        _listener_stop = start_invalidation_listener(get_connection, _on_remote_change, _on_listener_connect)
+
+
+def _on_remote_change(payload: str):
+    for email in payload.split("\n"):  # Bulk imports announce several emails per notification
+        if email_filter:
+            email_filter.add(email)
+        user_cache.invalidate(email)
+
+
+def _on_listener_connect():
+    user_cache.clear()
+    if email_filter and email_filter.ready:
+        # Sign-ups announced while we were disconnected must not become false 404s
+        threading.Thread(target=rebuild_email_filter, args=(email_filter,), daemon=True).start()
+
+
+def _register_write(name: str, sql: str) -> str:
+    """Register a write twice: as ``name``, and as ``name_notify`` with a pg_notify in its ``{notify}`` slot.
+
+    With NOTIFY on, each changed row also tells the other workers (delivered on
+    commit), so the write and the broadcast stay one statement and one round trip.
+    """
+    statements.register(name, sql.format(notify=""))
+    statements.register(f"{name}_notify", sql.format(notify=", pg_notify(%s, email)"))
+    return name
+
+
+def _notifying(name: str, params: tuple):
+    if not _notify:
+        return name, params
+    return f"{name}_notify", params + (NOTIFY_CHANNEL,)
+
+
+DELETE_USER = _register_write(
+    "delete_user",
+    "UPDATE users SET deleted_since = %s WHERE email = %s AND deleted_since IS NULL RETURNING id{notify}"
+)
+# The second branch of the UNION returns the existing ID when the upsert had
+# nothing to change, so every outcome takes this one statement
+UPSERT_USER = _register_write("upsert_user", """
+    WITH existing_user AS (
+        SELECT id, deleted_since IS NOT NULL as was_deleted
+        FROM users
+        WHERE email = %s
+    ),
+    upserted AS (
+        INSERT INTO users (id, full_name, email, joined_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (email) DO UPDATE
+        SET
+            full_name = EXCLUDED.full_name,
+            deleted_since = NULL
+        WHERE
+            users.full_name IS DISTINCT FROM EXCLUDED.full_name OR
+            users.deleted_since IS NOT NULL
+        RETURNING id, (xmax = 0) as is_inserted{notify}
+    )
+    SELECT
+        id,
+        true as changed,
+        is_inserted,
+        COALESCE((SELECT was_deleted FROM existing_user), false) as was_reactivated
+    FROM upserted
+    UNION ALL
+    SELECT id, false, false, false
+    FROM existing_user
+    WHERE NOT EXISTS (SELECT 1 FROM upserted)
+""")
 
 
 @users_api.route("/<email>", methods=["GET"])
 def get_user(email):
     try:
-        user = get_user_by_email(email, include_deleted=False)
+        if email_filter is not None and not email_filter.might_contain(email):
+            # Definitely no active user with this email: skip the database
+            log_user_retrieval_event(LogEvent.USER_NOT_FOUND)
+            return jsonify({"error": "User not found"}), 404
+        user = user_cache.get_or_load(email, get_user_by_email)
+        if user is None and email_filter is not None:
+            email_filter.record_false_positive()
         if user:
             user_id, email, full_name, joined_at = user
             log_user_retrieval_event(LogEvent.USER_RETRIEVED, user_id)
@@ -37,18 +190,91 @@ def get_user(email):
         return jsonify({"error": "internal server error"}), 500
 
 
+@users_api.route("/", methods=["GET"], strict_slashes=False)
+def list_users():
+    """Active users by join date, ``limit`` at a time; pass the returned ``next`` as ``after`` for the next page."""
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        after = _decode_cursor(request.args["after"]) if request.args.get("after") else None
+    except ValueError:
+        return jsonify({"error": "Invalid after or limit"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    try:
+        rows = list_active_users(after, limit + 1)  # One extra row tells whether there is a next page
+    except Exception as e:
+        log_error_event(LogEvent.DB_ERROR, str(e))
+        return jsonify({"error": "internal server error"}), 500
+
+    page = rows[:limit]
+    users = [{"email": email, "full_name": full_name, "joined_at": joined_at.isoformat() + "Z"}
+             for _, email, full_name, joined_at in page]
+    next_cursor = _encode_cursor(page[-1][3], page[-1][0]) if len(rows) > limit else None
+    log_bulk_event(LogEvent.USERS_LISTED, {"count": len(users)})
+    return jsonify({"users": users, "next": next_cursor}), 200
+
+
+def _encode_cursor(joined_at: datetime.datetime, user_id) -> str:
+    return base64.urlsafe_b64encode(f"{joined_at.isoformat()}|{user_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        joined_at, sep, user_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition("|")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if not sep or not user_id.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return datetime.datetime.fromisoformat(joined_at), user_id
+
+
+@users_api.route("/lookup", methods=["POST"])
+def lookup_users():
+    """Resolve ``{"emails": [...]}`` to active users in one query; results follow request order."""
+    data = request.get_json(silent=True)
+    emails = data.get("emails") if isinstance(data, dict) else None
+    if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+        return jsonify({"error": "emails must be a list of strings"}), 400
+    if len(emails) > MAX_LOOKUP_EMAILS:
+        return jsonify({"error": f"At most {MAX_LOOKUP_EMAILS} emails per lookup"}), 400
+
+    unique = list(dict.fromkeys(emails))
+    if email_filter is not None:
+        unique = [email for email in unique if email_filter.might_contain(email)]
+    try:
+        users = user_cache.get_or_load_many(unique, get_users_by_emails) if unique else {}
+    except Exception as e:
+        log_error_event(LogEvent.DB_ERROR, str(e))
+        return jsonify({"error": "internal server error"}), 500
+    if email_filter is not None:
+        for email in unique:
+            if users.get(email) is None:
+                email_filter.record_false_positive()
+
+    results = []
+    for email in emails:
+        user = users.get(email)
+        if user:
+            _, email, full_name, joined_at = user
+            results.append({"email": email, "full_name": full_name, "joined_at": joined_at.isoformat() + "Z"})
+        else:
+            results.append({"email": email, "error": "User not found"})
+    found = sum(1 for result in results if "error" not in result)
+    log_bulk_event(LogEvent.USERS_LOOKED_UP, {"requested": len(emails), "found": found,
+                                              "not_found": len(emails) - found})
+    return jsonify({"results": results}), 200
+
+
 @users_api.route("/<email>", methods=["DELETE"])
 def delete_user(email):
     try:
-        user_id = get_active_user_id(email)
-
         deleted_since = datetime.datetime.utcnow()
-        result, rows_affected = execute_update(
-            "UPDATE users SET deleted_since = %s WHERE email = %s AND deleted_since IS NULL", (deleted_since, email)
-        )
+        result = execute_prepared_single(*_notifying(DELETE_USER, (deleted_since, email)))
 
-        if rows_affected > 0:
-            log_user_deletion_event(LogEvent.USER_SOFT_DELETED, user_id)
+        if result:
+            user_cache.invalidate(email)
+            log_user_deletion_event(LogEvent.USER_SOFT_DELETED, result[0])
         else:
             log_user_deletion_event(LogEvent.USER_NOT_FOUND_OR_INACTIVE)
 
@@ -79,34 +305,15 @@ def create_or_update_user():
 
     user_id = generate_snowflake_id()
     joined_at = datetime.datetime.utcnow()
+    if email_filter is not None:
+        email_filter.add(email)  # Before the write, so no reader can see the user but get a filtered 404
 
     try:
-        upsert_query = """
-            WITH existing_user AS (
-                SELECT deleted_since IS NOT NULL as was_deleted 
-                FROM users
-                WHERE email = %s
-            )
-            INSERT INTO users (id, full_name, email, joined_at)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (email) DO UPDATE 
-            SET
-                full_name = EXCLUDED.full_name, 
-                deleted_since = NULL 
-            WHERE 
-                users.full_name IS DISTINCT FROM EXCLUDED.full_name OR 
-                users.deleted_since IS NOT NULL
-            RETURNING 
-                id,
-                email,
-                (xmax = 0) as is_inserted,
-                (xmax != 0) as is_updated,
-                (SELECT (xmax != 0 AND was_deleted) FROM existing_user) as was_reactivated
-        """
-        result, rows_affected = execute_update(upsert_query, (email, user_id, full_name, email, joined_at))
+        result = execute_prepared_single(*_notifying(UPSERT_USER, (email, user_id, full_name, email, joined_at)))
 
-        if result:
-            returned_user_id, email_returned, is_inserted, is_updated, was_reactivated = result
+        if result and result[1]:
+            user_cache.invalidate(email)  # Created, renamed or reactivated
+            returned_user_id, _, is_inserted, was_reactivated = result
 
             if is_inserted:
                 event = LogEvent.USER_CREATED
@@ -119,8 +326,8 @@ def create_or_update_user():
             return "", 201
 
         else:
-            existing_user_id = get_active_user_id(email)
-            log_user_event(LogEvent.USER_ALREADY_ACTIVE, existing_user_id or user_id)
+            # No row only if a concurrent create of the same email committed after our snapshot
+            log_user_event(LogEvent.USER_ALREADY_ACTIVE, result[0] if result else user_id)
             return "user already exists", 200
 
     except Exception as e:
@@ -128,7 +335,166 @@ def create_or_update_user():
         return jsonify({"error": "internal server error"}), 500
 
 
-def generate_snowflake_id():
-    timestamp = int(time.time() * 1000)
-    rand = random.randint(1000, 9999)
-    return f"{timestamp}{rand}"
+@users_api.route("/bulk", methods=["POST"])
+def bulk_import_users():
+    """Create or update many users at once from NDJSON or CSV (``email,full_name`` header).
+
+    Valid rows are COPYed into a staging table and applied with one set-based
+    upsert; the response lists every row's outcome in input order.
+    """
+    content_type = (request.mimetype or "").lower()
+    text = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        rows = _ndjson_rows(text)
+    elif content_type == "text/csv":
+        rows = _csv_rows(text)
+    else:
+        return jsonify({"error": "Expected application/x-ndjson or text/csv"}), 415
+
+    results, staged, seen = [], [], set()
+    try:
+        for line, email, full_name, error in rows:
+            if len(results) >= MAX_BULK_ROWS:
+                return jsonify({"error": f"At most {MAX_BULK_ROWS} rows per import"}), 413
+            error = error or _validate_user(email, full_name)
+            if not error and email in seen:
+                error = "Duplicate email in import"
+            result = {"line": line, "email": email}
+            if error:
+                result["status"], result["error"] = "invalid", error
+            else:
+                seen.add(email)
+                staged.append((line, email, full_name))
+            results.append(result)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Unreadable import: {e}"}), 400
+    if not results:
+        return jsonify({"error": "No rows"}), 400
+
+    if email_filter is not None:
+        for _, email, _ in staged:
+            email_filter.add(email)  # Before the write, as for single creates
+    try:
+        outcomes = _apply_bulk_upsert(staged) if staged else {}
+    except Exception as e:
+        log_error_event(LogEvent.DB_ERROR, str(e))
+        return jsonify({"error": "internal server error"}), 500
+
+    for result in results:
+        if "status" not in result:
+            result["status"] = outcomes[result["line"]]
+            if result["status"] != "already_active":
+                user_cache.invalidate(result["email"])
+    summary = {status: 0 for status in ("created", "reactivated", "updated", "already_active", "invalid")}
+    for result in results:
+        summary[result["status"]] += 1
+    log_bulk_event(LogEvent.USERS_BULK_IMPORTED, summary)
+    return jsonify({"summary": summary, "results": results}), 200
+
+
+def _validate_user(email: str, full_name: str):
+    if not email or not full_name:
+        return "email and full_name are required"
+    if len(email) > 200 or not EMAIL_REGEX.match(email):
+        return "Invalid email format"
+    if len(full_name) > 200:
+        return "Invalid full_name"
+    return None
+
+
+def _ndjson_rows(text):
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            yield line, "", "", "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line, "", "", "Expected a JSON object"
+            continue
+        yield line, str(data.get("email") or "").strip(), str(data.get("full_name") or "").strip(), None
+
+
+def _csv_rows(text):
+    reader = csv.DictReader(text)
+    for row in reader:
+        # reader.line_num counts physical lines, so quoted newlines keep line numbers honest
+        yield reader.line_num, (row.get("email") or "").strip(), (row.get("full_name") or "").strip(), None
+
+
+def _apply_bulk_upsert(staged: list) -> dict:
+    """COPY ``(line, email, full_name)`` rows into a temp table and upsert them in one statement.
+
+    Returns ``{line: status}`` with the single-user semantics: created, reactivated,
+    updated (name changed) or already_active (nothing to change).
+    """
+    joined_at = datetime.datetime.utcnow()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for line, email, full_name in staged:
+        writer.writerow((line, generate_snowflake_id(), email, full_name))
+    buf.seek(0)
+
+    with transaction() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE users_staging (
+                line INTEGER NOT NULL,
+                id BIGINT NOT NULL,
+                email VARCHAR(200) NOT NULL,
+                full_name VARCHAR(200) NOT NULL
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("COPY users_staging (line, id, email, full_name) FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute("ANALYZE users_staging")
+        # All CTEs share one snapshot, so existing_users is the state before the upsert
+        cur.execute("""
+            WITH existing_users AS (
+                SELECT u.email, u.deleted_since IS NOT NULL AS was_deleted
+                FROM users u
+                JOIN users_staging s ON s.email = u.email
+            ),
+            upserted AS (
+                INSERT INTO users (id, full_name, email, joined_at)
+                SELECT id, full_name, email, %s FROM users_staging
+                ON CONFLICT (email) DO UPDATE
+                SET
+                    full_name = EXCLUDED.full_name,
+                    deleted_since = NULL
+                WHERE
+                    users.full_name IS DISTINCT FROM EXCLUDED.full_name OR
+                    users.deleted_since IS NOT NULL
+                RETURNING email, (xmax = 0) AS is_inserted
+            )
+            SELECT
+                s.line,
+                CASE
+                    WHEN up.email IS NULL THEN 'already_active'
+                    WHEN up.is_inserted THEN 'created'
+                    WHEN e.was_deleted THEN 'reactivated'
+                    ELSE 'updated'
+                END
+            FROM users_staging s
+            LEFT JOIN upserted up ON up.email = s.email
+            LEFT JOIN existing_users e ON e.email = s.email
+        """, (joined_at,))
+        outcomes = dict(cur.fetchall())
+        if _notify:
+            # Delivered on commit, batched so other workers get a few hundred notifications, not one per user.
+            # Batches split on the running byte count, so each payload is at most NOTIFY_PAYLOAD_BYTES plus
+            # one email (VARCHAR(200): at most 800 bytes), well under the 8000-byte limit.
+            cur.execute("""
+                SELECT pg_notify(%s, string_agg(email, E'\n' ORDER BY line))
+                FROM (
+                    SELECT line, email,
+                           sum(octet_length(email) + 1) OVER (ORDER BY line ROWS UNBOUNDED PRECEDING) AS running
+                    FROM users_staging
+                ) staged
+                GROUP BY running / %s
+            """, (NOTIFY_CHANNEL, NOTIFY_PAYLOAD_BYTES))
+    return outcomes
+
+
+def generate_snowflake_id() -> int:
+    return id_generator.next_id()
@@ -1,6 +1,7 @@
 import atexit
 import logging
 import logging.config
+import os
 import signal
 import sys
 import threading
@@ -8,9 +9,14 @@ import time
 from contextlib import contextmanager
 
 from flask import Flask, jsonify
-from users.api.v0.users_routes import users_api
+from users.api.v0 import users_routes
+from users.api.v0.users_routes import (
+    init_change_listener, init_email_filter, init_id_generator, init_user_cache, users_api
+)
+from users.compaction import init_compaction
 from users.config import LOGGING
-from users.db_utils import get_connection
+from users.db_utils import close_pool, execute_query_single, get_pool, reset_round_trips, round_trips, statements
+from users.snowflake import worker_id_from_env
 
 _app_ready = False
 _shutdown_event = threading.Event()
@@ -19,11 +25,7 @@ _shutdown_event = threading.Event()
 def check_database_connection(max_retries=5, retry_delay=2):
     for attempt in range(max_retries):
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            execute_query_single("SELECT 1")
             return True
         except Exception as e:
             logging.error(f"Database connection attempt {attempt + 1} failed: {e}")
@@ -73,15 +75,37 @@ def application_lifecycle():
     finally:
         logging.info("=== APPLICATION SHUTDOWN ===")
         _app_ready = False
+        close_pool()
 
 
 def make_app():
     app = Flask(__name__)
+    app.config["DEBUG_HEADERS"] = os.getenv("DEBUG_HEADERS", "false").lower() == "true"
 
     logging.config.dictConfig(LOGGING)
     logger = logging.getLogger('rbm_awesome_logger')
     
     setup_graceful_shutdown(app)
+
+    # Must differ between all processes writing users; required, startup fails without it
+    init_id_generator(worker_id_from_env(os.getenv("SNOWFLAKE_WORKER_ID")))
+    init_user_cache(
+        int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),   # 0 = off
+        float(os.getenv("USER_CACHE_TTL", "60")),
+    )
+    # Each worker's filter only sees its own sign-ups: run several workers with USER_CACHE_NOTIFY on
+    init_email_filter(
+        os.getenv("USER_BLOOM_FILTER", "false").lower() == "true",
+        float(os.getenv("USER_BLOOM_FP_RATE", "0.01")),
+        float(os.getenv("USER_BLOOM_REBUILD_INTERVAL", "3600")),
+        float(os.getenv("USER_BLOOM_REBUILD_GRACE", "60")),   # Longer than the slowest create or bulk import
+    )
+    init_change_listener(os.getenv("USER_CACHE_NOTIFY", "false").lower() == "true")  # LISTEN/NOTIFY across workers
+    init_compaction(
+        float(os.getenv("USER_ARCHIVE_AFTER_DAYS", "0")),   # 0 = keep soft-deleted users in place
+        int(os.getenv("USER_ARCHIVE_BATCH_SIZE", "1000")),
+        float(os.getenv("USER_ARCHIVE_INTERVAL", "3600")),
+    )
     
     @app.route('/health', methods=['GET'])
     def health_check():
@@ -92,11 +116,7 @@ def make_app():
             }), 503
         
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            execute_query_single("SELECT 1")
             db_status = "healthy"
         except Exception:
             db_status = "unhealthy"
@@ -105,6 +125,10 @@ def make_app():
         return jsonify({
             "status": "ready" if db_status == "healthy" else "degraded",
             "database": db_status,
+            "pool": get_pool().stats(),
+            "statements": statements.stats(),
+            "user_cache": users_routes.user_cache.stats(),
+            "email_filter": users_routes.email_filter.stats() if users_routes.email_filter else None,
             "timestamp": time.time()
         }), status_code
 
@@ -117,11 +141,21 @@ def make_app():
 
     app.register_blueprint(users_api, url_prefix='/users')
     
+    @app.before_request
+    def count_round_trips():
+        reset_round_trips()
+
     @app.before_request
     def check_shutdown():
         if _shutdown_event.is_set():
             return jsonify({"error": "Service shutting down"}), 503
 
+    @app.after_request
+    def add_debug_headers(response):
+        if app.config["DEBUG_HEADERS"]:
+            response.headers["X-DB-Round-Trips"] = str(round_trips())
+        return response
+
     return app
 
 
@@ -0,0 +1,139 @@
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+
+MIN_CAPACITY = 1024
+HEADROOM = 2          # Size rebuilt filters for this many times the current count, to absorb sign-ups
+DEFAULT_GRACE = 60.0  # Seconds an add is replayed into rebuilds; must outlast the slowest user write
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)."""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def expected_fp_rate(self) -> float:
+        """Theoretical false-positive rate at the current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+class EmailFilter:
+    """Bloom filter of active emails: "no" means the email definitely has no active user.
+
+    Until the first ``rebuild`` finishes every email is a "maybe". Deleted users
+    stay in the filter (costing only false positives) until the next rebuild.
+
+    Callers ``add`` an email before its write commits, so a rebuild's snapshot
+    can miss an email added before the rebuild started. Emails added within
+    ``grace`` seconds before a rebuild, and all emails added during it, are
+    replayed into the new filter so the swap can't lose a sign-up.
+    """
+
+    def __init__(self, fp_rate: float, grace: float = DEFAULT_GRACE):
+        self.fp_rate = fp_rate
+        self.grace = grace
+        self.lookups = 0
+        self.definite_misses = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+        self._bloom: Optional[BloomFilter] = None
+        self._pending: Optional[List[str]] = None
+        self._recent: Deque[Tuple[float, str]] = deque()   # (added at, email), oldest first
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def might_contain(self, email: str) -> bool:
+        bloom = self._bloom
+        maybe = bloom is None or email in bloom
+        with self._lock:
+            self.lookups += 1
+            if not maybe:
+                self.definite_misses += 1
+        return maybe
+
+    def add(self, email: str):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(email)
+            if self._pending is not None:
+                self._pending.append(email)
+            now = time.monotonic()
+            self._recent.append((now, email))
+            self._forget_before(now - self.grace)
+
+    def record_false_positive(self):
+        """The filter said "maybe" but the database had no active user."""
+        with self._lock:
+            self.false_positives += 1
+
+    def rebuild(self, load: Callable[[], Iterable[str]]):
+        """Replace the filter with one built from ``load()`` (every active email)."""
+        with self._rebuild_lock:
+            with self._lock:
+                # Opened before load() takes its snapshot; seeded with the adds whose writes may still be in flight
+                self._forget_before(time.monotonic() - self.grace)
+                self._pending = [email for _, email in self._recent]
+            try:
+                emails = list(load())
+                bloom = BloomFilter(max(MIN_CAPACITY, len(emails) * HEADROOM), self.fp_rate)
+                for email in emails:
+                    bloom.add(email)
+                with self._lock:
+                    for email in self._pending:
+                        bloom.add(email)
+                    self._bloom = bloom
+                    self.rebuilds += 1
+            finally:
+                with self._lock:
+                    self._pending = None
+
+    def _forget_before(self, cutoff: float):
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    def stats(self) -> dict:
+        with self._lock:
+            bloom = self._bloom
+            maybes = self.lookups - self.definite_misses
+            return {
+                "ready": bloom is not None,
+                "entries": bloom.count if bloom else 0,
+                "capacity": bloom.capacity if bloom else 0,
+                "bits": bloom.size if bloom else 0,
+                "hashes": bloom.hashes if bloom else 0,
+                "target_fp_rate": self.fp_rate,
+                "expected_fp_rate": bloom.expected_fp_rate() if bloom else 0.0,
+                "lookups": self.lookups,
+                "definite_misses": self.definite_misses,
+                "false_positives": self.false_positives,
+                # Share of "maybe" answers the database then turned down (includes deleted users)
+                "observed_fp_rate": self.false_positives / maybes if maybes else 0.0,
+                "rebuilds": self.rebuilds,
+            }
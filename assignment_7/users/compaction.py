@@ -0,0 +1,77 @@
+import datetime
+import threading
+
+from users.db_utils import execute_query_single
+from users.logger.log_types import LogEvent
+from users.logger.logger import log_bulk_event, log_error_event
+
+_compactor_stop = None
+
+# One statement per batch: lock the oldest expired rows (skipping any a writer
+# holds), delete them and insert them into the archive. Rows locked here can't be
+# reactivated half-way; a create for an archived email simply makes a new user.
+ARCHIVE_BATCH = """
+    WITH batch AS (
+        SELECT id
+        FROM users
+        WHERE deleted_since < %s
+        ORDER BY deleted_since
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        DELETE FROM users u
+        USING batch b
+        WHERE u.id = b.id
+        RETURNING u.id, u.full_name, u.email, u.joined_at, u.deleted_since
+    ),
+    archived AS (
+        INSERT INTO users_archive (id, full_name, email, joined_at, deleted_since)
+        SELECT id, full_name, email, joined_at, deleted_since FROM moved
+        RETURNING 1
+    )
+    SELECT count(*) FROM archived
+"""
+
+
+def archive_deleted_users(retention: datetime.timedelta, batch_size: int,
+                          stop: threading.Event = None, pause: float = 0.1) -> int:
+    """Move users soft-deleted more than ``retention`` ago to users_archive, ``batch_size`` rows per transaction.
+
+    Sleeps ``pause`` seconds between batches to leave room for request traffic;
+    returns how many rows were archived.
+    """
+    cutoff = datetime.datetime.utcnow() - retention
+    stop = stop or threading.Event()
+    archived = 0
+    while True:
+        moved = execute_query_single(ARCHIVE_BATCH, (cutoff, batch_size))[0]
+        archived += moved
+        if moved < batch_size or stop.wait(pause):
+            return archived
+
+
+def init_compaction(retention_days: float, batch_size: int, interval: float):
+    """Archive users deleted more than ``retention_days`` ago every ``interval`` seconds (0 days = off)."""
+    global _compactor_stop
+    if _compactor_stop:
+        _compactor_stop.set()
+        _compactor_stop = None
+    if retention_days > 0:
+        _compactor_stop = start_compactor(datetime.timedelta(days=retention_days), batch_size, interval)
+
+
+def start_compactor(retention: datetime.timedelta, batch_size: int, interval: float) -> threading.Event:
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                archived = archive_deleted_users(retention, batch_size, stop)
+                if archived:
+                    log_bulk_event(LogEvent.USERS_ARCHIVED, {"archived": archived})
+            except Exception as e:
+                log_error_event(LogEvent.DB_ERROR, f"user archive compaction failed: {e}")
+
+    threading.Thread(target=run, name="user-compactor", daemon=True).start()
+    return stop
@@ -0,0 +1,191 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB connections.
+
+    Keeps between ``min_size`` and ``max_size`` connections. A checkout reuses an
+    idle connection (newest first, so surplus ones age out) and pings it with
+    ``SELECT 1`` if it sat idle longer than ``ping_after`` seconds; dead or
+    older-than-``max_lifetime`` connections are closed and replaced. When all
+    ``max_size`` are in use, callers wait up to ``timeout`` seconds.
+
+    ``on_statement`` is called for every statement the pool itself sends (the
+    ping and the rollbacks), so callers can count them with their own.
+    """
+
+    def __init__(self, connect: Callable, min_size: int = 1, max_size: int = 10,
+                 max_lifetime: float = 1800, timeout: float = 5.0, ping_after: float = 1.0,
+                 on_statement: Optional[Callable[[], None]] = None):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Invalid pool size")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._on_statement = on_statement or (lambda: None)
+        self._idle: List[list] = []          # [conn, created_at, idle_since]
+        self._created: Dict[int, float] = {}  # id(conn) -> created_at, for every open connection
+        self._size = 0                        # open connections plus ones being opened
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {"checkouts": 0, "waits": 0, "wait_time_total": 0.0, "wait_time_max": 0.0,
+                       "timeouts": 0, "created": 0, "discarded": 0}
+
+    def fill(self):
+        """Open connections up to ``min_size``; failures are left for checkouts to retry."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                self._release_slot()
+                return
+            with self._cond:
+                self._idle.append([conn, self._created[id(conn)], time.monotonic()])
+                self._cond.notify()
+
+    def getconn(self):
+        """Check out a live connection; raises ``PoolTimeout`` if none frees up in time."""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle:
+                        conn, created, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No connection available after {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._healthy(conn, created, idle_since):
+                self._discard(conn)
+                continue
+            self._record_checkout(time.monotonic() - start, waited)
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a checked-out connection; ``discard`` (or a broken/expired one) closes it instead."""
+        created = self._created.get(id(conn), 0)
+        if discard or self._closed or conn.closed or time.monotonic() - created > self.max_lifetime:
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                self._on_statement()
+                conn.rollback()  # Never hand the next caller someone else's open transaction
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append([conn, created, time.monotonic()])
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except BaseException:
+            self.putconn(conn, discard=bool(conn.closed))
+            raise
+        self.putconn(conn)
+
+    def clear_idle(self):
+        """Close every idle connection, e.g. once one of them turned out dead after a DB restart."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.clear_idle()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(self._stats, size=self._size, idle=len(self._idle),
+                        in_use=self._size - len(self._idle), max_size=self.max_size)
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _healthy(self, conn, created: float, idle_since: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created > self.max_lifetime:
+            return False
+        if now - idle_since < self.ping_after:
+            return True
+        try:
+            cur = conn.cursor()
+            try:
+                self._on_statement()
+                cur.execute("SELECT 1")
+            finally:
+                cur.close()
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                self._on_statement()
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            if self._created.pop(id(conn), None) is None:
+                return  # Already discarded
+            self._stats["discarded"] += 1
+            self._size -= 1
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _record_checkout(self, wait: float, waited: bool):
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait)
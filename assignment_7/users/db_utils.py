@@ -1,10 +1,32 @@
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 import psycopg2
-from typing import Optional, Any, List, Tuple
+from typing import Optional, Any, Callable, Dict, List, Tuple
+
+from users.db_pool import ConnectionPool
+from users.statements import StatementRegistry
+
+_pool = None
+_pool_lock = threading.Lock()
+_round_trips: ContextVar = ContextVar("db_round_trips", default=None)
+
+statements = StatementRegistry()
+GET_USER = statements.register(
+    "get_user", "SELECT id, email, full_name, joined_at FROM users WHERE email = %s AND deleted_since IS NULL")
+GET_USER_INCLUDING_DELETED = statements.register(
+    "get_user_including_deleted", "SELECT id, email, full_name, joined_at FROM users WHERE email = %s")
+GET_USERS = statements.register(
+    "get_users",
+    "SELECT id, email, full_name, joined_at FROM users WHERE email = ANY(%s) AND deleted_since IS NULL")
+GET_ACTIVE_USER_ID = statements.register(
+    "get_active_user_id", "SELECT id FROM users WHERE email = %s AND deleted_since IS NULL")
 
 
 def get_connection():
+    """Open a new, unpooled connection (the pool's factory; also used by test fixtures)."""
     return psycopg2.connect(
         host=os.getenv("DB_HOST", "localhost"),  # use explicit host
         port=os.getenv("DB_PORT", "5432"),
@@ -14,61 +36,225 @@ def get_connection():
     )
 
 
-def execute_query_single(query: str, params: tuple = ()) -> Optional[tuple]:
-    """Execute a query and return a single row, or None if no results"""
+def _connect():
     conn = get_connection()
-    cur = conn.cursor()
+    # Every helper runs a single statement, so each one commits on its own;
+    # this also keeps reads from leaving a transaction open on a pooled connection
+    conn.autocommit = True
+    return conn
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool, created on first use from the DB_POOL_* settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                _connect,
+                min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                ping_after=float(os.getenv("DB_POOL_PING_AFTER", "1")),
+                on_statement=_count_round_trip,
+            )
+            _pool.fill()
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def reset_round_trips():
+    """Start counting the statements this thread sends (one per request, see the X-DB-Round-Trips header).
+
+    Pool health-check pings and rollbacks count too: they are round trips the request waits on.
+    """
+    _round_trips.set([0])
+
+
+def round_trips() -> int:
+    counter = _round_trips.get()
+    return counter[0] if counter else 0
+
+
+def _count_round_trip():
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class _CountingCursor:
+    """Cursor wrapper counting each statement sent to the server.
+
+    ``sent`` turns true once a statement went out on a live connection; from
+    then on the server may have run it, even if we never saw the reply.
+    """
+
+    def __init__(self, cur, conn):
+        self._cur = cur
+        self._conn = conn
+        self.sent = False
+
+    def execute(self, *args, **kwargs):
+        _count_round_trip()
+        self._sending()
+        return self._cur.execute(*args, **kwargs)
+
+    def copy_expert(self, *args, **kwargs):
+        _count_round_trip()
+        self._sending()
+        return self._cur.copy_expert(*args, **kwargs)
+
+    def _sending(self):
+        # psycopg2 refuses statements on a connection it already knows is closed
+        self.sent = self.sent or not self._conn.closed
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def _run(work: Callable) -> Any:
+    """Run ``work(conn, cur)`` on a pooled connection.
+
+    If a connection taken from the pool turns out to be dead (e.g. the database
+    restarted), the idle ones are dropped. The work is retried once on a fresh
+    connection only if nothing reached the server yet; once a statement was
+    sent, the server may have run it before the connection dropped, so the
+    error is raised rather than risking running the work twice.
+    """
+    pool = get_pool()
+    for attempt in range(2):
+        conn = pool.getconn()
+        cur = None
+        try:
+            cur = _CountingCursor(conn.cursor(), conn)
+            return work(conn, cur)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if not conn.closed:
+                raise
+            pool.clear_idle()
+            if attempt or (cur is not None and cur.sent):
+                raise
+        finally:
+            if cur is not None:
+                cur.close()
+            pool.putconn(conn, discard=bool(conn.closed))
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor on a pooled connection inside one transaction; commits on success, rolls back on error."""
+    pool = get_pool()
+    conn = pool.getconn()
+    conn.autocommit = False
+    cur = _CountingCursor(conn.cursor(), conn)
+    _count_round_trip()  # BEGIN, sent ahead of the first statement
     try:
-        cur.execute(query, params)
-        result = cur.fetchone()
-        return result
+        yield cur
+        _count_round_trip()
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            _count_round_trip()
+            conn.rollback()
+        raise
     finally:
         cur.close()
-        conn.close()
+        if not conn.closed:
+            conn.autocommit = True
+        pool.putconn(conn, discard=bool(conn.closed))
+
+
+def execute_query_single(query: str, params: tuple = ()) -> Optional[tuple]:
+    """Execute a query and return a single row, or None if no results"""
+    def work(conn, cur):
+        cur.execute(query, params)
+        return cur.fetchone()
+    return _run(work)
 
 
 def execute_query_all(query: str, params: tuple = ()) -> List[tuple]:
     """Execute a query and return all rows"""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
+    def work(conn, cur):
         cur.execute(query, params)
-        results = cur.fetchall()
-        return results
-    finally:
-        cur.close()
-        conn.close()
+        return cur.fetchall()
+    return _run(work)
 
 
 def execute_update(query: str, params: tuple = ()) -> Tuple[Optional[tuple], int]:
     """Execute an UPDATE/INSERT/DELETE query and return (result, rows_affected)"""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
+    def work(conn, cur):
         cur.execute(query, params)
         rows_affected = cur.rowcount
         # For INSERT...RETURNING queries
         result = cur.fetchone() if "RETURNING" in query.upper() else None
         conn.commit()
         return result, rows_affected
-    finally:
-        cur.close()
-        conn.close()
+    return _run(work)
+
+
+def execute_prepared_single(name: str, params: tuple = ()) -> Optional[tuple]:
+    """Run a registered statement and return its first row, or None"""
+    def work(conn, cur):
+        statements.execute(conn, cur, name, params)
+        return cur.fetchone()
+    return _run(work)
+
+
+def execute_prepared_all(name: str, params: tuple = ()) -> List[tuple]:
+    """Run a registered statement and return all rows"""
+    def work(conn, cur):
+        statements.execute(conn, cur, name, params)
+        return cur.fetchall()
+    return _run(work)
 
 
 def get_user_by_email(email: str, include_deleted: bool = False) -> Optional[tuple]:
     """Get user by email. By default excludes deleted users."""
-    where_clause = "WHERE email = %s"
-    if not include_deleted:
-        where_clause += " AND deleted_since IS NULL"
+    return execute_prepared_single(GET_USER_INCLUDING_DELETED if include_deleted else GET_USER, (email,))
+
 
-    query = f"SELECT id, email, full_name, joined_at FROM users {where_clause}"
-    return execute_query_single(query, (email,))
+def get_users_by_emails(emails: List[str]) -> Dict[str, tuple]:
+    """Active users among ``emails`` in one query, keyed by email."""
+    rows = execute_prepared_all(GET_USERS, (list(emails),))
+    return {row[1]: row for row in rows}
 
 
 def get_active_user_id(email: str) -> Optional[str]:
-    result = execute_query_single(
-        "SELECT id FROM users WHERE email = %s AND deleted_since IS NULL",
-        (email,)
-    )
-    return result[0] if result else None
\ No newline at end of file
+    result = execute_prepared_single(GET_ACTIVE_USER_ID, (email,))
+    return result[0] if result else None
+
+
+LIST_ACTIVE_USERS = """
+    SELECT id, email, full_name, joined_at
+    FROM users
+    WHERE deleted_since IS NULL AND (joined_at, id) > (%s, %s)
+    ORDER BY joined_at, id
+    LIMIT %s
+"""
+LIST_ACTIVE_USERS_FIRST = """
+    SELECT id, email, full_name, joined_at
+    FROM users
+    WHERE deleted_since IS NULL
+    ORDER BY joined_at, id
+    LIMIT %s
+"""
+LIST_USERS = statements.register("list_users", LIST_ACTIVE_USERS)
+LIST_USERS_FIRST = statements.register("list_users_first", LIST_ACTIVE_USERS_FIRST)
+
+
+def list_active_users(after: Optional[tuple], limit: int) -> List[tuple]:
+    """Active users ordered by ``(joined_at, id)``, starting after the ``(joined_at, id)`` key ``after``.
+
+    Keyset pagination: every page is an index range scan on users_active_joined_idx,
+    however deep into the table it starts.
+    """
+    if after is None:
+        return execute_prepared_all(LIST_USERS_FIRST, (limit,))
+    return execute_prepared_all(LIST_USERS, (*after, limit))
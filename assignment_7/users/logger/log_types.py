@@ -10,6 +10,10 @@ class LogEvent(str, Enum):
     USER_NOT_FOUND = "user_not_found"
     USER_SOFT_DELETED = "user_soft_deleted"
     USER_NOT_FOUND_OR_INACTIVE = "user_not_found_or_inactive"
+    USERS_BULK_IMPORTED = "users_bulk_imported"
+    USERS_LOOKED_UP = "users_looked_up"
+    USERS_LISTED = "users_listed"
+    USERS_ARCHIVED = "users_archived"
     DB_ERROR = "db_error"
 
 
@@ -36,4 +36,12 @@ def log_user_deletion_event(event: LogEvent, user_id: str = None):
     if user_id:
         log_data["user_id"] = user_id
     
-    logger.info(json.dumps(log_data))
\ No newline at end of file
+    logger.info(json.dumps(log_data))
+
+
+def log_bulk_event(event: LogEvent, counts: dict):
+    """One line for a whole batch instead of one per user."""
+    logger.info(json.dumps({
+        "event": event,
+        **counts,
+    }))
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+TIMESTAMP_BITS = 41       # ~69 years from EPOCH_MS
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+MAX_TIMESTAMP = (1 << TIMESTAMP_BITS) - 1
+ROLLBACK_WARN_MS = 1000
+
+logger = logging.getLogger("rbm_awesome_logger")
+
+
+class SnowflakeGenerator:
+    """64-bit, k-sortable IDs: ms since ``EPOCH_MS`` | worker ID | per-millisecond sequence.
+
+    IDs from one generator strictly increase. If the clock steps back, the
+    generator keeps counting from the last timestamp it issued (moving on to the
+    next millisecond whenever the 4096-ID sequence runs out) until the clock
+    catches up, so it never repeats an ID or blocks. Each process must have its
+    own ``worker_id`` for IDs to be unique across processes.
+    """
+
+    def __init__(self, worker_id: int, epoch_ms: int = EPOCH_MS, clock: Callable[[], float] = time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.epoch_ms = epoch_ms
+        self.clock_rollbacks = 0
+        self._clock = clock
+        self._last = -1        # Timestamp of the last ID issued
+        self._last_clock = -1  # Last clock reading, to tell a rollback from borrowed milliseconds
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = int(self._clock() * 1000) - self.epoch_ms
+            if now < self._last_clock:
+                self.clock_rollbacks += 1
+                if self._last_clock - now >= ROLLBACK_WARN_MS:
+                    logger.warning(f"Clock moved back {self._last_clock - now} ms; reusing the last timestamp")
+            self._last_clock = now
+            if now > self._last:
+                self._last, self._sequence = now, 0
+            else:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    self._last += 1  # Sequence exhausted: borrow the next millisecond
+            if not 0 <= self._last <= MAX_TIMESTAMP:
+                raise ValueError("Clock is outside the Snowflake epoch range")
+            return (self._last << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+def worker_id_from_env(value: Optional[str]) -> int:
+    """The ``SNOWFLAKE_WORKER_ID`` setting, which has no default.
+
+    A PID or hostname is not unique across containers (every one is PID 1), and
+    two processes sharing a worker ID issue colliding IDs, so it must be set
+    explicitly, e.g. from a StatefulSet ordinal.
+    """
+    if not value or not value.strip():
+        raise RuntimeError("Missing environment variable: SNOWFLAKE_WORKER_ID (0-1023, unique per process)")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"SNOWFLAKE_WORKER_ID must be an integer, got {value!r}") from None
+
+
+def parse_snowflake(snowflake_id: int, epoch_ms: int = EPOCH_MS) -> Tuple[int, int, int]:
+    """``(unix timestamp in ms, worker ID, sequence)`` of an ID."""
+    return (
+        (snowflake_id >> (WORKER_BITS + SEQUENCE_BITS)) + epoch_ms,
+        (snowflake_id >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        snowflake_id & MAX_SEQUENCE,
+    )
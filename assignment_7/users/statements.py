@@ -0,0 +1,79 @@
+import re
+import threading
+import time
+import weakref
+
+from psycopg2 import errors
+
+NAME_REGEX = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class StatementRegistry:
+    """Hot SQL statements, each PREPAREd once per connection and then run by name.
+
+    Statements are written with ``%s`` placeholders like any other query. On a
+    connection's first call the ``PREPARE`` goes out in the same round trip as
+    the ``EXECUTE``. After that only ``EXECUTE name (...)`` is sent, so Postgres
+    neither re-parses the statement nor (once it settles on a generic plan)
+    re-plans it. Per-statement call counts and timings are kept for ``stats``.
+
+    Only use it on autocommit connections: an error inside an explicit
+    transaction would abort it before the registry could recover.
+    """
+
+    def __init__(self):
+        self._statements = {}                          # name -> (PREPARE ...; EXECUTE ..., EXECUTE ...)
+        self._prepared = weakref.WeakKeyDictionary()   # connection -> names prepared on it
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str) -> str:
+        if not NAME_REGEX.match(name):
+            raise ValueError(f"Invalid statement name: {name!r}")
+        counter = iter(range(1, sql.count("%s") + 1))
+        body = re.sub(r"%s", lambda _: f"${next(counter)}", sql).replace("%", "%%")
+        placeholders = ", ".join(["%s"] * sql.count("%s"))
+        execute = f"EXECUTE {name} ({placeholders})" if placeholders else f"EXECUTE {name}"
+        with self._lock:
+            self._statements[name] = (f"PREPARE {name} AS {body}; {execute}", execute)
+            self._stats[name] = {"calls": 0, "prepares": 0, "total_ms": 0.0, "max_ms": 0.0}
+        return name
+
+    def execute(self, conn, cur, name: str, params: tuple = ()):
+        """Run statement ``name`` on ``cur`` (a cursor of ``conn``); fetch the results from ``cur``."""
+        prepare_and_execute, execute = self._statements[name]
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+        start = time.perf_counter()
+        fresh = name not in prepared
+        try:
+            cur.execute(prepare_and_execute if fresh else execute, params)
+        except errors.DuplicatePreparedStatement:
+            # An earlier first call prepared it but then failed in its EXECUTE
+            fresh = False
+            cur.execute(execute, params)
+        except errors.InvalidSqlStatementName:
+            # The session lost it (DISCARD ALL, or a pooler swapped the backend)
+            fresh = True
+            cur.execute(prepare_and_execute, params)
+        except errors.FeatureNotSupported as e:
+            if "cached plan must not change result type" not in str(e):
+                raise
+            # A migration changed a column type under the prepared plan
+            fresh = True
+            cur.execute(f"DEALLOCATE {name}; {prepare_and_execute}", params)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            prepared.add(name)
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["prepares"] += fresh
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: dict(stats, mean_ms=stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0)
+                for name, stats in self._stats.items()
+            }
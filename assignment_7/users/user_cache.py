@@ -0,0 +1,152 @@
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+GENERATION_STRIPES = 256
+NOTIFY_CHANNEL = "user_cache"
+_MISSING = object()
+
+logger = logging.getLogger("rbm_awesome_logger")
+
+
+class UserCache:
+    """Bounded LRU of ``get_user_by_email`` results (rows and misses), each kept for ``ttl`` seconds.
+
+    Writers call ``invalidate``; ``get_or_load`` takes a generation token before
+    querying and only caches the row if no invalidation came in meanwhile, so a
+    slow read can never re-cache a user that was just updated or deleted.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()   # email -> (expires_at, row)
+        self._generations = [0] * GENERATION_STRIPES
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get_or_load(self, email: str, load: Callable[[str], Any]) -> Any:
+        if not self.enabled:
+            return load(email)
+        row = self._get(email)
+        if row is not _MISSING:
+            return row
+        token = self._generations[hash(email) % GENERATION_STRIPES]
+        row = load(email)
+        self._put(email, row, token)
+        return row
+
+    def get_or_load_many(self, emails: List[str], load_many: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Like ``get_or_load`` for several emails; the misses are fetched with one ``load_many`` call.
+
+        ``load_many`` returns ``{email: row}`` and leaves out emails with no user.
+        """
+        if not self.enabled:
+            return load_many(emails)
+        found, missing = {}, []
+        for email in emails:
+            row = self._get(email)
+            if row is _MISSING:
+                missing.append(email)
+            else:
+                found[email] = row
+        if missing:
+            tokens = [self._generations[hash(email) % GENERATION_STRIPES] for email in missing]
+            loaded = load_many(missing)
+            for email, token in zip(missing, tokens):
+                found[email] = loaded.get(email)
+                self._put(email, found[email], token)
+        return found
+
+    def invalidate(self, email: str):
+        with self._lock:
+            self._generations[hash(email) % GENERATION_STRIPES] += 1
+            self._entries.pop(email, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generations = [g + 1 for g in self._generations]
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _get(self, email: str):
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[email]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, email: str, row: Any, token: int):
+        with self._lock:
+            if self._generations[hash(email) % GENERATION_STRIPES] != token:
+                return
+            self._entries[email] = (time.monotonic() + self.ttl, row)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+def start_invalidation_listener(connect: Callable, on_notify: Callable[[str], None], on_connect: Callable[[], None],
+                                channel: str = NOTIFY_CHANNEL, retry_delay: float = 2.0) -> threading.Event:
+    """LISTEN on ``channel`` and pass each email other workers NOTIFY about to ``on_notify``.
+
+    Runs on its own (unpooled) connection. Notifications sent while it is
+    disconnected are lost, so ``on_connect`` runs on every (re)connect to let
+    the caller drop whatever state could have gone stale meanwhile.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            conn = None
+            try:
+                conn = connect()
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {channel}")
+                cur.close()
+                on_connect()
+                while not stop.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            on_notify(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"User change listener failed: {e}")
+                stop.wait(retry_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    threading.Thread(target=run, name="user-change-listener", daemon=True).start()
+    return stop
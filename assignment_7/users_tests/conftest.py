@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 
 os.environ.setdefault('TESTING', 'true')
 os.environ.setdefault('logzIO_api_key', 'test-api-key-for-pytest')
+os.environ.setdefault('SNOWFLAKE_WORKER_ID', '1')
 
 from users.app import make_app
 from users.db_utils import get_connection
@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+from unittest.mock import patch
+from users.bloom_filter import BloomFilter, EmailFilter
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(10000, 0.01)
+    members = [f"user{i}@test.com" for i in range(10000)]
+    for email in members:
+        bloom.add(email)
+
+    assert all(email in bloom for email in members)
+    false_positives = sum(f"other{i}@test.com" in bloom for i in range(10000))
+    assert false_positives < 200                  # ~1% target
+    assert 0.005 < bloom.expected_fp_rate() < 0.02
+
+
+def test_rebuild_keeps_emails_added_while_loading():
+    emails = EmailFilter(0.01)
+    assert emails.might_contain("anyone@test.com")   # Not loaded yet: everything is a maybe
+
+    loading, release = threading.Event(), threading.Event()
+
+    def load():
+        loading.set()
+        release.wait()
+        return ["old@test.com"]
+
+    t = threading.Thread(target=emails.rebuild, args=(load,))
+    t.start()
+    loading.wait()
+    emails.add("new@test.com")                       # Signs up mid-rebuild
+    release.set()
+    t.join()
+
+    assert emails.might_contain("old@test.com") and emails.might_contain("new@test.com")
+    assert not emails.might_contain("ghost@test.com")
+    stats = emails.stats()
+    assert stats["entries"] == 2 and stats["definite_misses"] == 1
+
+
+def test_rebuild_keeps_emails_added_just_before_it():
+    emails = EmailFilter(0.01, grace=0.05)
+    emails.add("early@test.com")       # Added, but its write commits after the rebuild's snapshot
+    emails.rebuild(lambda: ["old@test.com"])
+    assert emails.might_contain("early@test.com")
+
+    time.sleep(0.1)
+    emails.rebuild(lambda: ["old@test.com"])   # Long committed (or failed): the snapshot is the truth
+    assert not emails.might_contain("early@test.com")
+
+
+@patch('users.api.v0.users_routes.execute_prepared_single')
+@patch('users.api.v0.users_routes.get_user_by_email')
+def test_unknown_email_skips_database(mock_get_user, mock_update, client, monkeypatch):
+    from users.api.v0 import users_routes
+    monkeypatch.setattr(users_routes, 'email_filter', EmailFilter(0.01))
+    users_routes.email_filter.rebuild(lambda: ["known@test.com"])
+    mock_get_user.return_value = None
+
+    assert client.get('/users/ghost@test.com').status_code == 404
+    mock_get_user.assert_not_called()
+    assert client.get('/users/known@test.com').status_code == 404     # Filter said maybe; DB said no
+    assert mock_get_user.call_count == 1
+    assert users_routes.email_filter.stats()["false_positives"] == 1
+
+    mock_update.return_value = ('1', True, True, False)
+    client.post('/users/', data=json.dumps({"email": "fresh@test.com", "full_name": "Fresh"}),
+                content_type='application/json')
+    assert users_routes.email_filter.might_contain("fresh@test.com")
@@ -0,0 +1,100 @@
+import csv
+import json
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+
+def _transaction(outcomes):
+    """Stand-in for db_utils.transaction whose upsert reports ``{email: status}``."""
+    cur = MagicMock()
+    staged = {}
+
+    def copy_expert(sql, buf):
+        for line, _, email, _ in csv.reader(buf):
+            staged[email] = int(line)
+
+    cur.copy_expert.side_effect = copy_expert
+    cur.fetchall.side_effect = lambda: [(staged[email], status) for email, status in outcomes.items()]
+
+    @contextmanager
+    def transaction():
+        yield cur
+
+    return transaction, cur, staged
+
+
+def test_ndjson_import_reports_each_row(client):
+    transaction, cur, staged = _transaction({
+        'new@test.com': 'created', 'back@test.com': 'reactivated', 'same@test.com': 'already_active'})
+    body = '\n'.join([
+        json.dumps({'email': 'new@test.com', 'full_name': 'New User'}),
+        json.dumps({'email': 'not-an-email', 'full_name': 'Bad'}),
+        '',
+        json.dumps({'email': 'back@test.com', 'full_name': 'Back Again'}),
+        '{broken',
+        json.dumps({'email': 'same@test.com', 'full_name': 'Same'}),
+        json.dumps({'email': 'new@test.com', 'full_name': 'Twice'}),
+    ])
+    with patch('users.api.v0.users_routes.transaction', transaction):
+        rv = client.post('/users/bulk', data=body, content_type='application/x-ndjson')
+
+    assert rv.status_code == 200
+    data = json.loads(rv.data)
+    assert [(r['line'], r['status']) for r in data['results']] == [
+        (1, 'created'), (2, 'invalid'), (4, 'reactivated'), (5, 'invalid'), (6, 'already_active'), (7, 'invalid')]
+    assert data['results'][-1]['error'] == 'Duplicate email in import'
+    assert data['summary'] == {'created': 1, 'reactivated': 1, 'updated': 0, 'already_active': 1, 'invalid': 3}
+    assert staged == {'new@test.com': 1, 'back@test.com': 4, 'same@test.com': 6}
+    assert cur.copy_expert.call_count == 1
+
+
+def test_csv_import(client):
+    transaction, _, staged = _transaction({'a@test.com': 'created', 'b@test.com': 'updated'})
+    body = 'email,full_name\na@test.com,"Doe, Jane"\nb@test.com,Bob\n,Nobody\n'
+    with patch('users.api.v0.users_routes.transaction', transaction):
+        rv = client.post('/users/bulk', data=body, content_type='text/csv')
+
+    assert rv.status_code == 200
+    data = json.loads(rv.data)
+    assert [(r['line'], r['status']) for r in data['results']] == [(2, 'created'), (3, 'updated'), (4, 'invalid')]
+    assert list(staged) == ['a@test.com', 'b@test.com']
+
+
+def test_bulk_import_notifies_in_payloads_under_the_size_cap(client, monkeypatch):
+    from users.api.v0 import users_routes
+    monkeypatch.setattr(users_routes, '_notify', True)
+    transaction, cur, _ = _transaction({'a@test.com': 'created'})
+    with patch('users.api.v0.users_routes.transaction', transaction):
+        rv = client.post('/users/bulk', data=json.dumps({'email': 'a@test.com', 'full_name': 'A'}),
+                         content_type='application/x-ndjson')
+    assert rv.status_code == 200
+    query, params = cur.execute.call_args[0]
+    assert 'pg_notify' in query and 'octet_length(email)' in query
+    assert params == (users_routes.NOTIFY_CHANNEL, users_routes.NOTIFY_PAYLOAD_BYTES)
+    # One more email (at most 200 characters, 4 bytes each) must still fit
+    assert users_routes.NOTIFY_PAYLOAD_BYTES + 4 * 200 < 8000
+
+
+def test_bulk_import_rejects_other_content_types(client):
+    rv = client.post('/users/bulk', data='{}', content_type='application/json')
+    assert rv.status_code == 415
+
+
+@patch('users.api.v0.users_routes.transaction')
+def test_bulk_import_skips_database_when_nothing_is_valid(mock_transaction, client):
+    rv = client.post('/users/bulk', data='{"email": "bad"}\n', content_type='application/x-ndjson')
+    assert rv.status_code == 200
+    assert json.loads(rv.data)['summary']['invalid'] == 1
+    mock_transaction.assert_not_called()
+
+
+def test_bulk_import_database_error(client):
+    @contextmanager
+    def failing_transaction():
+        raise Exception('copy failed')
+        yield
+
+    body = json.dumps({'email': 'a@test.com', 'full_name': 'A'})
+    with patch('users.api.v0.users_routes.transaction', failing_transaction):
+        rv = client.post('/users/bulk', data=body, content_type='application/x-ndjson')
+    assert rv.status_code == 500
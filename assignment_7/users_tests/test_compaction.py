@@ -0,0 +1,28 @@
+import datetime
+import threading
+from unittest.mock import patch
+
+from users.compaction import archive_deleted_users
+
+
+@patch('users.compaction.execute_query_single')
+def test_archives_in_batches_until_caught_up(mock_execute):
+    mock_execute.side_effect = [(100,), (100,), (42,)]
+
+    archived = archive_deleted_users(datetime.timedelta(days=30), batch_size=100, pause=0)
+
+    assert archived == 242
+    assert mock_execute.call_count == 3
+    cutoff, batch_size = mock_execute.call_args[0][1]
+    assert batch_size == 100
+    assert abs(datetime.datetime.utcnow() - datetime.timedelta(days=30) - cutoff) < datetime.timedelta(seconds=5)
+
+
+@patch('users.compaction.execute_query_single')
+def test_stop_interrupts_between_batches(mock_execute):
+    stop = threading.Event()
+    stop.set()
+    mock_execute.return_value = (100,)
+
+    assert archive_deleted_users(datetime.timedelta(days=30), batch_size=100, stop=stop) == 100
+    assert mock_execute.call_count == 1
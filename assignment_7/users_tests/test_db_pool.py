@@ -0,0 +1,60 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from users.db_pool import ConnectionPool, PoolTimeout
+
+
+def _conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = 0
+    return conn
+
+
+def test_waits_for_a_free_connection_then_times_out():
+    pool = ConnectionPool(_conn, min_size=0, max_size=1, timeout=0.2)
+    conn = pool.getconn()
+
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+    assert pool.getconn() is conn
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["timeouts"] == 1
+    assert 0.04 <= stats["wait_time_max"] < 1
+    assert stats["size"] == 1 and stats["in_use"] == 1
+
+
+def test_dead_and_expired_connections_are_replaced():
+    pool = ConnectionPool(_conn, min_size=2, max_size=2, max_lifetime=60, ping_after=0)
+    pool.fill()
+    assert pool.stats()["idle"] == 2
+
+    conn = pool.getconn()
+    conn.cursor.return_value.execute.assert_called_once_with("SELECT 1")   # Pinged on checkout
+    conn.cursor.return_value.execute.side_effect = Exception("terminating connection")
+    pool.putconn(conn)
+    other = pool.getconn()
+    assert other is not conn
+    conn.close.assert_called_once()
+
+    pool.max_lifetime = 0
+    pool.putconn(other)
+    other.close.assert_called_once()
+    assert pool.stats()["size"] == 0
+
+
+def test_open_transaction_is_rolled_back_on_return():
+    statements = []
+    pool = ConnectionPool(_conn, min_size=0, max_size=1, on_statement=lambda: statements.append(1))
+    conn = pool.getconn()
+    conn.get_transaction_status.return_value = 2   # INTRANS
+    pool.putconn(conn)
+    conn.rollback.assert_called_once()
+    assert pool.stats()["idle"] == 1
+
+    pool.ping_after = 0
+    assert pool.getconn() is conn   # Pinged, then rolled back again
+    assert len(statements) == 3
@@ -1,3 +1,4 @@
+import psycopg2
 import pytest
 from unittest.mock import patch, MagicMock
 from users.db_utils import (
@@ -5,13 +6,31 @@ from users.db_utils import (
     execute_query_all, 
     execute_update, 
     get_user_by_email, 
-    get_active_user_id
+    get_active_user_id,
+    get_users_by_emails,
+    get_pool,
+    close_pool
 )
 
 
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setenv('DB_POOL_MIN_SIZE', '0')
+    close_pool()
+    yield
+    close_pool()
+
+
+def _mock_conn():
+    mock_conn = MagicMock()
+    mock_conn.closed = 0
+    mock_conn.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    return mock_conn
+
+
 @patch('users.db_utils.get_connection')
 def test_execute_query_single_success(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -22,12 +41,13 @@ def test_execute_query_single_success(mock_get_conn):
     assert result == ('123', 'test@test.com', 'Test User')
     mock_cur.execute.assert_called_once_with("SELECT * FROM users WHERE email = %s", ("test@test.com",))
     mock_cur.close.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()      # Back in the pool, not closed
+    assert get_pool().stats()["idle"] == 1
 
 
 @patch('users.db_utils.get_connection')
 def test_execute_query_single_no_results(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -40,7 +60,7 @@ def test_execute_query_single_no_results(mock_get_conn):
 
 @patch('users.db_utils.get_connection')
 def test_execute_query_all_success(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -59,7 +79,7 @@ def test_execute_query_all_success(mock_get_conn):
 
 @patch('users.db_utils.get_connection')
 def test_execute_update_with_returning(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -76,7 +96,7 @@ def test_execute_update_with_returning(mock_get_conn):
 
 @patch('users.db_utils.get_connection')
 def test_execute_update_without_returning(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -90,39 +110,46 @@ def test_execute_update_without_returning(mock_get_conn):
     mock_cur.fetchone.assert_not_called()
 
 
-@patch('users.db_utils.execute_query_single')
+@patch('users.db_utils.execute_prepared_single')
 def test_get_user_by_email_active_user(mock_execute):
     mock_execute.return_value = ('123', 'test@test.com', 'Test User', '2023-01-01T00:00:00')
     
     result = get_user_by_email('test@test.com', include_deleted=False)
     
     assert result == ('123', 'test@test.com', 'Test User', '2023-01-01T00:00:00')
-    expected_query = "SELECT id, email, full_name, joined_at FROM users WHERE email = %s AND deleted_since IS NULL"
-    mock_execute.assert_called_once_with(expected_query, ('test@test.com',))
+    mock_execute.assert_called_once_with('get_user', ('test@test.com',))
 
 
-@patch('users.db_utils.execute_query_single')
+@patch('users.db_utils.execute_prepared_single')
 def test_get_user_by_email_include_deleted(mock_execute):
     mock_execute.return_value = ('123', 'test@test.com', 'Test User', '2023-01-01T00:00:00')
     
     result = get_user_by_email('test@test.com', include_deleted=True)
     
-    expected_query = "SELECT id, email, full_name, joined_at FROM users WHERE email = %s"
-    mock_execute.assert_called_once_with(expected_query, ('test@test.com',))
+    mock_execute.assert_called_once_with('get_user_including_deleted', ('test@test.com',))
+
 
+@patch('users.db_utils.execute_prepared_all')
+def test_get_users_by_emails(mock_execute):
+    mock_execute.return_value = [('123', 'b@test.com', 'B', '2023-01-01T00:00:00')]
 
-@patch('users.db_utils.execute_query_single')
+    result = get_users_by_emails(['a@test.com', 'b@test.com'])
+
+    assert result == {'b@test.com': ('123', 'b@test.com', 'B', '2023-01-01T00:00:00')}
+    mock_execute.assert_called_once_with('get_users', (['a@test.com', 'b@test.com'],))
+
+
+@patch('users.db_utils.execute_prepared_single')
 def test_get_active_user_id_exists(mock_execute):
     mock_execute.return_value = ('123',)
     
     result = get_active_user_id('test@test.com')
     
     assert result == '123'
-    expected_query = "SELECT id FROM users WHERE email = %s AND deleted_since IS NULL"
-    mock_execute.assert_called_once_with(expected_query, ('test@test.com',))
+    mock_execute.assert_called_once_with('get_active_user_id', ('test@test.com',))
 
 
-@patch('users.db_utils.execute_query_single')
+@patch('users.db_utils.execute_prepared_single')
 def test_get_active_user_id_not_exists(mock_execute):
     mock_execute.return_value = None
     
@@ -131,9 +158,27 @@ def test_get_active_user_id_not_exists(mock_execute):
     assert result is None
 
 
+@patch('users.db_utils.get_connection')
+def test_prepared_statements_are_prepared_once_per_connection(mock_get_conn):
+    mock_conn = _mock_conn()
+    mock_cur = MagicMock()
+    mock_get_conn.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cur
+    mock_cur.fetchone.return_value = ('123',)
+
+    assert get_active_user_id('a@test.com') == '123'
+    assert get_active_user_id('b@test.com') == '123'
+
+    first, second = [c[0] for c in mock_cur.execute.call_args_list]
+    assert first == ("PREPARE get_active_user_id AS SELECT id FROM users WHERE email = $1 AND deleted_since IS NULL; "
+                     "EXECUTE get_active_user_id (%s)", ('a@test.com',))
+    assert second == ("EXECUTE get_active_user_id (%s)", ('b@test.com',))
+    assert mock_get_conn.call_count == 1
+
+
 @patch('users.db_utils.get_connection')
 def test_connection_cleanup_on_exception(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -143,12 +188,13 @@ def test_connection_cleanup_on_exception(mock_get_conn):
         execute_query_single("SELECT * FROM users")
     
     mock_cur.close.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()      # A query error doesn't break the connection
+    assert get_pool().stats()["idle"] == 1
 
 
 @patch('users.db_utils.get_connection')
 def test_execute_update_exception_no_commit(mock_get_conn):
-    mock_conn = MagicMock()
+    mock_conn = _mock_conn()
     mock_cur = MagicMock()
     mock_get_conn.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cur
@@ -159,4 +205,59 @@ def test_execute_update_exception_no_commit(mock_get_conn):
     
     mock_conn.commit.assert_not_called()
     mock_cur.close.assert_called_once()
-    mock_conn.close.assert_called_once() 
\ No newline at end of file
+    assert get_pool().stats()["in_use"] == 0
+
+
+@patch('users.db_utils.get_connection')
+def test_connections_are_reused(mock_get_conn):
+    mock_get_conn.side_effect = lambda: _mock_conn()
+
+    for _ in range(5):
+        execute_query_single("SELECT 1")
+
+    assert mock_get_conn.call_count == 1
+    assert get_pool().stats()["checkouts"] == 5
+
+
+@patch('users.db_utils.get_connection')
+def test_reconnects_after_database_restart(mock_get_conn):
+    stale, fresh = _mock_conn(), _mock_conn()
+    mock_get_conn.side_effect = [stale, fresh]
+    execute_query_single("SELECT 1")
+
+    def server_gone(*args):
+        stale.closed = 2
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+    stale.cursor.return_value.execute.side_effect = server_gone
+    fresh.cursor.return_value.fetchone.return_value = ('123',)
+
+    # The statement went out, so it may have run: surfaced, not replayed
+    with pytest.raises(psycopg2.OperationalError):
+        execute_query_single("SELECT id FROM users")
+    stale.close.assert_called_once()
+    fresh.cursor.assert_not_called()
+
+    assert execute_query_single("SELECT id FROM users") == ('123',)
+    assert get_pool().stats()["discarded"] == 1
+
+
+@patch('users.db_utils.get_connection')
+def test_retries_when_the_connection_died_before_sending(mock_get_conn):
+    stale, fresh = _mock_conn(), _mock_conn()
+    mock_get_conn.side_effect = [stale, fresh]
+    execute_query_single("SELECT 1")
+
+    stale_cur = stale.cursor.return_value
+    stale_cur.execute.reset_mock()
+
+    def dropped_after_checkout():
+        stale.closed = 2
+        return stale_cur
+    stale.cursor.side_effect = dropped_after_checkout
+    stale_cur.execute.side_effect = psycopg2.InterfaceError("connection already closed")
+    fresh.cursor.return_value.rowcount = 1
+
+    assert execute_update("UPDATE users SET full_name = %s", ('x',)) == (None, 1)
+    stale_cur.execute.assert_called_once()
+    fresh.cursor.return_value.execute.assert_called_once_with("UPDATE users SET full_name = %s", ('x',))
+    assert get_pool().stats()["discarded"] == 1
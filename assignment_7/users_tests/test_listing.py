@@ -0,0 +1,43 @@
+import datetime
+import json
+from unittest.mock import patch
+
+from users.api.v0.users_routes import _decode_cursor
+
+JOINED = datetime.datetime(2024, 1, 1, 12, 30)
+
+
+def _rows(n, start=1):
+    return [(str(i), f'user{i}@test.com', f'User {i}', JOINED + datetime.timedelta(seconds=i))
+            for i in range(start, start + n)]
+
+
+@patch('users.api.v0.users_routes.list_active_users')
+def test_pages_follow_the_cursor(mock_list, client):
+    mock_list.return_value = _rows(3)
+    rv = client.get('/users?limit=2')
+
+    assert rv.status_code == 200
+    data = json.loads(rv.data)
+    assert [u['email'] for u in data['users']] == ['user1@test.com', 'user2@test.com']
+    mock_list.assert_called_once_with(None, 3)
+    assert _decode_cursor(data['next']) == (JOINED + datetime.timedelta(seconds=2), '2')
+
+    mock_list.return_value = _rows(1, start=3)
+    data = json.loads(client.get(f'/users/?limit=2&after={data["next"]}').data)
+    assert mock_list.call_args[0] == ((JOINED + datetime.timedelta(seconds=2), '2'), 3)
+    assert [u['email'] for u in data['users']] == ['user3@test.com']
+    assert data['next'] is None
+
+
+@patch('users.api.v0.users_routes.list_active_users')
+def test_listing_rejects_bad_parameters(mock_list, client):
+    for query in ('limit=0', 'limit=1001', 'limit=x', 'after=not-a-cursor', 'after=Zm9v'):
+        assert client.get(f'/users?{query}').status_code == 400, query
+    mock_list.assert_not_called()
+
+
+@patch('users.api.v0.users_routes.list_active_users')
+def test_listing_database_error(mock_list, client):
+    mock_list.side_effect = Exception('Database error')
+    assert client.get('/users').status_code == 500
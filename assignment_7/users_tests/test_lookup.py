@@ -0,0 +1,68 @@
+import datetime
+import json
+from unittest.mock import patch
+
+import pytest
+
+from users.api.v0 import users_routes
+
+JOINED = datetime.datetime(2024, 1, 1)
+
+
+def _users(*emails):
+    return {email: (f'id-{email}', email, email.split('@')[0], JOINED) for email in emails}
+
+
+@pytest.fixture
+def cached_routes():
+    users_routes.init_user_cache(max_entries=100, ttl=60)
+    yield
+    users_routes.init_user_cache(max_entries=0, ttl=0)
+
+
+@patch('users.api.v0.users_routes.log_bulk_event')
+@patch('users.api.v0.users_routes.get_users_by_emails')
+def test_lookup_keeps_request_order(mock_lookup, mock_log, client):
+    mock_lookup.return_value = _users('a@test.com', 'c@test.com')
+    emails = ['c@test.com', 'b@test.com', 'a@test.com', 'c@test.com']
+
+    rv = client.post('/users/lookup', data=json.dumps({'emails': emails}), content_type='application/json')
+
+    assert rv.status_code == 200
+    results = json.loads(rv.data)['results']
+    assert [r['email'] for r in results] == emails
+    assert [r.get('full_name') for r in results] == ['c', None, 'a', 'c']
+    assert results[1]['error'] == 'User not found'
+    assert results[0]['joined_at'] == '2024-01-01T00:00:00Z'
+    mock_lookup.assert_called_once_with(['c@test.com', 'b@test.com', 'a@test.com'])
+    mock_log.assert_called_once()
+    assert mock_log.call_args[0][1] == {'requested': 4, 'found': 3, 'not_found': 1}
+
+
+@patch('users.api.v0.users_routes.get_users_by_emails')
+def test_lookup_only_queries_cache_misses(mock_lookup, client, cached_routes):
+    mock_lookup.return_value = _users('a@test.com')
+    client.post('/users/lookup', data=json.dumps({'emails': ['a@test.com', 'b@test.com']}),
+                content_type='application/json')
+
+    mock_lookup.return_value = _users('c@test.com')
+    rv = client.post('/users/lookup', data=json.dumps({'emails': ['a@test.com', 'b@test.com', 'c@test.com']}),
+                     content_type='application/json')
+
+    assert mock_lookup.call_args[0][0] == ['c@test.com']
+    assert [r.get('full_name') for r in json.loads(rv.data)['results']] == ['a', None, 'c']
+
+
+@pytest.mark.parametrize('body', [{}, {'emails': 'a@test.com'}, {'emails': [1]}, {'emails': ['a@test.com'] * 5001}])
+@patch('users.api.v0.users_routes.get_users_by_emails')
+def test_lookup_rejects_bad_input(mock_lookup, body, client):
+    rv = client.post('/users/lookup', data=json.dumps(body), content_type='application/json')
+    assert rv.status_code == 400
+    mock_lookup.assert_not_called()
+
+
+@patch('users.api.v0.users_routes.get_users_by_emails')
+def test_lookup_database_error(mock_lookup, client):
+    mock_lookup.side_effect = Exception('Database error')
+    rv = client.post('/users/lookup', data=json.dumps({'emails': ['a@test.com']}), content_type='application/json')
+    assert rv.status_code == 500
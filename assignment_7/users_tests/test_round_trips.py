@@ -0,0 +1,81 @@
+import datetime
+import json
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+
+from users.api.v0 import users_routes
+from users.db_utils import close_pool
+
+ROW = ('123', 'test@test.com', 'Test User', datetime.datetime(2024, 1, 1))
+
+
+@pytest.fixture
+def db(monkeypatch, app):
+    """Pooled connections whose cursor answers ``fetchone`` with ``db.row``."""
+    monkeypatch.setenv('DB_POOL_MIN_SIZE', '0')
+    app.config['DEBUG_HEADERS'] = True
+    users_routes.init_user_cache(max_entries=0, ttl=0)
+    close_pool()
+    cursor = MagicMock()
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    conn.cursor.return_value = cursor
+    with patch('users.db_utils.get_connection', return_value=conn):
+        yield cursor
+    close_pool()
+
+
+def _post(client, full_name='Test User'):
+    return client.post('/users/', data=json.dumps({'email': 'test@test.com', 'full_name': full_name}),
+                       content_type='application/json')
+
+
+@pytest.mark.parametrize('row, status', [
+    (('123', True, True, False), 201),     # Created
+    (('123', True, False, True), 201),     # Reactivated
+    (('123', False, False, False), 200),   # Already active: the ID still comes back
+])
+def test_create_is_one_round_trip(db, client, row, status):
+    db.fetchone.return_value = row
+    rv = _post(client)
+    assert rv.status_code == status
+    assert rv.headers['X-DB-Round-Trips'] == '1'
+
+
+@pytest.mark.parametrize('row', [('123',), None])
+def test_delete_is_one_round_trip(db, client, row):
+    db.fetchone.return_value = row
+    rv = client.delete('/users/test@test.com')
+    assert rv.status_code == 204
+    assert rv.headers['X-DB-Round-Trips'] == '1'
+    assert 'RETURNING id' in db.execute.call_args[0][0]
+
+
+def test_get_is_one_round_trip(db, client):
+    db.fetchone.return_value = ROW
+    assert client.get('/users/test@test.com').headers['X-DB-Round-Trips'] == '1'
+
+
+def test_notify_rides_along_with_the_write(db, client, monkeypatch):
+    monkeypatch.setattr(users_routes, '_notify', True)
+    db.fetchone.return_value = ('123',)
+    rv = client.delete('/users/test@test.com')
+    assert rv.headers['X-DB-Round-Trips'] == '1'
+    query, params = db.execute.call_args[0]
+    assert 'PREPARE delete_user_notify AS' in query and 'pg_notify($3, email)' in query
+    assert params[-1] == users_routes.NOTIFY_CHANNEL
+
+
+def test_header_is_off_by_default(client):
+    assert 'X-DB-Round-Trips' not in client.get('/ready').headers
+
+
+def test_pool_ping_is_counted(db, client, monkeypatch):
+    monkeypatch.setenv('DB_POOL_PING_AFTER', '0')
+    db.fetchone.return_value = ROW
+    assert client.get('/users/test@test.com').headers['X-DB-Round-Trips'] == '1'   # Fresh connection, no ping
+    assert client.get('/users/test@test.com').headers['X-DB-Round-Trips'] == '2'   # SELECT 1 on checkout
+    assert db.execute.call_args_list[-2][0] == ("SELECT 1",)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from users.snowflake import EPOCH_MS, MAX_SEQUENCE, SnowflakeGenerator, parse_snowflake, worker_id_from_env
+
+
+class FakeClock:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms / 1000
+
+
+def test_layout_round_trips():
+    clock = FakeClock(EPOCH_MS + 12345)
+    generator = SnowflakeGenerator(7, clock=clock)
+    first, second = generator.next_id(), generator.next_id()
+    assert parse_snowflake(first) == (EPOCH_MS + 12345, 7, 0)
+    assert parse_snowflake(second) == (EPOCH_MS + 12345, 7, 1)
+    assert first.bit_length() <= 63
+
+
+def test_sequence_overflow_borrows_next_millisecond():
+    clock = FakeClock(EPOCH_MS + 1)
+    generator = SnowflakeGenerator(1, clock=clock)
+    ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 2)]
+    assert ids == sorted(set(ids))
+    assert parse_snowflake(ids[-1]) == (EPOCH_MS + 2, 1, 0)
+
+
+def test_clock_rollback_stays_monotonic():
+    clock = FakeClock(EPOCH_MS + 5000)
+    generator = SnowflakeGenerator(1, clock=clock)
+    before = generator.next_id()
+    clock.ms -= 2000
+    during = [generator.next_id() for _ in range(3)]
+    clock.ms += 3000
+    after = generator.next_id()
+    assert [before, *during, after] == sorted(set([before, *during, after]))
+    assert generator.clock_rollbacks == 1
+    assert parse_snowflake(after)[0] == EPOCH_MS + 6000
+
+
+def test_unique_across_threads():
+    generator = SnowflakeGenerator(3)
+    ids = []
+
+    def run():
+        batch = [generator.next_id() for _ in range(5000)]
+        ids.extend(batch)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(ids)) == 40000
+
+
+def test_worker_id_is_validated():
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(1024)
+
+
+def test_worker_id_has_no_default(monkeypatch):
+    from users.app import make_app
+    assert worker_id_from_env(" 7 ") == 7
+    for value in (None, "", "  "):
+        with pytest.raises(RuntimeError):
+            worker_id_from_env(value)
+    with pytest.raises(ValueError):
+        worker_id_from_env("pod-3")
+    monkeypatch.delenv("SNOWFLAKE_WORKER_ID")
+    with pytest.raises(RuntimeError):
+        make_app()
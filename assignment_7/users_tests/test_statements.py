@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+import psycopg2.errors
+import pytest
+
+from users.statements import StatementRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = StatementRegistry()
+    registry.register('get_user', "SELECT id FROM users WHERE email = %s AND full_name LIKE 'a%' LIMIT %s")
+    return registry
+
+
+def test_placeholders_become_parameters(registry):
+    conn, cur = MagicMock(), MagicMock()
+    registry.execute(conn, cur, 'get_user', ('a@test.com', 1))
+    cur.execute.assert_called_once_with(
+        "PREPARE get_user AS SELECT id FROM users WHERE email = $1 AND full_name LIKE 'a%%' LIMIT $2; "
+        "EXECUTE get_user (%s, %s)", ('a@test.com', 1))
+
+
+def test_prepared_per_connection(registry):
+    conn_a, conn_b, cur = MagicMock(), MagicMock(), MagicMock()
+    for conn in (conn_a, conn_a, conn_b):
+        registry.execute(conn, cur, 'get_user', ('a@test.com', 1))
+    sent = [c[0][0] for c in cur.execute.call_args_list]
+    assert [q.startswith('PREPARE') for q in sent] == [True, False, True]
+    stats = registry.stats()['get_user']
+    assert stats['calls'] == 3 and stats['prepares'] == 2
+
+
+@pytest.mark.parametrize('error, retried_with', [
+    (psycopg2.errors.DuplicatePreparedStatement, 'EXECUTE get_user'),
+    (psycopg2.errors.FeatureNotSupported('cached plan must not change result type'), 'DEALLOCATE get_user; PREPARE'),
+])
+def test_recovers_when_the_session_disagrees(registry, error, retried_with):
+    conn, cur = MagicMock(), MagicMock()
+    cur.execute.side_effect = [error, None]
+    registry.execute(conn, cur, 'get_user', ('a@test.com', 1))
+    assert cur.execute.call_args[0][0].startswith(retried_with)
+
+
+def test_lost_statement_is_prepared_again(registry):
+    conn, cur = MagicMock(), MagicMock()
+    registry.execute(conn, cur, 'get_user', ('a@test.com', 1))
+    cur.execute.side_effect = [psycopg2.errors.InvalidSqlStatementName, None]
+    registry.execute(conn, cur, 'get_user', ('a@test.com', 1))
+    assert cur.execute.call_args[0][0].startswith('PREPARE get_user AS')
+
+
+def test_names_must_be_identifiers(registry):
+    with pytest.raises(ValueError):
+        registry.register('drop table; --', 'SELECT 1')
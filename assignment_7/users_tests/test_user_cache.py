@@ -0,0 +1,63 @@
+import datetime
+import json
+import time
+from unittest.mock import patch
+from users.user_cache import UserCache
+
+ROW = ('123', 'test@test.com', 'Test User', datetime.datetime(2024, 1, 1))
+
+
+def test_entries_expire_and_are_bounded():
+    cache = UserCache(max_entries=2, ttl=0.05)
+    loads = []
+
+    def load(email):
+        loads.append(email)
+        return None if email.startswith('ghost') else ROW
+
+    assert cache.get_or_load('a@test.com', load) == ROW
+    assert cache.get_or_load('a@test.com', load) == ROW
+    assert cache.get_or_load('ghost@test.com', load) is None
+    assert cache.get_or_load('ghost@test.com', load) is None   # Misses are cached too
+    assert loads == ['a@test.com', 'ghost@test.com']
+
+    cache.get_or_load('b@test.com', load)
+    assert cache.stats()['entries'] == 2 and cache.stats()['evictions'] == 1
+    time.sleep(0.06)
+    cache.get_or_load('b@test.com', load)
+    assert loads[-1] == 'b@test.com' and len(loads) == 4
+    assert cache.stats()['hits'] == 2
+
+
+def test_invalidation_during_load_is_not_recached():
+    cache = UserCache(max_entries=10, ttl=60)
+
+    def racing_load(email):
+        cache.invalidate(email)   # A write lands while the read is in flight
+        return ROW
+
+    assert cache.get_or_load('a@test.com', racing_load) == ROW
+    assert cache.stats()['entries'] == 0
+
+
+@patch('users.api.v0.users_routes.execute_prepared_single')
+@patch('users.api.v0.users_routes.get_user_by_email')
+def test_writes_invalidate_cached_user(mock_get_user, mock_update, client):
+    mock_get_user.return_value = ROW
+    for _ in range(3):
+        assert client.get('/users/test@test.com').status_code == 200
+    assert mock_get_user.call_count == 1
+
+    mock_update.return_value = ('123',)
+    assert client.delete('/users/test@test.com').status_code == 204
+    mock_get_user.return_value = None
+    assert client.get('/users/test@test.com').status_code == 404
+
+    # Reactivation
+    mock_update.return_value = ('123', True, False, True)
+    rv = client.post('/users/', data=json.dumps({"email": "test@test.com", "full_name": "Back Again"}),
+                     content_type='application/json')
+    assert rv.status_code == 201
+    mock_get_user.return_value = ROW
+    assert client.get('/users/test@test.com').status_code == 200
+    assert mock_get_user.call_count == 3
@@ -1,13 +1,27 @@
 SELECT current_database();
 
 CREATE TABLE IF NOT EXISTS users (
-    id VARCHAR PRIMARY KEY NOT NULL UNIQUE,
+    id BIGINT PRIMARY KEY NOT NULL,
     full_name VARCHAR(200) NOT NULL,
     email VARCHAR(200) NOT NULL UNIQUE,
     joined_at TIMESTAMP NOT NULL,
     deleted_since TIMESTAMP
 );
 
+-- Hot paths only touch active users; partial indexes keep soft-deleted rows out of them
+CREATE INDEX IF NOT EXISTS users_active_joined_idx ON users (joined_at, id) WHERE deleted_since IS NULL;
+CREATE INDEX IF NOT EXISTS users_deleted_since_idx ON users (deleted_since) WHERE deleted_since IS NOT NULL;
+
+-- Users soft-deleted longer than USER_ARCHIVE_AFTER_DAYS, moved here by the compaction job
+CREATE TABLE IF NOT EXISTS users_archive (
+    id BIGINT PRIMARY KEY NOT NULL,
+    full_name VARCHAR(200) NOT NULL,
+    email VARCHAR(200) NOT NULL,
+    joined_at TIMESTAMP NOT NULL,
+    deleted_since TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
 CREATE TABLE IF NOT EXISTS page_hourly_views (
     page_id TEXT NOT NULL,
     hour_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
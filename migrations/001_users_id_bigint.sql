@@ -0,0 +1,29 @@
+-- Convert users.id from VARCHAR to BIGINT Snowflake IDs, for databases created
+-- from an init.sql older than the Snowflake generator:
+--
+--   psql -h localhost -U app_user -d app_db -f migrations/001_users_id_bigint.sql
+--
+-- Deploy the new service first: it writes integer IDs, which a VARCHAR column
+-- stores as text, so it works before and after this migration.
+-- Legacy IDs are 17-digit strings (<unix ms><4 random digits>). They fit in a
+-- BIGINT and sort below every new Snowflake ID.
+-- ALTER ... TYPE rewrites the table and its indexes under an ACCESS EXCLUSIVE
+-- lock, so run it in a quiet window on large tables.
+
+BEGIN;
+
+DO $$
+DECLARE
+    bad_id VARCHAR;
+BEGIN
+    SELECT id INTO bad_id FROM users WHERE id !~ '^[0-9]{1,18}$' LIMIT 1;
+    IF FOUND THEN
+        RAISE EXCEPTION 'users.id % is not a BIGINT; fix it before migrating', bad_id;
+    END IF;
+END $$;
+
+-- The old schema declared id both PRIMARY KEY and UNIQUE: two identical indexes
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_id_key;
+ALTER TABLE users ALTER COLUMN id TYPE BIGINT USING id::BIGINT;
+
+COMMIT;
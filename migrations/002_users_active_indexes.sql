@@ -0,0 +1,24 @@
+-- Partial indexes for active users and the users_archive table used by the
+-- compaction job (USER_ARCHIVE_AFTER_DAYS). Apply after 001_users_id_bigint.sql:
+--
+--   psql -h localhost -U app_user -d app_db -f migrations/002_users_active_indexes.sql
+--
+-- CONCURRENTLY builds the indexes without blocking writes, so this file must
+-- not run inside a transaction. If a build fails, drop the INVALID index and rerun.
+
+-- GET /users keyset pagination on (joined_at, id), active users only
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_active_joined_idx
+    ON users (joined_at, id) WHERE deleted_since IS NULL;
+
+-- Lets compaction find expired soft-deleted rows without scanning the table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_deleted_since_idx
+    ON users (deleted_since) WHERE deleted_since IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS users_archive (
+    id BIGINT PRIMARY KEY NOT NULL,
+    full_name VARCHAR(200) NOT NULL,
+    email VARCHAR(200) NOT NULL,
+    joined_at TIMESTAMP NOT NULL,
+    deleted_since TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
@@ -10,7 +10,7 @@ from contextlib import contextmanager
 from flask import Flask, jsonify
 from api.v0.reports_routes import reports_api
 from users.config import LOGGING
-from users.db_utils import get_connection
+from users.db_utils import close_pool, execute_query_single, get_pool
 
 _app_ready = False
 _shutdown_event = threading.Event()
@@ -19,11 +19,7 @@ _shutdown_event = threading.Event()
 def check_database_connection(max_retries=5, retry_delay=2):
     for attempt in range(max_retries):
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            execute_query_single("SELECT 1")
             return True
         except Exception as e:
             logging.error(f"Database connection attempt {attempt + 1} failed: {e}")
@@ -73,6 +69,7 @@ def application_lifecycle():
     finally:
         logging.info("=== APPLICATION SHUTDOWN ===")
         _app_ready = False
+        close_pool()
 
 
 def make_app():
@@ -92,11 +89,7 @@ def make_app():
             }), 503
 
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            execute_query_single("SELECT 1")
             db_status = "healthy"
         except Exception:
             db_status = "unhealthy"
@@ -105,6 +98,7 @@ def make_app():
         return jsonify({
             "status": "ready" if db_status == "healthy" else "degraded",
             "database": db_status,
+            "pool": get_pool().stats(),
             "timestamp": time.time()
         }), status_code
 